@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: классификация имен по шаблонам
+
+Сравнивает прежнюю проверку (re.search по каждому шаблону TECHNICAL_PATTERNS,
+затем USER_PATTERNS) со скомпилированными PatternMatcher и проверяет, что
+результаты совпадают для всех имен. Сетевые запросы не выполняются.
+
+Запуск: python3 benchmarks/bench_classifier.py [количество_имен]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subdomain_scanner.utils.classifier import (
+    TECHNICAL_PATTERNS,
+    USER_PATTERNS,
+    is_technical_subdomain,
+    is_user_subdomain,
+)
+
+WORDLIST = "wordlists/subdomains-top1million-5000.txt"
+
+
+def classify_per_pattern(name):
+    for pattern in TECHNICAL_PATTERNS:
+        if re.search(pattern, name, re.IGNORECASE):
+            return "technical"
+    for pattern in USER_PATTERNS:
+        if re.search(pattern, name, re.IGNORECASE):
+            return "user"
+    return None
+
+
+def classify_compiled(name):
+    if is_technical_subdomain(name):
+        return "technical"
+    if is_user_subdomain(name):
+        return "user"
+    return None
+
+
+def generate_names(count):
+    """Имена из словаря с типичными вариациями (номера, регистр, уровни)"""
+    with open(WORDLIST, "r", encoding="utf-8") as file:
+        words = [line.strip() for line in file if line.strip()]
+    extra = [
+        "scontent-lhr8-1.xx",
+        "db-shard12",
+        "10.0.0",
+        "ip-10-0-0-1",
+        "a-b1",
+        "ſtatic",
+    ]
+    rng = random.Random(42)
+    names = []
+    for _ in range(count):
+        word = rng.choice(words) if rng.random() < 0.95 else rng.choice(extra)
+        if rng.random() < 0.2:
+            word += str(rng.randint(0, 99))
+        if rng.random() < 0.1:
+            word = word.upper()
+        if rng.random() < 0.1:
+            word = f"{word}.{rng.choice(words)}"
+        names.append(f"{word}.example.com")
+    return names
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    names = generate_names(count)
+
+    results = {}
+    for title, func in [
+        ("re.search по каждому шаблону", classify_per_pattern),
+        ("PatternMatcher", classify_compiled),
+    ]:
+        started = time.perf_counter()
+        results[title] = [func(name) for name in names]
+        seconds = time.perf_counter() - started
+        print(f"{title:30} {seconds:8.2f} с, {seconds / count * 1e6:8.2f} мкс/имя")
+
+    first, second = results.values()
+    mismatches = sum(1 for a, b in zip(first, second) if a != b)
+    print(f"Расхождений: {mismatches} из {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: разбор большого ответа crt.sh целиком и потоково
+
+Создает синтетический ответ crt.sh (JSON-массив записей с name_value) и
+извлекает из него поддомены двумя способами: json.loads всего ответа
+(как response.json()) и JSONArrayStream частями по 64 КБ. Для каждого
+способа выводятся время и пиковое потребление памяти (tracemalloc).
+Сетевые запросы не выполняются.
+
+Запуск: python3 benchmarks/bench_ct_stream.py [количество_записей]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subdomain_scanner.cert.json_stream import iter_json_array, iter_entry_names
+
+DOMAIN = "example.com"
+CHUNK_SIZE = 64 * 1024
+
+
+def write_dump(path, count):
+    """Записывает синтетический ответ crt.sh из count записей"""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[")
+        for index in range(count):
+            if index:
+                file.write(",")
+            names = "\n".join(
+                f"{prefix}{index % 5000}.{DOMAIN}" for prefix in ("www", "api", "cdn")
+            )
+            entry = {
+                "issuer_ca_id": 183267,
+                "issuer_name": "C=US, O=Let's Encrypt, CN=R3",
+                "common_name": f"www{index % 5000}.{DOMAIN}",
+                "name_value": names,
+                "id": 9000000000 + index,
+                "entry_timestamp": "2023-01-01T00:00:00.000",
+                "not_before": "2023-01-01T00:00:00",
+                "not_after": "2023-04-01T00:00:00",
+                "serial_number": f"{index:040x}",
+            }
+            file.write(json.dumps(entry))
+        file.write("]")
+
+
+def collect(names):
+    found = set()
+    for name in names:
+        if DOMAIN in name and name.endswith(DOMAIN) and name != DOMAIN:
+            found.add(name)
+    return found
+
+
+def parse_whole(path):
+    with open(path, "rb") as file:
+        data = json.loads(file.read())
+    return collect(iter_entry_names(data, "name_value"))
+
+
+def parse_stream(path):
+    with open(path, "rb") as file:
+        chunks = iter(lambda: file.read(CHUNK_SIZE), b"")
+        return collect(iter_entry_names(iter_json_array(chunks), "name_value"))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "crtsh.json")
+        write_dump(path, count)
+        size = os.path.getsize(path) / 1024 / 1024
+        print(f"Синтетический ответ: {count} записей, {size:.1f} МБ")
+
+        results = []
+        for title, func in [
+            ("json.loads целиком", parse_whole),
+            ("JSONArrayStream", parse_stream),
+        ]:
+            tracemalloc.start()
+            started = time.perf_counter()
+            found = func(path)
+            seconds = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append(found)
+            print(
+                f"{title:20} {seconds:7.2f} с, пик памяти {peak / 1024 / 1024:8.1f} МБ, "
+                f"поддоменов {len(found)}"
+            )
+
+        print(f"Результаты совпадают: {results[0] == results[1]}")
+
+
+if __name__ == "__main__":
+    main()
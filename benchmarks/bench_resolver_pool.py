@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк: накладные расходы на подготовку резолвера для одного запроса
+
+Сравнивает создание dns.resolver.Resolver() с настройкой серверов и таймаутов
+на каждый вызов (прежнее поведение) с получением резолвера из пула потока.
+Сетевые запросы не выполняются.
+
+Запуск: python3 benchmarks/bench_resolver_pool.py [количество_итераций]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dns.resolver
+from subdomain_scanner.dns.resolver_pool import get_resolver
+from subdomain_scanner.dns.zone_transfer import PUBLIC_DNS_SERVERS
+
+
+def per_query_resolver():
+    resolver = dns.resolver.Resolver()
+    resolver.nameservers = PUBLIC_DNS_SERVERS
+    resolver.timeout = 1.0
+    resolver.lifetime = 2.0
+    return resolver
+
+
+def pooled_resolver():
+    return get_resolver("default")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for name, func in [
+        ("Resolver() на каждый запрос", per_query_resolver),
+        ("get_resolver() из пула", pooled_resolver),
+    ]:
+        seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+        print(f"{name:32} {seconds / iterations * 1e6:10.2f} мкс/запрос")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,105 +4,115 @@ import logging
 import os
 import sys
 from datetime import datetime
-from subdomain_scanner.utils import setup_logger, ensure_wordlist_exists
+from subdomain_scanner.utils import (
+    setup_logger,
+    ensure_wordlist_exists,
+    ResultStream,
+    DomainResultStreams,
+)
 from subdomain_scanner.scanner import SubdomainScanner
-
-
-def main():
-    parser = argparse.ArgumentParser(
-        description="Сканер поддоменов - инструмент для обнаружения поддоменов"
-    )
-    parser.add_argument(
-        "domain", nargs="?", help="Домен для сканирования (например, example.com)"
-    )
-    parser.add_argument(
-        "-w",
-        "--wordlist",
-        help="Путь к файлу словаря для перебора поддоменов",
-        default="wordlists/subdomains-top1million-5000.txt",
-    )
-    parser.add_argument(
-        "-t",
-        "--threads",
-        help="Количество потоков для параллельного поиска",
-        type=int,
-        default=10,
-    )
-    parser.add_argument("-o", "--output", help="Файл для сохранения результатов")
-    parser.add_argument(
-        "-v", "--verbose", action="store_true", help="Включить подробный вывод"
-    )
-    parser.add_argument(
-        "-c",
-        "--classify",
-        action="store_true",
-        help="Классифицировать поддомены на пользовательские и технические",
-    )
-    parser.add_argument(
-        "--save-classified",
-        action="store_true",
-        help="Сохранить классифицированные поддомены в отдельные файлы",
-    )
-    parser.add_argument(
-        "--max-classify",
-        type=int,
-        default=100,
-        help="Максимальное количество поддоменов для классификации (0 = без ограничений)",
-    )
-    parser.add_argument(
-        "--filter",
-        help="Фильтр для вывода только поддоменов, содержащих указанную строку",
-    )
-    parser.add_argument(
-        "--no-filter-wildcards",
-        action="store_true",
-        help="Не фильтровать поддомены со звездочками при сохранении",
-    )
-    parser.add_argument(
-        "--all-in-one",
-        action="store_true",
-        help="Сохранить все поддомены в один файл без классификации и без звездочек",
-    )
-
-    args = parser.parse_args()
-
-    # Настраиваем логирование
-    log_level = logging.DEBUG if args.verbose else logging.INFO
-    setup_logger(log_level=log_level)
-
-    # Проверяем наличие домена
-    if not args.domain:
-        # Запрашиваем адрес домена у пользователя
-        args.domain = input(
-            "Введите домен для сканирования (например, example.com): "
-        ).strip()
-        if not args.domain:
-            logging.error("Домен не указан. Завершение работы.")
-            sys.exit(1)
+from subdomain_scanner.batch import BatchScanner, domain_output_file
+from subdomain_scanner.dns.cache import DNSCache, set_cache
+from subdomain_scanner.cert.state import CTState, set_ct_state
+from subdomain_scanner.cert.ct_index import CTIndex, set_ct_index
+from subdomain_scanner.cert.ct_log import CTLogMirror
+from subdomain_scanner.dns.budget import QueryBudget, set_budget
+from subdomain_scanner.dns.wordlist import (
+    compile_wordlist,
+    set_wordlist_dedup,
+    DEDUP_MODES,
+    DEDUP_SET,
+)
+from subdomain_scanner.dns.ranking import learn_wordlist
+from subdomain_scanner.utils.http_probe import HTTPProber
+from subdomain_scanner.utils.grouping import (
+    GroupPolicy,
+    GROUP_BY_IP,
+    GROUP_BY_CNAME,
+    GROUP_BY_ANY,
+)
+
+
+def normalize_domain(domain):
+    """Приводит введенный домен к виду example.com (убирает схему, www. и слеш)"""
+    domain = domain.strip()
 
     # Проверяем формат домена
-    if "://" in args.domain:
+    if "://" in domain:
         # Если пользователь ввел URL, извлекаем домен
         try:
             from urllib.parse import urlparse
 
-            parsed = urlparse(args.domain)
-            args.domain = parsed.netloc or parsed.path
+            parsed = urlparse(domain)
+            domain = parsed.netloc or parsed.path
         except Exception as e:
             logging.error(f"Не удалось разобрать URL: {e}")
 
     # Удаляем 'www.' если есть
-    if args.domain.startswith("www."):
-        args.domain = args.domain[4:]
+    if domain.startswith("www."):
+        domain = domain[4:]
 
     # Убираем слеш в конце, если есть
-    args.domain = args.domain.rstrip("/")
+    return domain.rstrip("/")
+
+
+def read_domains(domains_file):
+    """Читает домены из файла (по одному в строке, "-" - стандартный ввод)"""
+    if domains_file == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with open(domains_file, "r") as file:
+            lines = file.readlines()
+
+    domains = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            domains.append(normalize_domain(line))
+    return domains
+
+
+def run_batch(args, domains):
+    """Пакетное сканирование списка доменов с результатами в finds/"""
+    if args.engine == "threads":
+        logging.warning(
+            "Пакетный режим перебирает имена только асинхронным движком: "
+            "--engine threads не используется"
+        )
+    scanner = BatchScanner(
+        domains,
+        args.wordlist,
+        args.threads,
+        concurrency=args.concurrency,
+        adaptive=args.adaptive,
+        filter_wildcard=not args.keep_wildcard_dns,
+    )
+
+    print(f"\nНачинаем пакетное сканирование {len(scanner.domains)} доменов")
+    print("=" * 60)
+
+    # Находки сразу дописываются в файл своего домена: прерванный запуск
+    # сохраняет все найденное; в конце файлы перезаписываются отсортированными
+    streams = DomainResultStreams(domain_output_file, args.no_filter_wildcards)
+    for domain, subdomain, source in scanner.iter_scan():
+        streams.write(domain, subdomain)
+        logging.debug(f"Найден {subdomain} ({source})")
+
+    saved = scanner.save_results("finds", args.no_filter_wildcards)
+
+    print(f"\nРезультаты пакетного сканирования:")
+    print("=" * 60)
+    for domain in scanner.domains:
+        count = len(scanner.found_subdomains[domain])
+        if count:
+            print(f"{domain}: {count} -> {domain_output_file(domain)}")
+        else:
+            print(f"{domain}: поддомены не найдены")
+    print(f"\nЗаписано файлов результатов: {saved}")
 
-    # Проверяем наличие словаря или скачиваем его
-    wordlist_url = "https://github.com/danielmiessler/SecLists/raw/master/Discovery/DNS/subdomains-top1million-5000.txt"
-    if not os.path.exists(args.wordlist):
-        ensure_wordlist_exists(args.wordlist, wordlist_url)
 
+def run_single(args):
+    """Сканирование одного домена с результатами в args.output"""
     # Если выходной файл не указан, создаем его в папке finds с именем домена
     if not args.output:
         # Проверяем наличие директории finds, если нет - создаем
@@ -111,11 +121,28 @@ def main():
             os.makedirs(finds_dir)
 
         # Формируем имя файла на основе домена
-        domain_file_name = args.domain.replace(".", "_")
-        args.output = f"{finds_dir}/{domain_file_name}.txt"
+        args.output = domain_output_file(args.domain, finds_dir)
+
+    # Состояние перебора периодически сохраняется для --resume
+    if not args.checkpoint:
+        args.checkpoint = f"finds/{args.domain.replace('.', '_')}.state.json"
 
     # Запускаем сканирование
-    scanner = SubdomainScanner(args.domain, args.wordlist, args.threads)
+    scanner = SubdomainScanner(
+        args.domain,
+        args.wordlist,
+        args.threads,
+        engine=args.engine or "threads",
+        concurrency=args.concurrency,
+        adaptive=args.adaptive,
+        filter_wildcard=not args.keep_wildcard_dns,
+        parallel_methods=args.parallel_methods,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        mutations=args.mutations,
+        recursive_depth=args.recursive_depth,
+        recursive_queries=args.recursive_queries,
+    )
 
     print(f"\nНачинаем сканирование поддоменов для: {args.domain}")
     print("=" * 60)
@@ -125,7 +152,12 @@ def main():
     print("- Перебор из словаря")
     print("=" * 60)
 
-    found_subdomains = scanner.scan_all()
+    # Результаты дописываются в файл по мере обнаружения
+    with ResultStream(args.output, args.no_filter_wildcards) as stream:
+        for subdomain, source in scanner.iter_scan():
+            stream.write(subdomain)
+            logging.debug(f"Найден {subdomain} ({source})")
+    found_subdomains = sorted(scanner.found_subdomains)
 
     # Вывод результатов
     print(f"\nРезультаты сканирования:")
@@ -199,8 +231,20 @@ def main():
                 )
                 subdomains_to_classify = subdomains_to_classify[: args.max_classify]
 
+            prober = HTTPProber(
+                args.http_concurrency,
+                args.http_per_host,
+                args.http_timeout,
+                race=args.http_race,
+                title_limit=args.http_title_limit,
+            )
+            group_policy = None
+            if args.http_group:
+                group_policy = GroupPolicy(
+                    args.http_group, samples=args.http_group_samples
+                )
             user_subdomains, technical_subdomains = scanner.classify_subdomains(
-                args.threads, subdomains_to_classify
+                args.threads, subdomains_to_classify, prober, group_policy
             )
 
             print(f"\nРезультаты классификации:")
@@ -250,7 +294,366 @@ def main():
     else:
         print(f"Поддомены для {args.domain} не найдены.")
 
-    print("\nСканирование завершено.")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Сканер поддоменов - инструмент для обнаружения поддоменов"
+    )
+    parser.add_argument(
+        "domain", nargs="?", help="Домен для сканирования (например, example.com)"
+    )
+    parser.add_argument(
+        "--domains-file",
+        help="Файл со списком доменов для пакетного сканирования (по одному в строке, "
+        '"-" - читать из стандартного ввода); результаты пишутся в finds/<домен>.txt',
+    )
+    parser.add_argument(
+        "-w",
+        "--wordlist",
+        help="Путь к файлу словаря для перебора поддоменов",
+        default="wordlists/subdomains-top1million-5000.txt",
+    )
+    parser.add_argument(
+        "--wordlist-dedup",
+        help="Исключение повторов в текстовом словаре: set - точно (память растет "
+        "со словарем), bloom - фильтр Блума фиксированного размера (редкие слова "
+        "могут быть пропущены)",
+        choices=DEDUP_MODES,
+        default=DEDUP_SET,
+    )
+    parser.add_argument(
+        "--compile-wordlist",
+        metavar="OUTPUT",
+        help="Скомпилировать словарь (-w) в двоичный файл OUTPUT и завершить работу; "
+        "скомпилированный словарь передается через -w и открывается мгновенно",
+    )
+    parser.add_argument(
+        "--learn-wordlist",
+        metavar="OUTPUT",
+        help="Упорядочить словарь (-w) по числу доменов, для которых слово находило "
+        "поддомены в прошлых результатах (--finds-dir), записать в OUTPUT и завершить работу",
+    )
+    parser.add_argument(
+        "--finds-dir",
+        help="Каталог с результатами прошлых сканирований для --learn-wordlist",
+        default="finds",
+    )
+    parser.add_argument(
+        "--learn-top",
+        metavar="N",
+        help="Оставить в ранжированном словаре только N самых результативных слов "
+        "(бюджет запросов перебора)",
+        type=int,
+    )
+    parser.add_argument(
+        "--learn-min-hits",
+        metavar="N",
+        help="Добавлять в ранжированный словарь новые префиксы, найденные "
+        "не менее чем для N доменов (по умолчанию 2)",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        help="Количество потоков для параллельного поиска",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "async"],
+        help="Движок перебора: threads (пул потоков, по умолчанию) или async "
+        "(асинхронные UDP-запросы); пакетный режим всегда использует async",
+    )
+    parser.add_argument(
+        "--concurrency",
+        help="Количество одновременных DNS-запросов для движка async "
+        "(с --adaptive - верхняя граница)",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Подбирать число одновременных запросов автоматически по доле таймаутов "
+        "(--threads - начальное значение, --concurrency - верхняя граница)",
+    )
+    parser.add_argument(
+        "--keep-wildcard-dns",
+        action="store_true",
+        help="Не отбрасывать при переборе ответы, совпадающие с wildcard DNS (*.домен)",
+    )
+    parser.add_argument(
+        "--dns-cache",
+        help="Файл SQLite для хранения кэша DNS-ответов между запусками",
+    )
+    parser.add_argument(
+        "--ct-state",
+        help="Файл SQLite с состоянием опроса логов сертификатов: следующие "
+        "запуски запрашивают только новые сертификаты",
+    )
+    parser.add_argument(
+        "--ct-refresh-days",
+        help="Через сколько дней заново опрашивать источники без курсора (crt.sh) "
+        "при --ct-state (по умолчанию: 7)",
+        type=float,
+        default=7,
+    )
+    parser.add_argument(
+        "--ct-index",
+        help="Файл SQLite с локальным индексом имен из журналов CT: поддомены "
+        "ищутся в нем в дополнение к онлайн-источникам",
+    )
+    parser.add_argument(
+        "--ct-offline",
+        action="store_true",
+        help="Искать имена из журналов CT только в локальном индексе (--ct-index)",
+    )
+    parser.add_argument(
+        "--ct-mirror",
+        metavar="LOG_URL",
+        action="append",
+        help="Загрузить новые записи журнала CT (RFC 6962) в индекс --ct-index "
+        "и завершить работу; можно указать несколько раз",
+    )
+    parser.add_argument(
+        "--ct-mirror-entries",
+        metavar="N",
+        help="Загрузить из каждого журнала не более N записей за запуск",
+        type=int,
+    )
+    parser.add_argument(
+        "--parallel-methods",
+        action="store_true",
+        help="Запускать Zone Transfer, Certificate Transparency и перебор одновременно",
+    )
+    parser.add_argument(
+        "--query-budget",
+        help="Общий лимит одновременных DNS-запросов для всех методов "
+        "(по умолчанию: --concurrency; 0 - без лимита)",
+        type=int,
+    )
+    parser.add_argument(
+        "--mutations",
+        metavar="N",
+        help="После сканирования проверить мутации найденных имен, сделав не "
+        "более N DNS-запросов вместе с проверками wildcard "
+        "(соседние номера, коды локаций, склейки, вставка слов); 0 - отключено",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--recursive-depth",
+        metavar="N",
+        help="После сканирования перебирать словарь под найденными именами "
+        "до глубины N (2 - *.dev.example.com); 0 - отключено",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--recursive-queries",
+        metavar="N",
+        help="Бюджет DNS-запросов рекурсивного перебора (по умолчанию 50000)",
+        type=int,
+        default=50000,
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Продолжить прерванный перебор с последней сохраненной позиции",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Файл состояния перебора (по умолчанию finds/<домен>.state.json)",
+    )
+    parser.add_argument("-o", "--output", help="Файл для сохранения результатов")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Включить подробный вывод"
+    )
+    parser.add_argument(
+        "-c",
+        "--classify",
+        action="store_true",
+        help="Классифицировать поддомены на пользовательские и технические",
+    )
+    parser.add_argument(
+        "--save-classified",
+        action="store_true",
+        help="Сохранить классифицированные поддомены в отдельные файлы",
+    )
+    parser.add_argument(
+        "--max-classify",
+        type=int,
+        default=100,
+        help="Максимальное количество поддоменов для классификации (0 = без ограничений)",
+    )
+    parser.add_argument(
+        "--http-concurrency",
+        type=int,
+        default=200,
+        help="Количество одновременных HTTP-проверок при классификации",
+    )
+    parser.add_argument(
+        "--http-per-host",
+        type=int,
+        default=4,
+        help="Количество одновременных соединений с одним хостом при классификации",
+    )
+    parser.add_argument(
+        "--http-timeout",
+        type=float,
+        default=3.0,
+        help="Таймаут HTTP-запроса при классификации в секундах",
+    )
+    parser.add_argument(
+        "--http-race",
+        action="store_true",
+        help="Проверять HTTPS и HTTP одновременно (HTTPS с небольшой форой) "
+        "и брать первый ответ, а не ждать таймаута HTTPS",
+    )
+    parser.add_argument(
+        "--http-title-limit",
+        metavar="BYTES",
+        type=int,
+        default=64 * 1024,
+        help="Сколько байт HTML-страницы читать в поисках <title> (по умолчанию 65536)",
+    )
+    parser.add_argument(
+        "--http-group",
+        choices=[GROUP_BY_IP, GROUP_BY_CNAME, GROUP_BY_ANY],
+        help="Группировать неопределенные поддомены по IP-адресам и/или цели CNAME "
+        "(в пределах родительской зоны) и проверять по HTTP только представителей групп",
+    )
+    parser.add_argument(
+        "--http-group-samples",
+        metavar="N",
+        type=int,
+        default=1,
+        help="Сколько имен группы проверять кроме представителя; результат "
+        "переносится на группу, только если все проверки совпали (по умолчанию 1)",
+    )
+    parser.add_argument(
+        "--filter",
+        help="Фильтр для вывода только поддоменов, содержащих указанную строку",
+    )
+    parser.add_argument(
+        "--no-filter-wildcards",
+        action="store_true",
+        help="Не фильтровать поддомены со звездочками при сохранении",
+    )
+    parser.add_argument(
+        "--all-in-one",
+        action="store_true",
+        help="Сохранить все поддомены в один файл без классификации и без звездочек",
+    )
+
+    args = parser.parse_args()
+
+    # Настраиваем логирование
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    setup_logger(log_level=log_level)
+
+    set_wordlist_dedup(args.wordlist_dedup)
+
+    if args.compile_wordlist:
+        count = compile_wordlist(args.wordlist, args.compile_wordlist)
+        print(f"Словарь скомпилирован: {count} слов -> {args.compile_wordlist}")
+        return
+
+    if args.ct_mirror:
+        if not args.ct_index:
+            logging.error("Для --ct-mirror нужен файл индекса --ct-index")
+            sys.exit(1)
+        ct_index = CTIndex(args.ct_index)
+        try:
+            for log_url in args.ct_mirror:
+                mirror = CTLogMirror(log_url, ct_index, max_workers=args.threads)
+                try:
+                    mirror.sync(args.ct_mirror_entries)
+                finally:
+                    mirror.close()
+            print(f"Индекс CT: {ct_index.count()} имен -> {args.ct_index}")
+        finally:
+            ct_index.close()
+        return
+
+    if args.learn_wordlist:
+        count = learn_wordlist(
+            args.wordlist,
+            args.learn_wordlist,
+            args.finds_dir,
+            args.learn_min_hits,
+            args.learn_top,
+        )
+        print(f"Ранжированный словарь: {count} слов -> {args.learn_wordlist}")
+        return
+
+    if args.domains_file:
+        domains = read_domains(args.domains_file)
+        if not domains:
+            logging.error("Список доменов пуст. Завершение работы.")
+            sys.exit(1)
+    else:
+        # Проверяем наличие домена
+        if not args.domain:
+            # Запрашиваем адрес домена у пользователя
+            args.domain = input(
+                "Введите домен для сканирования (например, example.com): "
+            ).strip()
+            if not args.domain:
+                logging.error("Домен не указан. Завершение работы.")
+                sys.exit(1)
+
+        args.domain = normalize_domain(args.domain)
+
+    # Проверяем наличие словаря или скачиваем его
+    wordlist_url = "https://github.com/danielmiessler/SecLists/raw/master/Discovery/DNS/subdomains-top1million-5000.txt"
+    if not os.path.exists(args.wordlist):
+        ensure_wordlist_exists(args.wordlist, wordlist_url)
+
+    # Подключаем постоянный кэш DNS-ответов, если указан
+    if args.dns_cache:
+        dns_cache = set_cache(DNSCache(db_path=args.dns_cache))
+
+    # Состояние инкрементального опроса логов сертификатов
+    if args.ct_state:
+        ct_state = set_ct_state(
+            CTState(args.ct_state, refresh=args.ct_refresh_days * 86400)
+        )
+
+    # Локальный индекс зеркала журналов CT
+    if args.ct_index:
+        ct_index = set_ct_index(CTIndex(args.ct_index, offline=args.ct_offline))
+    elif args.ct_offline:
+        logging.warning(
+            "--ct-offline без --ct-index: онлайн-источники отключены не будут"
+        )
+
+    # Общий бюджет DNS-запросов для одновременно работающих методов
+    if args.query_budget is None:
+        args.query_budget = args.concurrency
+    if args.query_budget > 0:
+        set_budget(QueryBudget(args.query_budget))
+
+    # Базы и индекс закрываются и при ошибке или прерывании (Ctrl-C)
+    try:
+        if args.domains_file:
+            if args.resume:
+                logging.warning(
+                    "Продолжение перебора в пакетном режиме не поддерживается"
+                )
+            run_batch(args, domains)
+        else:
+            run_single(args)
+            print("\nСканирование завершено.")
+    finally:
+        if args.dns_cache:
+            dns_cache.close()
+        if args.ct_state:
+            ct_state.close()
+        if args.ct_index:
+            ct_index.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .dns import iter_zone_transfer, load_wordlist, extend_wordlist, iter_names_async
+from .dns.wildcard import parent_zones, word_suffixes
+from .dns.health import get_scheduler
+from .dns.cache import get_cache
+from .dns.budget import get_budget
+from .cert import iter_certificate_transparency
+from .utils import save_results
+from .scanner import (
+    SOURCE_ZONE_TRANSFER,
+    SOURCE_CERTIFICATE_TRANSPARENCY,
+    SOURCE_BRUTE_FORCE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def domain_output_file(domain, finds_dir="finds"):
+    """Путь к файлу результатов для домена (как у одиночного сканирования)"""
+    return f"{finds_dir}/{domain.replace('.', '_')}.txt"
+
+
+class BatchScanner:
+    """
+    Сканирование списка доменов за один запуск
+
+    Словарь загружается один раз. Перебор всех доменов идет через один
+    асинхронный движок, поэтому кэш DNS, оценка серверов и бюджет запросов
+    общие. Имена чередуются по доменам (слово 1 для всех доменов, затем
+    слово 2 и т.д.), так что ни один домен не ждет окончания остальных.
+    Zone Transfer и Certificate Transparency выполняются для доменов
+    в пуле потоков параллельно с перебором.
+    """
+
+    def __init__(
+        self,
+        domains,
+        wordlist_path="wordlists/subdomains-top1million-5000.txt",
+        threads=10,
+        concurrency=1000,
+        adaptive=False,
+        filter_wildcard=True,
+    ):
+        """
+        Args:
+            domains (iterable): Домены для сканирования
+            wordlist_path (str): Путь к файлу словаря
+            threads (int): Количество потоков для Zone Transfer и Certificate Transparency
+            concurrency (int): Количество одновременных DNS-запросов при переборе
+            adaptive (bool): Подбирать число одновременных запросов по доле таймаутов
+            filter_wildcard (bool): Отбрасывать при переборе ответы wildcard DNS
+        """
+        self.domains = list(dict.fromkeys(domain.lower() for domain in domains))
+        self.wordlist_path = wordlist_path
+        self.threads = threads
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.filter_wildcard = filter_wildcard
+        self.found_subdomains = {domain: set() for domain in self.domains}
+
+    def _owner(self, name):
+        """Домен из списка, которому принадлежит найденное имя"""
+        labels = name.lower().split(".")
+        for index in range(1, len(labels)):
+            candidate = ".".join(labels[index:])
+            if candidate in self.found_subdomains:
+                return candidate
+        return None
+
+    def _brute_force_names(self, wordlist, extras):
+        """Генератор имен для перебора с чередованием доменов"""
+        for word in wordlist:
+            for domain in self.domains:
+                yield f"{word}.{domain}"
+        for domain, words in extras.items():
+            for word in words:
+                yield f"{word}.{domain}"
+
+    def iter_brute_force(self):
+        """
+        Генератор: перебор словаря для всех доменов через общий движок
+
+        Yields:
+            tuple: (домен, поддомен)
+        """
+        wordlist = load_wordlist(self.wordlist_path)
+        if not wordlist:
+            logger.error(f"Не удалось загрузить словарь из {self.wordlist_path}")
+            return
+
+        # Родительские зоны слов словаря одинаковы для всех доменов -
+        # обходим словарь один раз
+        suffixes = word_suffixes(wordlist)
+
+        # Специальные префиксы отдельных доменов проверяем только для них
+        extras = {}
+        zones = set()
+        for domain in self.domains:
+            domain_extras = extend_wordlist(domain, wordlist).extras
+            if len(domain_extras):
+                extras[domain] = domain_extras
+            zones |= {f"{suffix}.{domain}" for suffix in suffixes}
+            zones |= parent_zones(domain, domain_extras)
+
+        total = len(wordlist) * len(self.domains) + sum(map(len, extras.values()))
+        logger.info(
+            f"Перебор {len(self.domains)} доменов: {total} имен, "
+            f"до {self.concurrency} запросов одновременно"
+        )
+
+        for name in iter_names_async(
+            self._brute_force_names(wordlist, extras),
+            zones,
+            total,
+            self.concurrency,
+            self.adaptive,
+            self.filter_wildcard,
+        ):
+            domain = self._owner(name)
+            if domain is not None:
+                yield domain, name
+
+    def _passive_methods(self, domain, results):
+        """Zone Transfer и Certificate Transparency для одного домена"""
+        methods = [
+            (SOURCE_ZONE_TRANSFER, iter_zone_transfer, "через Zone Transfer"),
+            (
+                SOURCE_CERTIFICATE_TRANSPARENCY,
+                iter_certificate_transparency,
+                "через Certificate Transparency",
+            ),
+        ]
+        for source, method, title in methods:
+            try:
+                for subdomain in method(domain):
+                    results.put((domain, subdomain, source))
+            except Exception as e:
+                logger.error(f"Ошибка при сканировании {domain} {title}: {e}")
+
+    def iter_scan(self):
+        """
+        Генератор: сканирует все домены и выдает новые поддомены по мере обнаружения
+
+        Yields:
+            tuple: (домен, поддомен, источник)
+        """
+        logger.info(f"Запуск пакетного сканирования {len(self.domains)} доменов")
+        results = queue.Queue(maxsize=10000)
+        finished = object()
+
+        def brute_force():
+            try:
+                for domain, subdomain in self.iter_brute_force():
+                    results.put((domain, subdomain, SOURCE_BRUTE_FORCE))
+            except Exception as e:
+                logger.error(f"Ошибка при сканировании методом перебора: {e}")
+            finally:
+                results.put(finished)
+
+        def passive():
+            try:
+                with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                    for domain in self.domains:
+                        executor.submit(self._passive_methods, domain, results)
+            finally:
+                results.put(finished)
+
+        for target in (brute_force, passive):
+            threading.Thread(target=target, daemon=True).start()
+
+        running = 2
+        while running:
+            item = results.get()
+            if item is finished:
+                running -= 1
+                continue
+            domain, subdomain, source = item
+            if subdomain not in self.found_subdomains[domain]:
+                self.found_subdomains[domain].add(subdomain)
+                yield domain, subdomain, source
+
+        self._log_summary()
+
+    def scan_all(self):
+        """Сканирует все домены, возвращает словарь домен -> отсортированный список"""
+        for _ in self.iter_scan():
+            pass
+        return {
+            domain: sorted(subdomains)
+            for domain, subdomains in self.found_subdomains.items()
+        }
+
+    def _log_summary(self):
+        """Выводит итоговую статистику пакетного сканирования"""
+        get_scheduler().log_stats()
+
+        cache_stats = get_cache().stats()
+        logger.info(
+            f"Кэш DNS: {cache_stats['hits']} попаданий, {cache_stats['misses']} промахов "
+            f"({cache_stats['hit_rate']:.0%}), записей в памяти: {cache_stats['entries']}"
+        )
+        budget = get_budget()
+        if budget.limit is not None:
+            logger.info(
+                f"Бюджет DNS-запросов: максимум {budget.peak} из {budget.limit} в полете"
+            )
+
+        total = sum(map(len, self.found_subdomains.values()))
+        logger.info(
+            f"Пакетное сканирование завершено: {total} поддоменов "
+            f"для {len(self.domains)} доменов"
+        )
+
+    def save_results(self, finds_dir="finds", no_filter_wildcards=False):
+        """
+        Сохраняет результаты каждого домена в отдельный файл
+
+        Returns:
+            int: Количество записанных файлов
+        """
+        saved = 0
+        for domain, subdomains in self.found_subdomains.items():
+            if not subdomains:
+                continue
+            if save_results(
+                sorted(subdomains),
+                domain_output_file(domain, finds_dir),
+                no_filter_wildcards,
+            ):
+                saved += 1
+        return saved
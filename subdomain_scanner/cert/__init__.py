@@ -2,4 +2,7 @@
 Модуль для работы с Certificate Transparency и другими методами, связанными с сертификатами
 """
 
-from .certificate_transparency import search_certificate_transparency
+from .certificate_transparency import (
+    search_certificate_transparency,
+    iter_certificate_transparency,
+)
@@ -0,0 +1,116 @@
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def reverse_name(name):
+    """dev.example.com -> com.example.dev"""
+    return ".".join(reversed(name.lower().rstrip(".").split(".")))
+
+
+class CTIndex:
+    """
+    Локальный индекс имен из зеркала журналов CT (SQLite)
+
+    Имена хранятся с обратным порядком меток (com.example.dev) в таблице,
+    упорядоченной по этому ключу, поэтому все имена под доменом - это
+    один непрерывный диапазон ключей, который читается за миллисекунды
+    независимо от размера индекса.
+    """
+
+    def __init__(self, db_path, offline=False):
+        """
+        Args:
+            db_path (str): Путь к файлу SQLite
+            offline (bool): Искать поддомены только в индексе, без запросов
+                к онлайн-источникам (crt.sh, CertSpotter, ...)
+        """
+        self.db_path = db_path
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS names (rname TEXT PRIMARY KEY) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS logs (url TEXT PRIMARY KEY, position INTEGER);"
+        )
+        self._db.commit()
+
+    def add_names(self, names):
+        """
+        Добавляет имена в индекс
+
+        Returns:
+            int: Число новых имен
+        """
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO names VALUES (?)",
+                ((reverse_name(name),) for name in names),
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def names_under(self, domain):
+        """
+        Все имена под доменом (без самого домена)
+
+        Args:
+            domain (str): Домен, например example.com
+
+        Returns:
+            list: Имена в обычном порядке меток
+        """
+        prefix = reverse_name(domain) + "."
+        # "/" - следующий за "." символ: диапазон [prefix, prefix без точки + "/")
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT rname FROM names WHERE rname >= ? AND rname < ?",
+                (prefix, prefix[:-1] + "/"),
+            ).fetchall()
+        return [reverse_name(row[0]) for row in rows]
+
+    def count(self):
+        """Число имен в индексе"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+
+    def position(self, log_url):
+        """Индекс первой еще не загруженной записи журнала"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT position FROM logs WHERE url = ?", (log_url,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def set_position(self, log_url, position):
+        """Запоминает, что записи журнала до position загружены"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO logs VALUES (?, ?)", (log_url, position)
+            )
+            self._db.commit()
+
+    def close(self):
+        """Закрывает базу данных"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_index = None
+
+
+def get_ct_index():
+    """Возвращает общий локальный индекс CT (None - не используется)"""
+    return _index
+
+
+def set_ct_index(index):
+    """Задает общий локальный индекс CT"""
+    global _index
+    _index = index
+    return index
@@ -0,0 +1,171 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+from .x509 import leaf_names
+
+logger = logging.getLogger(__name__)
+
+
+class CTLogMirror:
+    """
+    Загрузка записей журнала CT (RFC 6962, get-entries) в локальный индекс
+
+    Диапазон записей делится на пакеты по batch_size, которые загружаются
+    и разбираются одновременно в max_workers потоках; имена из subjectAltName
+    добавляются в CTIndex. Позиция загрузки сохраняется в индексе, поэтому
+    следующая синхронизация продолжает с первой незагруженной записи.
+    """
+
+    def __init__(
+        self, log_url, index, batch_size=256, max_workers=8, timeout=30.0, retries=3
+    ):
+        """
+        Args:
+            log_url (str): Адрес журнала, например https://ct.example/logs/2025/
+                (или локальный сервер с записанными ответами get-entries)
+            index (CTIndex): Индекс для найденных имен
+            batch_size (int): Записей в одном запросе get-entries
+            max_workers (int): Одновременных запросов
+            timeout (float): Таймаут одного запроса в секундах
+            retries (int): Повторов запроса при таймауте, 429 и 5xx
+        """
+        self.log_url = log_url.rstrip("/") + "/"
+        self.index = index
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get(self, method, **params):
+        """Запрос к API журнала с повторами"""
+        url = f"{self.log_url}ct/v1/{method}"
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(2 ** (attempt - 1) * random.uniform(1, 1.5))
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                error = f"статус {response.status_code}"
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+            logger.debug(f"{url}: попытка {attempt + 1} не удалась: {error}")
+        raise requests.RequestException(f"{url}: {error}")
+
+    def close(self):
+        """Закрывает HTTP-сессию"""
+        self.session.close()
+
+    def tree_size(self):
+        """Число записей в журнале (get-sth)"""
+        return int(self._get("get-sth")["tree_size"])
+
+    def fetch_batch(self, start, end):
+        """
+        Загружает записи [start, end) и извлекает из них имена
+
+        Журнал может вернуть меньше записей, чем запрошено, - тогда
+        остаток запрашивается снова.
+
+        Returns:
+            tuple: (множество имен, число поврежденных записей)
+        """
+        names = set()
+        broken = 0
+        position = start
+        while position < end:
+            entries = self._get("get-entries", start=position, end=end - 1).get(
+                "entries", []
+            )
+            if not entries:
+                raise requests.RequestException(
+                    f"журнал не вернул записи с {position} по {end - 1}"
+                )
+            for entry in entries:
+                try:
+                    names.update(leaf_names(entry["leaf_input"]))
+                except (KeyError, ValueError) as e:
+                    broken += 1
+                    logger.debug(f"Запись {position} журнала пропущена: {e}")
+                position += 1
+        return names, broken
+
+    def sync(self, limit=None):
+        """
+        Загружает новые записи журнала в индекс
+
+        Args:
+            limit (int, optional): Загрузить не более limit записей
+
+        Returns:
+            int: Число загруженных записей
+        """
+        start = self.index.position(self.log_url)
+        end = self.tree_size()
+        if limit is not None:
+            end = min(end, start + limit)
+        if start >= end:
+            logger.info(f"{self.log_url}: новых записей нет")
+            return 0
+
+        logger.info(f"{self.log_url}: загрузка записей с {start} по {end - 1}")
+        batches = iter(range(start, end, self.batch_size))
+        done = set()
+        position = start
+        new_names = 0
+        broken = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            with tqdm(total=end - start, desc="Загрузка журнала CT") as pbar:
+                pending = {}
+                while True:
+                    # Не больше двух пакетов на поток в работе одновременно
+                    while len(pending) < self.max_workers * 2:
+                        batch = next(batches, None)
+                        if batch is None:
+                            break
+                        batch_end = min(batch + self.batch_size, end)
+                        future = executor.submit(self.fetch_batch, batch, batch_end)
+                        pending[future] = (batch, batch_end)
+                    if not pending:
+                        break
+
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        batch, batch_end = pending.pop(future)
+                        try:
+                            names, batch_broken = future.result()
+                        except Exception:
+                            # Сохраняем непрерывно загруженную часть
+                            for other in pending:
+                                other.cancel()
+                            self.index.set_position(self.log_url, position)
+                            raise
+                        new_names += self.index.add_names(names)
+                        broken += batch_broken
+                        done.add(batch)
+                        pbar.update(batch_end - batch)
+
+                    # Позиция продвигается только по непрерывному ряду пакетов
+                    while position in done:
+                        done.discard(position)
+                        position = min(position + self.batch_size, end)
+                    self.index.set_position(self.log_url, position)
+
+        logger.info(
+            f"{self.log_url}: загружено {end - start} записей, "
+            f"новых имен: {new_names}, поврежденных записей: {broken}"
+        )
+        return end - start
@@ -0,0 +1,175 @@
+import codecs
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Наибольший допустимый размер одного элемента массива (защита от
+# бесконечного накопления буфера при поврежденном ответе)
+MAX_ELEMENT_SIZE = 16 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JSONArrayStream:
+    """
+    Потоковый разбор JSON-массива верхнего уровня: [{...}, {...}, ...]
+
+    Данные передаются частями через feed(); каждый элемент разбирается, как
+    только он получен целиком, поэтому в памяти находится только текущая
+    часть ответа и недоразобранный элемент, а не весь массив.
+    """
+
+    def __init__(self, max_element_size=MAX_ELEMENT_SIZE):
+        """
+        Args:
+            max_element_size (int): Максимальный размер одного элемента в символах
+        """
+        self.max_element_size = max_element_size
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._state = "start"  # start -> value <-> separator -> done
+        self.count = 0
+
+    @property
+    def done(self):
+        """Массив закрыт"""
+        return self._state == "done"
+
+    def feed(self, data):
+        """
+        Добавляет часть ответа
+
+        Args:
+            data (bytes): Очередная часть тела ответа
+
+        Returns:
+            list: Элементы массива, полученные целиком в этой части
+
+        Raises:
+            ValueError: Ответ не является JSON-массивом
+        """
+        self._buffer += self._text.decode(data)
+        items = []
+        position = 0
+        buffer = self._buffer
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer) or self._state == "done":
+                break
+
+            char = buffer[position]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError("ответ не является JSON-массивом")
+                self._state = "value"
+                position += 1
+            elif self._state == "separator":
+                if char == ",":
+                    self._state = "value"
+                elif char == "]":
+                    self._state = "done"
+                else:
+                    raise ValueError(f"ожидалась запятая, получено {char!r}")
+                position += 1
+            elif char == "]" and self.count == 0:
+                # Пустой массив
+                self._state = "done"
+                position += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Элемент еще не получен целиком
+                    if len(buffer) - position > self.max_element_size:
+                        raise ValueError("слишком большой элемент JSON-массива")
+                    break
+                # Число на границе частей могло быть разобрано не полностью
+                if isinstance(item, (int, float)) and (
+                    end == len(buffer) or buffer[end] in _NUMBER_CHARS
+                ):
+                    break
+                items.append(item)
+                self.count += 1
+                self._state = "separator"
+                position = end
+
+        self._buffer = buffer[position:]
+        return items
+
+    def close(self):
+        """
+        Проверяет, что ответ закончился вместе с массивом
+
+        Raises:
+            ValueError: Ответ оборвался внутри массива
+        """
+        self._buffer += self._text.decode(b"", final=True)
+        if self._state != "done" or self._buffer.strip():
+            raise ValueError(
+                f"JSON-массив оборван после {self.count} элементов"
+                if self._state != "done"
+                else "лишние данные после JSON-массива"
+            )
+
+
+def iter_json_array(chunks):
+    """
+    Генератор элементов JSON-массива из последовательности частей ответа
+
+    Args:
+        chunks (iterable): Части тела ответа (bytes), например
+            response.iter_content() при stream=True
+    """
+    stream = JSONArrayStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    stream.close()
+
+
+def iter_entry_names(entries, field):
+    """
+    Генератор имен из записей логов сертификатов
+
+    Args:
+        entries (iterable): Записи (словари)
+        field (str): Поле с именами: строка с именами через перевод строки
+            (name_value у crt.sh) или список (dns_names у CertSpotter)
+    """
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        yield from _entry_names(entry.get(field))
+
+
+def iter_entry_issuances(entries, field, id_field="id"):
+    """
+    Генератор выпусков сертификатов: (id записи, список имен)
+
+    Записи без id отдаются с id None - их нельзя пропустить при
+    повторном опросе, но имена из них не теряются.
+
+    Args:
+        entries (iterable): Записи (словари)
+        field (str): Поле с именами (как в iter_entry_names)
+        id_field (str): Поле с идентификатором записи
+    """
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        cert_id = entry.get(id_field)
+        yield (
+            None if cert_id is None else str(cert_id),
+            list(_entry_names(entry.get(field))),
+        )
+
+
+def _entry_names(value):
+    """Имена из значения поля записи"""
+    if isinstance(value, str):
+        yield from value.split("\n")
+    elif isinstance(value, list):
+        yield from (name for name in value if isinstance(name, str))
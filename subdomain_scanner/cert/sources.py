@@ -0,0 +1,471 @@
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .json_stream import iter_json_array, iter_entry_issuances
+from .state import get_ct_state
+
+logger = logging.getLogger(__name__)
+
+# Размер части ответа при потоковом чтении
+CHUNK_SIZE = 64 * 1024
+
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+
+class SourceError(Exception):
+    """Ошибка запроса к источнику"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RateLimiter:
+    """Не чаще одного запроса в interval секунд (общий для всех потоков)"""
+
+    def __init__(self, interval=0.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        """Ждет, пока можно отправить следующий запрос"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class CTSource(ABC):
+    """
+    Источник имен из логов сертификатов (и похожих сервисов)
+
+    Подкласс обязан задать запросы (urls) и разбор ответа (parse) - иначе
+    его экземпляр не создается; повторы, таймауты, ограничение частоты
+    и сбор статистики выполняет CTRunner.
+
+    parse может отдавать как отдельные имена, так и выпуски сертификатов
+    (id, список имен): выпуски, уже обработанные в прошлых запусках,
+    пропускаются. Источник с incremental = True принимает курсор - id
+    последнего полученного выпуска - и отдает только более новые выпуски
+    страницами (не более max_pages за запуск).
+    """
+
+    name = "source"
+    timeout = 10.0  # Таймаут одного запроса в секундах
+    retries = 2  # Повторов при таймауте, 429 и 5xx
+    backoff = 1.0  # Пауза перед первым повтором, далее удваивается
+    interval = 0.0  # Минимальный интервал между запросами к источнику
+    incremental = False  # urls принимает курсор
+    max_pages = 1  # Максимум страниц за запуск для incremental
+    headers = {}
+
+    def __init__(self):
+        self.limiter = RateLimiter(self.interval)
+
+    def applies(self, domain):
+        """Используется ли источник для домена"""
+        return True
+
+    @abstractmethod
+    def urls(self, domain):
+        """
+        Адреса запросов для домена
+
+        Источник с incremental = True принимает также cursor (id последнего
+        полученного выпуска или None) и возвращает один адрес - страницу
+        выпусков после курсора.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def parse(self, response, domain):
+        """
+        Генератор имен или выпусков (id, имена) из ответа
+        (response получен с stream=True)
+        """
+        raise NotImplementedError
+
+
+class CrtShSource(CTSource):
+    """crt.sh: JSON-массив записей с name_value (имена через перевод строки)"""
+
+    name = "crt.sh"
+    interval = 1.0
+
+    def urls(self, domain):
+        return [f"https://crt.sh/?q=%.{domain}&output=json"]
+
+    def parse(self, response, domain):
+        # Ответ может занимать сотни мегабайт - разбираем его потоково
+        entries = iter_json_array(response.iter_content(CHUNK_SIZE))
+        yield from iter_entry_issuances(entries, "name_value")
+
+
+class CertSpotterSource(CTSource):
+    """
+    CertSpotter: JSON-массив выпусков с dns_names по возрастанию id;
+    параметр after возвращает выпуски после указанного id
+    """
+
+    name = "CertSpotter"
+    interval = 1.0
+    incremental = True
+    max_pages = 10
+
+    def urls(self, domain, cursor=None):
+        url = (
+            f"https://api.certspotter.com/v1/issuances?domain={domain}"
+            "&include_subdomains=true&expand=dns_names"
+        )
+        if cursor is not None:
+            url += f"&after={cursor}"
+        return [url]
+
+    def parse(self, response, domain):
+        entries = iter_json_array(response.iter_content(CHUNK_SIZE))
+        yield from iter_entry_issuances(entries, "dns_names")
+
+
+def _find_names(domain, content):
+    """Имена домена в произвольном тексте"""
+    domain_pattern = domain.replace(".", "\\.")
+    return re.findall(r"([a-zA-Z0-9.-]+\." + domain_pattern + r")", content)
+
+
+class FacebookCTSource(CTSource):
+    """Страница поиска Facebook CT - для facebook.com и fbcdn.net"""
+
+    name = "Facebook CT"
+    headers = {"User-Agent": BROWSER_USER_AGENT}
+
+    def applies(self, domain):
+        return "facebook.com" in domain or "fbcdn.net" in domain
+
+    def urls(self, domain):
+        return [f"https://developers.facebook.com/tools/ct/search?q=%.{domain}"]
+
+    def parse(self, response, domain):
+        # Парсим результаты из HTML (упрощенно)
+        return _find_names(domain, response.text)
+
+
+class GoogleCTSource(CTSource):
+    """Google Transparency Report - для доменов Google и YouTube"""
+
+    name = "Google CT"
+    headers = {"User-Agent": BROWSER_USER_AGENT}
+    domains = ("youtube.com", "googlevideo.com", "ggpht.com", "ytimg.com", "google.com")
+
+    def applies(self, domain):
+        return any(item in domain for item in self.domains)
+
+    def urls(self, domain):
+        return [
+            "https://transparencyreport.google.com/transparencyreport/api/v3/"
+            f"httpsreport/ct/certsearch?include_subdomains=true&domain={domain}"
+        ]
+
+    def parse(self, response, domain):
+        content = response.text
+        if content.startswith(")]}'\n"):
+            content = content[5:]  # Убираем префикс защиты от XSS
+
+        try:
+            data = json.loads(content)
+        except ValueError:
+            # Если не получилось через JSON, используем регулярное выражение
+            yield from _find_names(domain, content)
+            return
+        if isinstance(data, list) and len(data) > 1 and isinstance(data[1], list):
+            for item in data[1]:
+                if isinstance(item, list) and len(item) > 1:
+                    if isinstance(item[1], str):
+                        yield item[1]
+
+
+class YouTubeCDNSource(CTSource):
+    """Адреса узлов googlevideo.com из страниц и API YouTube"""
+
+    name = "YouTube CDN"
+    timeout = 5.0
+    retries = 0
+    headers = {"User-Agent": BROWSER_USER_AGENT}
+    video_ids = ["dQw4w9WgXcQ", "9bZkp7q19f0", "jNQXAC9IVRw", "kJQP7kiw5Fk"]
+    _url_pattern = re.compile(
+        r"https?://r[0-9]+\.sn-[a-z0-9-]+\.googlevideo\.com/[a-zA-Z0-9?=&%_/.-]+"
+    )
+    _host_pattern = re.compile(r"//([^/]+)\.googlevideo\.com")
+
+    def applies(self, domain):
+        return "googlevideo.com" in domain
+
+    def urls(self, domain):
+        urls = []
+        for video_id in self.video_ids:
+            urls.extend(
+                [
+                    f"https://www.youtube.com/get_video_info?video_id={video_id}",
+                    "https://www.youtube.com/oembed?url=https://www.youtube.com/"
+                    f"watch?v={video_id}&format=json",
+                    "https://www.googleapis.com/youtube/v3/videos"
+                    f"?part=contentDetails&id={video_id}",
+                ]
+            )
+        urls.append("https://www.youtube.com/embed/dQw4w9WgXcQ")
+        return urls
+
+    def parse(self, response, domain):
+        for cdn_url in self._url_pattern.findall(response.text):
+            match = self._host_pattern.search(cdn_url)
+            if match:
+                yield f"{match.group(1)}.googlevideo.com"
+
+
+# Источники по умолчанию (экземпляры общие, чтобы ограничение частоты
+# действовало и при одновременном сканировании нескольких доменов)
+DEFAULT_SOURCES = [
+    CrtShSource(),
+    CertSpotterSource(),
+    FacebookCTSource(),
+    GoogleCTSource(),
+    YouTubeCDNSource(),
+]
+
+
+class SourceStats:
+    """Итоги опроса одного источника для одного домена"""
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.names = 0
+        self.known = 0
+        self.fresh = False
+        self.seconds = 0.0
+        self.errors = []
+
+    def summary(self):
+        if self.fresh:
+            return f"{self.name}: опрашивался недавно, имена взяты из базы"
+        text = (
+            f"{self.name}: {self.names} имен за {self.seconds:.1f} с "
+            f"({self.requests} запросов)"
+        )
+        if self.known:
+            text += f", пропущено известных сертификатов: {self.known}"
+        if self.errors:
+            text += f", ошибок: {len(self.errors)} (последняя: {self.errors[-1]})"
+        return text
+
+
+class CTRunner:
+    """
+    Одновременный опрос источников через общий пул HTTP-соединений
+
+    Каждый источник работает в своем потоке; запросы повторяются при
+    таймауте, 429 и 5xx с экспоненциальной паузой; частота запросов
+    к источнику ограничена его RateLimiter.
+
+    Если задано состояние (set_ct_state), опрос инкрементальный: курсоры
+    и id обработанных сертификатов берутся из базы, источники без курсора
+    опрашиваются не чаще раза в CTState.refresh секунд, а найденные имена
+    добавляются к сохраненным и отдаются вместе с ними.
+    """
+
+    def __init__(self, sources=None, max_workers=8):
+        """
+        Args:
+            sources (list, optional): Источники (по умолчанию DEFAULT_SOURCES)
+            max_workers (int): Максимум одновременно опрашиваемых источников
+        """
+        self.sources = DEFAULT_SOURCES if sources is None else sources
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_workers * 4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _fetch(self, source, url, domain, emit, stats):
+        """
+        Один адрес источника с повторами
+
+        Returns:
+            bool: Ответ получен и разобран
+        """
+        for attempt in range(source.retries + 1):
+            if attempt:
+                time.sleep(source.backoff * 2 ** (attempt - 1) * random.uniform(1, 1.5))
+            source.limiter.wait()
+            stats.requests += 1
+            try:
+                with self.session.get(
+                    url,
+                    timeout=source.timeout,
+                    headers=source.headers,
+                    stream=True,
+                ) as response:
+                    if response.status_code != 200:
+                        raise SourceError(
+                            f"статус {response.status_code}",
+                            retryable=response.status_code == 429
+                            or response.status_code >= 500,
+                        )
+                    for item in source.parse(response, domain):
+                        emit(item)
+                return True
+            except SourceError as e:
+                error = e
+                if not e.retryable:
+                    break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception as e:
+                # Ошибка разбора ответа - повтор не поможет
+                error = e
+                break
+            logger.debug(f"{source.name}: попытка {attempt + 1} не удалась: {error}")
+        stats.errors.append(str(error))
+        return False
+
+    def _run_source(self, source, domain, results, state):
+        stats = SourceStats(source.name)
+        started = time.monotonic()
+        if state is not None and not source.incremental:
+            if state.is_fresh(domain, source.name):
+                stats.fresh = True
+                return stats
+
+        # id сертификатов этого запуска; известность по прошлым запускам
+        # проверяется запросом к базе, а не загрузкой всех id в память
+        seen = set()
+        check_state = state is not None and not source.incremental
+        found = set()
+        last_id = [None]
+
+        def emit(item):
+            if isinstance(item, str):
+                names = [item]
+            else:
+                cert_id, names = item
+                if cert_id is not None:
+                    last_id[0] = cert_id
+                    if cert_id in seen:
+                        return
+                    seen.add(cert_id)
+                    if check_state and state.is_seen(domain, source.name, cert_id):
+                        stats.known += 1
+                        return
+            for name in names:
+                if name.endswith(domain) and name != domain:
+                    stats.names += 1
+                    found.add(name)
+                    results.put((source.name, name))
+
+        cursor = None
+        try:
+            if source.incremental:
+                if state is not None:
+                    cursor = state.cursor(domain, source.name)
+                # Страницы выпусков после курсора, пока они не закончатся
+                for _ in range(source.max_pages):
+                    last_id[0] = None
+                    (url,) = source.urls(domain, cursor)
+                    if not self._fetch(source, url, domain, emit, stats):
+                        break
+                    if last_id[0] is None or last_id[0] == cursor:
+                        break
+                    cursor = last_id[0]
+            else:
+                for url in source.urls(domain):
+                    self._fetch(source, url, domain, emit, stats)
+        except Exception as e:
+            stats.errors.append(str(e))
+
+        if state is not None:
+            state.add_names(domain, found)
+            state.update_source(
+                domain,
+                source.name,
+                cursor,
+                seen if check_state else (),
+                complete=not stats.errors,
+            )
+        stats.seconds = time.monotonic() - started
+        return stats
+
+    def iter_names(self, domain):
+        """
+        Генератор: опрашивает все подходящие источники одновременно
+
+        Yields:
+            tuple: (имя источника, найденное имя) по мере получения; при
+                   заданном состоянии затем ("база", имя) для сохраненных имен
+        """
+        state = get_ct_state()
+        sources = [source for source in self.sources if source.applies(domain)]
+        # Очередь без ограничения: потоки источников не должны блокироваться,
+        # если потребитель прекратил чтение
+        results = queue.Queue()
+        finished = object()
+        all_stats = []
+
+        def run(source):
+            try:
+                all_stats.append(self._run_source(source, domain, results, state))
+            finally:
+                results.put(finished)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for source in sources:
+                executor.submit(run, source)
+            running = len(sources)
+            while running:
+                item = results.get()
+                if item is finished:
+                    running -= 1
+                    continue
+                yield item
+
+        for stats in all_stats:
+            if stats.errors and not stats.names:
+                logger.warning(stats.summary())
+            else:
+                logger.info(stats.summary())
+
+        if state is not None:
+            # Имена из прошлых запусков (и пропущенных сертификатов)
+            stored = state.names(domain)
+            logger.info(f"Сохраненных имен из логов сертификатов: {len(stored)}")
+            for name in stored:
+                yield "база", name
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_ct_runner():
+    """Общий CTRunner с источниками по умолчанию"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CTRunner()
+        return _runner
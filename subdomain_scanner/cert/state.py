@@ -0,0 +1,151 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CTState:
+    """
+    Локальное состояние опроса логов сертификатов между запусками (SQLite)
+
+    Для каждого домена хранятся найденные имена, а для каждой пары
+    (домен, источник) - курсор (например, id последнего выпуска CertSpotter),
+    id уже обработанных сертификатов и время последнего успешного опроса.
+
+    id сертификатов нужны только источникам без курсора (crt.sh), которые
+    каждый раз отдают все сертификаты: хранятся лишь id из последнего
+    полного ответа, остальные удаляются при сохранении результата опроса.
+    """
+
+    def __init__(self, db_path, refresh=7 * 86400):
+        """
+        Args:
+            db_path (str): Путь к файлу SQLite
+            refresh (float): Через сколько секунд источник без курсора
+                (crt.sh) опрашивается заново; до этого имена берутся из базы
+        """
+        self.db_path = db_path
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS ct_names ("
+            "domain TEXT NOT NULL, name TEXT NOT NULL, PRIMARY KEY (domain, name));"
+            "CREATE TABLE IF NOT EXISTS ct_sources ("
+            "domain TEXT NOT NULL, source TEXT NOT NULL, cursor TEXT, "
+            "fetched_at REAL, PRIMARY KEY (domain, source));"
+            "CREATE TABLE IF NOT EXISTS ct_seen ("
+            "domain TEXT NOT NULL, source TEXT NOT NULL, cert_id TEXT NOT NULL, "
+            "seen_at REAL NOT NULL DEFAULT 0, PRIMARY KEY (domain, source, cert_id));"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(ct_seen)")]
+        if "seen_at" not in columns:
+            # База предыдущей версии
+            self._db.execute(
+                "ALTER TABLE ct_seen ADD COLUMN seen_at REAL NOT NULL DEFAULT 0"
+            )
+        self._db.commit()
+
+    def cursor(self, domain, source):
+        """Сохраненный курсор источника для домена (None - опроса еще не было)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cursor FROM ct_sources WHERE domain = ? AND source = ?",
+                (domain, source),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, domain, source):
+        """Опрашивался ли источник успешно не ранее refresh секунд назад"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fetched_at FROM ct_sources WHERE domain = ? AND source = ?",
+                (domain, source),
+            ).fetchone()
+        return bool(row and row[0] and time.time() - row[0] < self.refresh)
+
+    def is_seen(self, domain, source, cert_id):
+        """Обработан ли сертификат в прошлых запусках (поиск по первичному ключу)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM ct_seen WHERE domain = ? AND source = ? AND cert_id = ?",
+                (domain, source, cert_id),
+            ).fetchone()
+        return row is not None
+
+    def update_source(self, domain, source, cursor, cert_ids, complete):
+        """
+        Сохраняет результат опроса источника
+
+        Args:
+            cursor (str): Новый курсор (None - без курсора)
+            cert_ids (iterable): id всех сертификатов из ответа источника
+                без курсора (для источника с курсором - пусто)
+            complete (bool): Опрос прошел без ошибок - запоминаем его время
+                и удаляем id сертификатов, которых больше нет в ответе
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO ct_seen VALUES (?, ?, ?, ?)",
+                ((domain, source, str(cert_id), now) for cert_id in cert_ids),
+            )
+            if complete:
+                self._db.execute(
+                    "DELETE FROM ct_seen WHERE domain = ? AND source = ? "
+                    "AND seen_at < ?",
+                    (domain, source, now),
+                )
+            row = self._db.execute(
+                "SELECT fetched_at FROM ct_sources WHERE domain = ? AND source = ?",
+                (domain, source),
+            ).fetchone()
+            fetched_at = now if complete else (row[0] if row else None)
+            self._db.execute(
+                "INSERT OR REPLACE INTO ct_sources VALUES (?, ?, ?, ?)",
+                (domain, source, cursor, fetched_at),
+            )
+            self._db.commit()
+
+    def add_names(self, domain, names):
+        """Добавляет найденные имена домена"""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO ct_names VALUES (?, ?)",
+                ((domain, name) for name in names),
+            )
+            self._db.commit()
+
+    def names(self, domain):
+        """Все сохраненные имена домена"""
+        with self._lock:
+            return [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT name FROM ct_names WHERE domain = ?", (domain,)
+                )
+            ]
+
+    def close(self):
+        """Закрывает базу данных"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_state = None
+
+
+def get_ct_state():
+    """Возвращает общее состояние опроса логов сертификатов (None - не хранится)"""
+    return _state
+
+
+def set_ct_state(state):
+    """Задает общее состояние опроса логов сертификатов"""
+    global _state
+    _state = state
+    return state
@@ -0,0 +1,138 @@
+import base64
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Теги DER
+_SEQUENCE = 0x30
+_OCTET_STRING = 0x04
+_OID = 0x06
+_EXTENSIONS = 0xA3  # [3] EXPLICIT в TBSCertificate
+_DNS_NAME = 0x82  # [2] IMPLICIT IA5String в GeneralName
+
+# OID 2.5.29.17 (subjectAltName) в DER
+_SAN_OID = bytes([0x55, 0x1D, 0x11])
+
+# Типы записей журнала RFC 6962 (LogEntryType)
+X509_ENTRY = 0
+PRECERT_ENTRY = 1
+
+
+def _read_tlv(data, offset):
+    """
+    Читает один элемент DER
+
+    Returns:
+        tuple: (тег, начало значения, конец значения)
+
+    Raises:
+        ValueError: Элемент оборван или длина в неподдерживаемой форме
+    """
+    if offset + 2 > len(data):
+        raise ValueError("оборванный элемент DER")
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        if size == 0 or size > 4 or offset + size > len(data):
+            raise ValueError("неподдерживаемая длина элемента DER")
+        length = int.from_bytes(data[offset : offset + size], "big")
+        offset += size
+    end = offset + length
+    if end > len(data):
+        raise ValueError("оборванный элемент DER")
+    return tag, offset, end
+
+
+def _children(data, start, end):
+    """Генератор вложенных элементов: (тег, начало, конец)"""
+    while start < end:
+        tag, value_start, value_end = _read_tlv(data, start)
+        yield tag, value_start, value_end
+        start = value_end
+
+
+def tbs_names(tbs):
+    """
+    DNS-имена из расширения subjectAltName
+
+    Args:
+        tbs (bytes): TBSCertificate в DER
+
+    Returns:
+        list: Имена в нижнем регистре (пустой список, если расширения нет)
+    """
+    tag, start, end = _read_tlv(tbs, 0)
+    if tag != _SEQUENCE:
+        raise ValueError("TBSCertificate не является SEQUENCE")
+    for tag, ext_start, ext_end in _children(tbs, start, end):
+        if tag != _EXTENSIONS:
+            continue
+        _, seq_start, seq_end = _read_tlv(tbs, ext_start)
+        for _, item_start, item_end in _children(tbs, seq_start, seq_end):
+            fields = list(_children(tbs, item_start, item_end))
+            if not fields or fields[0][0] != _OID:
+                continue
+            if tbs[fields[0][1] : fields[0][2]] != _SAN_OID:
+                continue
+            # extnValue - последнее поле (перед ним может быть critical)
+            tag, value_start, value_end = fields[-1]
+            if tag != _OCTET_STRING:
+                return []
+            _, names_start, names_end = _read_tlv(tbs, value_start)
+            return [
+                tbs[name_start:name_end].decode("ascii", "replace").lower()
+                for tag, name_start, name_end in _children(tbs, names_start, names_end)
+                if tag == _DNS_NAME
+            ]
+    return []
+
+
+def certificate_names(der):
+    """
+    DNS-имена из subjectAltName сертификата
+
+    Args:
+        der (bytes): Сертификат X.509 в DER
+    """
+    tag, start, _ = _read_tlv(der, 0)
+    if tag != _SEQUENCE:
+        raise ValueError("сертификат не является SEQUENCE")
+    _, _, tbs_end = _read_tlv(der, start)
+    return tbs_names(der[start:tbs_end])
+
+
+def leaf_names(leaf_input):
+    """
+    DNS-имена из записи журнала CT (leaf_input ответа get-entries, RFC 6962)
+
+    MerkleTreeLeaf содержит либо сертификат (x509_entry), либо
+    TBSCertificate предсертификата (precert_entry) - в обоих случаях
+    имена берутся из subjectAltName.
+
+    Args:
+        leaf_input (str): MerkleTreeLeaf в base64
+
+    Raises:
+        ValueError: Запись повреждена или имеет неизвестный формат
+    """
+    leaf = base64.b64decode(leaf_input)
+    if len(leaf) < 15:
+        raise ValueError("слишком короткая запись журнала")
+    version, leaf_type, _, entry_type = struct.unpack(">BBQH", leaf[:12])
+    if version != 0 or leaf_type != 0:
+        raise ValueError(f"неизвестная версия записи журнала: {version}/{leaf_type}")
+    offset = 12
+    if entry_type == PRECERT_ENTRY:
+        offset += 32  # issuer_key_hash
+    elif entry_type != X509_ENTRY:
+        raise ValueError(f"неизвестный тип записи журнала: {entry_type}")
+    length = int.from_bytes(leaf[offset : offset + 3], "big")
+    body = leaf[offset + 3 : offset + 3 + length]
+    if len(body) != length:
+        raise ValueError("оборванная запись журнала")
+    if entry_type == PRECERT_ENTRY:
+        return tbs_names(body)
+    return certificate_names(body)
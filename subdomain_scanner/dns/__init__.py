@@ -2,5 +2,23 @@
 Модуль для работы с DNS-методами обнаружения поддоменов
 """
 
-from .zone_transfer import try_zone_transfer
-from .brute_force import find_subdomains, check_subdomain, load_wordlist
+from .zone_transfer import try_zone_transfer, iter_zone_transfer, iter_zone_records
+from .brute_force import (
+    find_subdomains,
+    iter_subdomains,
+    check_subdomain,
+    load_wordlist,
+    extend_wordlist,
+)
+from .wordlist import (
+    compile_wordlist,
+    open_wordlist,
+    iter_wordlist,
+    set_wordlist_dedup,
+)
+from .async_engine import (
+    AsyncDNSEngine,
+    find_subdomains_async,
+    iter_subdomains_async,
+    iter_names_async,
+)
@@ -0,0 +1,752 @@
+import asyncio
+import functools
+import itertools
+import logging
+import queue
+import random
+import socket
+import struct
+import threading
+from tqdm import tqdm
+
+from .zone_transfer import PUBLIC_DNS_SERVERS
+from .brute_force import build_wordlist
+from .cache import get_cache, CACHE_OK, CACHE_NXDOMAIN, CACHE_NOANSWER
+from .budget import get_budget
+from .checkpoint import NullCheckpoint
+from .concurrency import AIMDController
+from .wildcard import WildcardFilter, parent_zones
+from .health import (
+    ResolverScheduler,
+    get_scheduler,
+    OUTCOME_OK,
+    OUTCOME_TIMEOUT,
+    OUTCOME_SERVFAIL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Типы записей и коды ответов DNS (RFC 1035)
+QTYPE_A = 1
+QTYPE_CNAME = 5
+QTYPE_AAAA = 28
+QCLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+
+# Флаг усеченного ответа (TC): полный ответ нужно запрашивать по TCP
+FLAG_TC = 0x0200
+
+# Максимальное число одновременных запросов на один сокет
+# (идентификатор транзакции DNS - 16 бит)
+MAX_PENDING_PER_SOCKET = 60000
+
+_HEADER = struct.Struct("!HHHHHH")
+_QUESTION_TAIL = struct.Struct("!HH")
+_RR_TAIL = struct.Struct("!HHIH")
+_TCP_LENGTH = struct.Struct("!H")
+
+
+def encode_name(name):
+    """Кодирует доменное имя в wire-формат, возвращает None для некорректных имен"""
+    try:
+        raw = name.rstrip(".").lower().encode("ascii")
+    except UnicodeEncodeError:
+        return None
+
+    parts = []
+    for label in raw.split(b"."):
+        if not label or len(label) > 63:
+            return None
+        parts.append(bytes((len(label),)) + label)
+    parts.append(b"\x00")
+
+    encoded = b"".join(parts)
+    if len(encoded) > 255:
+        return None
+    return encoded
+
+
+def build_query(txid, wire_name, qtype=QTYPE_A):
+    """Собирает DNS-запрос с флагом рекурсии (RD) в wire-формате"""
+    return (
+        _HEADER.pack(txid, 0x0100, 1, 0, 0, 0)
+        + wire_name
+        + _QUESTION_TAIL.pack(qtype, QCLASS_IN)
+    )
+
+
+def _read_name(data, offset):
+    """Читает (возможно сжатое) доменное имя, возвращает имя и смещение после него"""
+    labels = []
+    end = None
+    jumps = 0
+
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            # Указатель сжатия (RFC 1035, 4.1.4)
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise ValueError("Зацикленные указатели сжатия")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset : offset + length].decode("ascii", "replace"))
+        offset += length
+
+    return ".".join(labels).lower(), end if end is not None else offset
+
+
+def parse_response(data):
+    """
+    Разбирает ответ DNS-сервера
+
+    Returns:
+        tuple: (txid, rcode, имя из вопроса, список записей (тип, ttl, значение))
+    """
+    txid, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(data, 0)
+    rcode = flags & 0x000F
+    offset = _HEADER.size
+
+    qname = None
+    for _ in range(qdcount):
+        name, offset = _read_name(data, offset)
+        if qname is None:
+            qname = name
+        offset += _QUESTION_TAIL.size
+
+    records = []
+    for _ in range(ancount):
+        _, offset = _read_name(data, offset)
+        rtype, _, ttl, rdlength = _RR_TAIL.unpack_from(data, offset)
+        offset += _RR_TAIL.size
+        rdata_offset = offset
+        offset += rdlength
+
+        if rtype == QTYPE_A and rdlength == 4:
+            value = socket.inet_ntop(socket.AF_INET, data[rdata_offset:offset])
+        elif rtype == QTYPE_AAAA and rdlength == 16:
+            value = socket.inet_ntop(socket.AF_INET6, data[rdata_offset:offset])
+        elif rtype == QTYPE_CNAME:
+            value, _ = _read_name(data, rdata_offset)
+        else:
+            continue
+        records.append((rtype, ttl, value))
+
+    return txid, rcode, qname, records
+
+
+class DNSAnswer:
+    """Результат разрешения имени асинхронным движком"""
+
+    __slots__ = ("name", "rcode", "records", "wildcard")
+
+    def __init__(self, name, rcode, records=None):
+        self.name = name
+        self.rcode = rcode  # None - ответ не получен (таймаут)
+        self.records = records or []
+        self.wildcard = False  # Ответ совпал с wildcard DNS родительской зоны
+
+    @property
+    def ips(self):
+        """IP-адреса из ответа"""
+        return [value for rtype, _, value in self.records if rtype != QTYPE_CNAME]
+
+    @property
+    def cnames(self):
+        """CNAME-цели из ответа"""
+        return [value for rtype, _, value in self.records if rtype == QTYPE_CNAME]
+
+    @property
+    def found(self):
+        """Имя существует и его ответ не совпадает с wildcard"""
+        return self.exists and not self.wildcard
+
+    @property
+    def resolved(self):
+        """Получен окончательный ответ (не таймаут и не SERVFAIL/REFUSED)"""
+        return self.rcode in (RCODE_NOERROR, RCODE_NXDOMAIN)
+
+    @property
+    def exists(self):
+        """Имя существует, если на запрос A пришли A/AAAA или CNAME записи"""
+        return self.rcode == RCODE_NOERROR and any(
+            rtype in (QTYPE_A, QTYPE_AAAA, QTYPE_CNAME) for rtype, _, _ in self.records
+        )
+
+
+def is_truncated(data):
+    """Установлен ли в ответе флаг TC (ответ не поместился в датаграмму)"""
+    return bool(_HEADER.unpack_from(data, 0)[1] & FLAG_TC)
+
+
+def _family(address):
+    """Семейство адресов IP-адреса DNS-сервера"""
+    return socket.AF_INET6 if ":" in address else socket.AF_INET
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    """UDP-протокол, передающий полученные датаграммы движку"""
+
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.index = index
+
+    def datagram_received(self, data, addr):
+        self.engine._on_datagram(self.index, data, addr)
+
+    def error_received(self, exc):
+        logger.debug(f"Ошибка UDP-сокета {self.index}: {exc}")
+
+
+class AsyncDNSEngine:
+    """
+    Асинхронный DNS-движок: тысячи запросов в полете через несколько
+    переиспользуемых UDP-сокетов, ответы сопоставляются по ID транзакции
+    """
+
+    def __init__(
+        self,
+        nameservers=None,
+        concurrency=1000,
+        sockets=4,
+        timeout=1.0,
+        retries=2,
+        port=53,
+        scheduler=None,
+        controller=None,
+        wildcard=None,
+    ):
+        """
+        Args:
+            nameservers (list): DNS-серверы (по умолчанию PUBLIC_DNS_SERVERS)
+            concurrency (int): Максимальное число запросов в полете
+            sockets (int): Количество UDP-сокетов
+            timeout (float): Таймаут одного запроса в секундах
+            retries (int): Количество повторов при таймауте или SERVFAIL/REFUSED
+            port (int): Порт DNS-серверов
+            scheduler (ResolverScheduler, optional): Планировщик серверов; по умолчанию
+                общий для PUBLIC_DNS_SERVERS или собственный для nameservers
+            controller (AIMDController, optional): Адаптивный лимит запросов в полете;
+                concurrency в этом случае не используется
+            wildcard (WildcardFilter, optional): Помечает ответы, совпадающие с wildcard DNS
+        """
+        if scheduler is None:
+            scheduler = (
+                ResolverScheduler(nameservers) if nameservers else get_scheduler()
+            )
+        self.scheduler = scheduler
+        self.controller = controller
+        self.wildcard = wildcard
+        self.nameservers = list(nameservers or PUBLIC_DNS_SERVERS)
+        self.sockets = max(1, sockets)
+        self.concurrency = max(
+            1, min(concurrency, self.sockets * MAX_PENDING_PER_SOCKET)
+        )
+        self.timeout = timeout
+        self.retries = retries
+        self.port = port
+
+        self._loop = None
+        self._transports = []
+        self._families = {}  # Семейство адресов -> номера его сокетов
+        self._pending = {}
+        self._next_socket = {}
+
+    async def open(self):
+        """
+        Открывает UDP-сокеты: по sockets сокетов на каждое семейство адресов
+        (IPv4, IPv6) среди DNS-серверов
+        """
+        self._loop = asyncio.get_running_loop()
+        for family in sorted({_family(server) for server in self.nameservers}):
+            indices = []
+            try:
+                for _ in range(self.sockets):
+                    index = len(self._transports)
+                    transport, _ = await self._loop.create_datagram_endpoint(
+                        lambda index=index: _DNSProtocol(self, index), family=family
+                    )
+                    self._transports.append(transport)
+                    indices.append(index)
+            except OSError as e:
+                # Например, IPv6 недоступен - серверы этого семейства не используем
+                logger.warning(f"Не удалось открыть UDP-сокет ({family.name}): {e}")
+                if not indices:
+                    continue
+            self._families[family] = indices
+            self._next_socket[family] = 0
+
+        usable = [s for s in self.nameservers if _family(s) in self._families]
+        if not usable:
+            self.close()
+            raise OSError("не удалось открыть UDP-сокеты для DNS-серверов")
+        self.nameservers = usable
+
+    def close(self):
+        """Закрывает сокеты и отменяет незавершенные запросы"""
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+        self._families = {}
+        for future, _, _, handle in self._pending.values():
+            handle.cancel()
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def _on_datagram(self, index, data, addr):
+        try:
+            txid, rcode, qname, records = parse_response(data)
+        except Exception:
+            logger.debug(f"Некорректный ответ от {addr[0]}")
+            return
+
+        key = (index, txid)
+        pending = self._pending.get(key)
+        if pending is None:
+            return
+        future, name, server, handle = pending
+        # Отбрасываем ответы с чужого адреса или на другой вопрос
+        if addr[0] != server or qname != name:
+            return
+
+        del self._pending[key]
+        handle.cancel()
+        if not future.done():
+            future.set_result((rcode, records, is_truncated(data)))
+
+    def _on_timeout(self, key):
+        pending = self._pending.pop(key, None)
+        if pending is not None and not pending[0].done():
+            pending[0].set_result((None, [], False))
+
+    def _send(self, wire_name, name, server, qtype):
+        # Сокет того же семейства адресов, что и сервер
+        family = _family(server)
+        indices = self._families[family]
+        index = indices[self._next_socket[family]]
+        self._next_socket[family] = (self._next_socket[family] + 1) % len(indices)
+
+        txid = random.getrandbits(16)
+        while (index, txid) in self._pending:
+            txid = random.getrandbits(16)
+
+        key = (index, txid)
+        future = self._loop.create_future()
+        handle = self._loop.call_later(self.timeout, self._on_timeout, key)
+        self._pending[key] = (future, name, server, handle)
+        try:
+            self._transports[index].sendto(
+                build_query(txid, wire_name, qtype), (server, self.port)
+            )
+        except OSError as e:
+            # Ошибка отправки считается таймаутом - запрос повторится через
+            # другой сервер
+            logger.debug(f"Ошибка отправки запроса {name} на {server}: {e}")
+            del self._pending[key]
+            handle.cancel()
+            future.set_result((None, [], False))
+        return future
+
+    async def _send_tcp(self, wire_name, name, server, qtype):
+        """
+        Повторяет запрос по TCP (RFC 7766) после усеченного ответа по UDP
+
+        Returns:
+            tuple: (rcode, записи); при ошибке или таймауте - (None, []),
+                как при таймауте UDP, чтобы запрос повторился через другой сервер
+        """
+        txid = random.getrandbits(16)
+        query = build_query(txid, wire_name, qtype)
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(server, self.port), self.timeout
+            )
+            writer.write(_TCP_LENGTH.pack(len(query)) + query)
+            (length,) = _TCP_LENGTH.unpack(
+                await asyncio.wait_for(reader.readexactly(2), self.timeout)
+            )
+            data = await asyncio.wait_for(reader.readexactly(length), self.timeout)
+            response_txid, rcode, qname, records = parse_response(data)
+        except Exception as e:
+            logger.debug(f"Ошибка запроса {name} по TCP к {server}: {e!r}")
+            return None, []
+        finally:
+            if writer is not None:
+                writer.close()
+        if response_txid != txid or qname != name:
+            return None, []
+        return rcode, records
+
+    async def resolve(self, name, qtype=QTYPE_A):
+        """
+        Разрешает имя с повтором через другой сервер при таймауте или SERVFAIL
+
+        Усеченный ответ (флаг TC) запрашивается заново по TCP у того же
+        сервера; если и это не удалось, попытка считается таймаутом.
+        """
+        name = name.rstrip(".").lower()
+        wire_name = encode_name(name)
+        if wire_name is None:
+            return DNSAnswer(name, RCODE_NXDOMAIN)
+
+        cached = self._from_cache(name, qtype)
+        if cached is not None:
+            return cached
+
+        budget = get_budget()
+        rcode, records = None, []
+        tried = []
+        for _ in range(self.retries + 1):
+            server = self.scheduler.pick(self.nameservers, exclude=tried)
+            tried.append(server)
+            # Каждая отправка (и повтор) занимает место в общем бюджете запросов
+            await budget.acquire_async()
+            try:
+                started = self._loop.time()
+                rcode, records, truncated = await self._send(
+                    wire_name, name, server, qtype
+                )
+                if truncated:
+                    rcode, records = await self._send_tcp(
+                        wire_name, name, server, qtype
+                    )
+            finally:
+                budget.release()
+            latency = self._loop.time() - started
+            if self.controller is not None:
+                self.controller.record(rcode is None)
+
+            if rcode is None:
+                self.scheduler.record(server, OUTCOME_TIMEOUT)
+            elif rcode in (RCODE_SERVFAIL, RCODE_REFUSED):
+                self.scheduler.record(server, OUTCOME_SERVFAIL, latency)
+            else:
+                self.scheduler.record(server, OUTCOME_OK, latency)
+                break
+
+        answer = DNSAnswer(name, rcode, records)
+        self._to_cache(answer, qtype)
+        return answer
+
+    @staticmethod
+    def _from_cache(name, qtype):
+        """Собирает ответ из общего кэша DNS (только для запросов A)"""
+        if qtype != QTYPE_A:
+            return None
+
+        cache = get_cache()
+        entry = cache.get(name, "A")
+        if entry is None:
+            return None
+        if entry.status == CACHE_NXDOMAIN:
+            return DNSAnswer(name, RCODE_NXDOMAIN)
+        if entry.status == CACHE_OK:
+            return DNSAnswer(
+                name,
+                RCODE_NOERROR,
+                [(QTYPE_A, entry.ttl, value) for value in entry.records],
+            )
+
+        # Нет A-записей - имя может существовать как CNAME
+        cname = cache.get(name, "CNAME")
+        if cname is not None and cname.status == CACHE_OK:
+            return DNSAnswer(
+                name,
+                RCODE_NOERROR,
+                [(QTYPE_CNAME, cname.ttl, value) for value in cname.records],
+            )
+        return DNSAnswer(name, RCODE_NOERROR)
+
+    @staticmethod
+    def _to_cache(answer, qtype):
+        """Сохраняет ответ в общий кэш DNS в том же виде, что и resolve() из пула"""
+        if qtype != QTYPE_A or answer.rcode not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+            return
+
+        cache = get_cache()
+        if answer.rcode == RCODE_NXDOMAIN:
+            cache.put(answer.name, "A", CACHE_NXDOMAIN)
+            return
+
+        a_records = [r for r in answer.records if r[0] == QTYPE_A]
+        if a_records:
+            cache.put(
+                answer.name,
+                "A",
+                CACHE_OK,
+                [value for _, _, value in a_records],
+                min(ttl for _, ttl, _ in a_records),
+            )
+            return
+
+        cache.put(answer.name, "A", CACHE_NOANSWER)
+        # CNAME имени запроса - первая запись цепочки
+        cnames = [r for r in answer.records if r[0] == QTYPE_CNAME]
+        if cnames:
+            _, ttl, target = cnames[0]
+            cache.put(answer.name, "CNAME", CACHE_OK, [target + "."], ttl)
+
+    async def scan(self, names, on_result):
+        """
+        Разрешает поток имен, удерживая не более concurrency запросов в полете
+
+        Args:
+            names (iterable): Итератор полных доменных имен
+            on_result (callable): Вызывается с DNSAnswer для каждого имени
+        """
+        # В адаптивном режиме лимит меняется на ходу
+        active = 0
+        slot_free = asyncio.Event()
+
+        def done_callback(name, task):
+            nonlocal active
+            active -= 1
+            slot_free.set()
+            if task.cancelled():
+                return
+            if task.exception() is not None:
+                # Имя не теряется: оно сообщается как неразрешенное, чтобы
+                # продвинулись прогресс и позиция продолжения перебора
+                logger.warning(f"Ошибка при разрешении {name}: {task.exception()!r}")
+                on_result(DNSAnswer(name.rstrip(".").lower(), None))
+            else:
+                answer = task.result()
+                if (
+                    self.wildcard is not None
+                    and answer.exists
+                    and self.wildcard.is_wildcard(
+                        answer.name, answer.ips, answer.cnames
+                    )
+                ):
+                    answer.wildcard = True
+                on_result(answer)
+
+        controller = self.controller
+        for name in names:
+            while active >= (controller.limit if controller else self.concurrency):
+                slot_free.clear()
+                await slot_free.wait()
+            active += 1
+            self._loop.create_task(self.resolve(name)).add_done_callback(
+                functools.partial(done_callback, name)
+            )
+
+        while active:
+            slot_free.clear()
+            await slot_free.wait()
+
+
+# Маркер завершения фонового сканирования
+_DONE = object()
+
+
+async def _scan_names(
+    names, zones, total, concurrency, controller, wildcard, on_found, on_answer, stop
+):
+    async with AsyncDNSEngine(
+        concurrency=concurrency, controller=controller, wildcard=wildcard
+    ) as engine:
+        if wildcard is not None:
+            await wildcard.detect_async(engine, zones)
+
+        with tqdm(total=total, desc="Проверка поддоменов") as pbar:
+
+            def on_result(answer):
+                if on_answer is not None:
+                    on_answer(answer)
+                if answer.found:
+                    on_found(answer.name)
+                pbar.update(1)
+
+            await engine.scan(
+                itertools.takewhile(lambda _: not stop.is_set(), names), on_result
+            )
+
+
+def iter_in_loop(run):
+    """
+    Генератор: выполняет корутину в цикле событий отдельного потока и
+    выдает результаты по мере появления (через очередь)
+
+    Args:
+        run (callable): run(on_found, stop) возвращает корутину; она передает
+            результаты в on_found и прекращает работу, когда установлен stop
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        try:
+            asyncio.run(run(results.put, stop))
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Если потребитель прервал перебор, прекращаем отправку новых запросов
+        stop.set()
+        thread.join()
+
+
+def iter_names_async(
+    names,
+    zones,
+    total=None,
+    concurrency=1000,
+    adaptive=False,
+    filter_wildcard=True,
+    on_answer=None,
+):
+    """
+    Генератор: проверяет полные имена асинхронным движком и выдает существующие
+
+    Args:
+        names (iterable): Полные имена для проверки (читаются лениво)
+        zones (iterable): Родительские зоны для обнаружения wildcard DNS
+        total (int, optional): Число имен для индикатора прогресса
+        concurrency (int): Число запросов в полете (в адаптивном режиме - верхняя граница)
+        adaptive (bool): Подбирать число запросов в полете по доле таймаутов (AIMD)
+        filter_wildcard (bool): Отбрасывать ответы, совпадающие с wildcard DNS
+        on_answer (callable, optional): Вызывается с каждым DNSAnswer в потоке цикла событий
+    """
+    controller = None
+    if adaptive:
+        controller = AIMDController(
+            initial=min(50, concurrency), minimum=10, maximum=concurrency
+        )
+    wildcard = WildcardFilter() if filter_wildcard else None
+
+    yield from iter_in_loop(
+        lambda on_found, stop: _scan_names(
+            names,
+            zones,
+            total,
+            concurrency,
+            controller,
+            wildcard,
+            on_found,
+            on_answer,
+            stop,
+        )
+    )
+
+    if controller is not None:
+        controller.log_summary()
+    if wildcard is not None and wildcard.discarded:
+        logger.info(f"Отброшено {wildcard.discarded} ответов wildcard DNS")
+
+
+def iter_subdomains_async(
+    domain,
+    wordlist_file="wordlists/subdomains-top1million-5000.txt",
+    concurrency=1000,
+    adaptive=False,
+    filter_wildcard=True,
+    checkpoint=None,
+):
+    """
+    Генератор: находит поддомены асинхронным движком и выдает их по мере обнаружения
+
+    Args:
+        domain (str): Домен для сканирования
+        wordlist_file (str): Путь к файлу словаря
+        concurrency (int): Число запросов в полете (в адаптивном режиме - верхняя граница)
+        adaptive (bool): Подбирать число запросов в полете по доле таймаутов (AIMD)
+        filter_wildcard (bool): Отбрасывать ответы, совпадающие с wildcard DNS
+        checkpoint (Checkpoint, optional): Сохранение позиции для продолжения после сбоя
+    """
+    wordlist = build_wordlist(domain, wordlist_file)
+    if not wordlist:
+        return
+
+    logger.info(
+        f"Асинхронный поиск поддоменов для {domain} с использованием {len(wordlist)} возможных имен "
+        f"({'адаптивно, ' if adaptive else ''}до {concurrency} запросов одновременно)..."
+    )
+
+    if checkpoint is None:
+        checkpoint = NullCheckpoint()
+    # Префиксы профилей могут совпадать со словами словаря - не выдаем имя дважды
+    found = set()
+    if checkpoint.load(wordlist):
+        for name in checkpoint.found:
+            if name not in found:
+                found.add(name)
+                yield name
+
+    suffix_length = len(domain) + 1
+
+    def on_answer(answer):
+        checkpoint.complete(
+            answer.name[:-suffix_length],
+            answer.name if answer.found else None,
+            not answer.resolved,
+        )
+
+    names = iter_names_async(
+        (f"{word}.{domain}" for word in checkpoint.candidates(wordlist)),
+        parent_zones(domain, wordlist),
+        checkpoint.remaining,
+        concurrency,
+        adaptive,
+        filter_wildcard,
+        on_answer,
+    )
+    try:
+        for name in names:
+            if name not in found:
+                found.add(name)
+                yield name
+    except BaseException:
+        # Прерванный перебор: останавливаем запросы и сохраняем позицию
+        names.close()
+        checkpoint.save()
+        raise
+    checkpoint.clear()
+
+    logger.info(f"Найдено {len(found)} поддоменов методом брутфорса")
+
+
+def find_subdomains_async(
+    domain,
+    wordlist_file="wordlists/subdomains-top1million-5000.txt",
+    concurrency=1000,
+    adaptive=False,
+    filter_wildcard=True,
+):
+    """Находит поддомены асинхронным движком (параметры - см. iter_subdomains_async)"""
+    return list(
+        iter_subdomains_async(
+            domain, wordlist_file, concurrency, adaptive, filter_wildcard
+        )
+    )
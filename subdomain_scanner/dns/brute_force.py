@@ -7,276 +7,142 @@ logger = logging.getLogger(__name__)
 
 # Импортируем список публичных DNS-серверов
 from .zone_transfer import PUBLIC_DNS_SERVERS
+from .resolver_pool import resolve
+from .concurrency import AIMDController
+from .wildcard import WildcardFilter, parent_zones
+from .checkpoint import NullCheckpoint
+from .wordlist import open_wordlist, DomainWordlist
+from .patterns import profile_candidates, PROFILES_DIR
 
 
-def check_subdomain(subdomain, domain):
-    """Проверяет существование поддомена с помощью DNS-запроса"""
-    full_domain = f"{subdomain}.{domain}"
+def _accept(full_domain, ips, cnames, wildcard):
+    """Возвращает имя, если ответ не совпадает с wildcard DNS родительской зоны"""
+    if wildcard is not None and wildcard.is_wildcard(full_domain, ips, cnames):
+        return None
+    return full_domain
 
-    # Используем кастомный резолвер с публичными DNS-серверами
-    resolver = dns.resolver.Resolver()
-    resolver.nameservers = PUBLIC_DNS_SERVERS
-    resolver.timeout = 1.0  # Короткий таймаут для одного запроса
-    resolver.lifetime = 2.0  # Общее время жизни запроса
 
-    try:
-        resolver.resolve(full_domain, "A")
-        return full_domain
-    except dns.resolver.NXDOMAIN:
-        # Домен точно не существует
-        return None
-    except dns.resolver.NoAnswer:
-        # Нет A-записи, но попробуем другие типы записей
-        try:
-            resolver.resolve(full_domain, "CNAME")
-            return full_domain
-        except:
-            return None
-    except dns.exception.Timeout:
-        # При таймауте повторяем запрос с другим сервером
+def check_subdomain(subdomain, domain, controller=None, wildcard=None):
+    """
+    Проверяет существование поддомена с помощью DNS-запроса
+
+    Args:
+        subdomain (str): Имя поддомена из словаря
+        domain (str): Основной домен
+        controller (AIMDController, optional): Получает сигнал о таймауте запроса
+        wildcard (WildcardFilter, optional): Отбрасывает ответы wildcard DNS
+    """
+    return _probe(subdomain, domain, controller, wildcard)[0]
+
+
+def _probe(subdomain, domain, controller=None, wildcard=None):
+    """
+    Проверка поддомена (см. check_subdomain)
+
+    Returns:
+        tuple: (найденное имя или None, True если ответ так и не получен)
+    """
+    full_domain = f"{subdomain}.{domain}"
+
+    # Контроллер получает исход каждой попытки отдельно: успешный повтор
+    # после таймаута не считается таймаутом
+    for attempt in range(2):
+        timed_out = False
         try:
-            # Берем другие DNS-серверы
-            backup_servers = PUBLIC_DNS_SERVERS[2:] + PUBLIC_DNS_SERVERS[:2]
-            resolver.nameservers = backup_servers
-            resolver.resolve(full_domain, "A")
-            return full_domain
-        except:
-            return None
-    except Exception as e:
-        logger.debug(f"Ошибка при проверке {full_domain}: {e}")
-        return None
+            return _accept(full_domain, resolve(full_domain, "A"), (), wildcard), False
+        except dns.resolver.NXDOMAIN:
+            # Домен точно не существует
+            return None, False
+        except dns.resolver.NoAnswer:
+            # Нет A-записи, но попробуем другие типы записей
+            try:
+                return (
+                    _accept(full_domain, (), resolve(full_domain, "CNAME"), wildcard),
+                    False,
+                )
+            except:
+                return None, False
+        except dns.exception.Timeout:
+            timed_out = True
+            if attempt:
+                return None, True
+            # При таймауте повторяем запрос - планировщик выберет другие серверы
+        except dns.resolver.NoNameservers as e:
+            if attempt:
+                return None, True
+            logger.debug(f"Ошибка при проверке {full_domain}: {e}")
+            return None, False
+        except Exception as e:
+            logger.debug(f"Ошибка при проверке {full_domain}: {e}")
+            return None, False
+        finally:
+            if controller is not None:
+                controller.record(timed_out)
 
 
 def load_wordlist(wordlist_file):
-    """Загружает список возможных имен поддоменов из файла"""
+    """Загружает список возможных имен поддоменов из файла (без повторов)"""
     try:
-        with open(wordlist_file, "r") as file:
-            return [line.strip() for line in file if line.strip()]
+        return open_wordlist(wordlist_file)
     except Exception as e:
         logger.error(f"Ошибка при чтении файла словаря: {e}")
         return []
 
 
-def find_subdomains(
-    domain, wordlist_file="wordlists/subdomains-top1million-5000.txt", threads=10
-):
-    """Находит поддомены используя параллельные запросы"""
-    found_subdomains = []
-
+def build_wordlist(domain, wordlist_file="wordlists/subdomains-top1million-5000.txt"):
+    """Загружает словарь и дополняет его специальными префиксами для домена"""
     # Загружаем словарь
     wordlist = load_wordlist(wordlist_file)
     if not wordlist:
         logger.error(f"Не удалось загрузить словарь из {wordlist_file}")
-        return found_subdomains
-
-    # Добавляем специальные префиксы для Facebook и fbcdn.net
-    if "facebook.com" in domain or "fbcdn.net" in domain:
-        logger.info(f"Добавляем специальные префиксы для {domain}...")
-        fb_prefixes = [
-            "static",
-            "static.xx",
-            "scontent",
-            "scontent-lhr8-1",
-            "scontent-lhr8-2",
-            "scontent-fra5-1",
-            "scontent-iad3-1",
-            "scontent-atl3-1",
-            "scontent-dfw5-1",
-            "scontent-lga3-1",
-            "scontent-lax3-1",
-            "scontent-sin6-1",
-            "scontent-syd2-1",
-            "scontent-nrt1-1",
-            "scontent-hkg4-1",
-            "scontent-gmp1-1",
-            "video",
-            "video-lhr8-1",
-        ]
-
-        # Добавляем все варианты городов и индексов для scontent
-        for city in [
-            "lhr",
-            "fra",
-            "iad",
-            "atl",
-            "dfw",
-            "lga",
-            "lax",
-            "sin",
-            "syd",
-            "nrt",
-            "hkg",
-            "gmp",
-        ]:
-            for idx in range(1, 10):
-                for subidx in range(1, 4):
-                    fb_prefixes.append(f"scontent-{city}{idx}-{subidx}")
-                    fb_prefixes.append(f"scontent-{city}{idx}-{subidx}.xx")
-
-        # Добавляем префиксы в словарь, если их там нет
-        for prefix in fb_prefixes:
-            if prefix not in wordlist:
-                wordlist.append(prefix)
-
-        logger.info(f"Добавлено {len(fb_prefixes)} специальных префиксов для {domain}")
-
-    # Добавляем специальные префиксы для YouTube/Google
-    if (
-        "youtube.com" in domain
-        or "googlevideo.com" in domain
-        or "ggpht.com" in domain
-        or "ytimg.com" in domain
-    ):
-        logger.info(f"Добавляем специальные префиксы для {domain}...")
-        yt_prefixes = [
-            "yt3",
-            "i1",
-            "i2",
-            "i3",
-            "i4",
-            "i5",
-            "s0",
-            "s1",
-            "s2",
-            "s3",
-            "s4",
-            "s5",
-            "lh1",
-            "lh2",
-            "lh3",
-            "lh4",
-            "lh5",
-            "lh6",
-            "gm1",
-            "gm2",
-            "gm3",
-            "gm4",
-            "gm5",
-            "geo1",
-            "geo2",
-            "geo3",
-            "r1",
-            "r2",
-            "r3",
-            "r4",
-            "r5",
-            "beacons",
-            "redirector",
-            "manifest",
-            "v1",
-            "v2",
-            "v3",
-            "v4",
-            "v5",
-            "img",
-            "vid",
-            "stream",
-            "rr1",
-            "rr2",
-            "rr3",
-            "rr4",
-            "rr5",
-        ]
-
-        # Добавляем варианты с цифрами
-        for num in range(1, 21):
-            yt_prefixes.append(f"i{num}")
-            yt_prefixes.append(f"s{num}")
-            yt_prefixes.append(f"r{num}")
-            yt_prefixes.append(f"rr{num}")
-            yt_prefixes.append(f"v{num}")
-            yt_prefixes.append(f"lh{num}")
-
-        # Добавляем специфические префиксы googlevideo.com с шаблоном sn-*
-        if "googlevideo.com" in domain:
-            logger.info(f"Добавляем специальные префиксы для googlevideo.com...")
-
-            # Основные префиксы для r*.sn-*
-            for r_num in range(1, 6):
-                # Известные базовые шаблоны
-                sn_prefixes = [
-                    "sn-uph",
-                    "sn-uphx",
-                    "sn-uphxq",
-                    "sn-uphxqv",
-                    "sn-uphxqvu",
-                    "sn-uphxqvuj",
-                    "sn-uphxqvujvh",
-                    "sn-upho",
-                    "sn-uphho",
-                    "sn-u2ox",
-                    "sn-u2oxu",
-                    "sn-nx5e",
-                    "sn-nx57",
-                    "sn-nx5s",
-                    "sn-n5h7",
-                    "sn-aigl",
-                    "sn-4g5e",
-                    "sn-4g5l",
-                    "sn-vgqs",
-                    "sn-vgqse",
-                    "sn-vgqsr",
-                    "sn-q4fl",
-                    "sn-q4f7",
-                    "sn-p5qs",
-                    "sn-p5qlsnd",
-                    "sn-p5qlsns",
-                    "sn-q4fl6n",
-                    "sn-q4fl6nl",
-                    "sn-q4fl6ns",
-                ]
-
-                # Добавляем базовые шаблоны
-                for sn_prefix in sn_prefixes:
-                    yt_prefixes.append(f"r{r_num}.{sn_prefix}")
-
-                # Добавляем некоторые известные полные шаблоны
-                known_patterns = [
-                    "r2.sn-uphho-hqal",
-                    "r2.sn-uphvguxaxjvh-qpae",
-                    "r2.sn-uphxqvujvh-2xo6",
-                    "r2.sn-uphxqvujvh-2xol",
-                    "r2.sn-uphxqvujvh-30a6",
-                    "r2.sn-uphxqvujvh-30ae7",
-                    "r2.sn-uphxqvujvh-30ay",
-                    "r2.sn-uphxqvujvh-30az",
-                    "r1.sn-4g5lzne7",
-                    "r1.sn-4g5ednld",
-                    "r1.sn-4g5ednls",
-                    "r1.sn-5hne6nsy",
-                    "r2.sn-5hne6nsy",
-                    "r3.sn-5hne6nsy",
-                    "r4.sn-5hne6nsy",
-                    "r5.sn-5hne6nsy",
-                    "r6.sn-5hne6nsy",
-                    "r7.sn-5hne6nsy",
-                    "r8.sn-5hne6nsy",
-                    "r9.sn-5hne6nsy",
-                    "r10.sn-5hne6nsy",
-                    "r1.sn-25ge7ns7",
-                    "r2.sn-25ge7ns7",
-                    "r3.sn-25ge7ns7",
-                    "r4.sn-25ge7ns7",
-                    "r5.sn-25ge7ns7",
-                    "r6.sn-25ge7ns7",
-                    "r7.sn-25ge7ns7",
-                    "r8.sn-25ge7ns7",
-                ]
-
-                for pattern in known_patterns:
-                    if pattern not in yt_prefixes:
-                        yt_prefixes.append(pattern)
-
-            logger.info(
-                f"Добавлено {len(yt_prefixes)} специальных префиксов для googlevideo.com"
-            )
-
-        # Добавляем префиксы в словарь, если их там нет
-        for prefix in yt_prefixes:
-            if prefix not in wordlist:
-                wordlist.append(prefix)
-
-        logger.info(f"Добавлено {len(yt_prefixes)} специальных префиксов для {domain}")
+        return wordlist
+
+    return extend_wordlist(domain, wordlist)
+
+
+def extend_wordlist(domain, wordlist, profiles_dir=PROFILES_DIR):
+    """
+    Дополняет словарь специальными префиксами домена из профилей
+
+    Префиксы раскрываются из шаблонов лениво и не хранятся в памяти.
+    Совпадения с основным словарем не исключаются: повторный запрос
+    обслуживается кэшем DNS.
+
+    Args:
+        domain (str): Домен для сканирования
+        wordlist (sequence): Словарь (список или CompiledWordlist), не изменяется
+        profiles_dir (str): Каталог профилей (см. dns.patterns)
+
+    Returns:
+        DomainWordlist: Словарь с дополнительными префиксами в extras
+    """
+    return DomainWordlist(wordlist, profile_candidates(domain, profiles_dir))
+
+
+def iter_subdomains(
+    domain,
+    wordlist_file="wordlists/subdomains-top1million-5000.txt",
+    threads=10,
+    adaptive=False,
+    max_threads=200,
+    filter_wildcard=True,
+    checkpoint=None,
+):
+    """
+    Генератор: находит поддомены параллельными запросами и выдает их по мере обнаружения
+
+    Args:
+        domain (str): Домен для сканирования
+        wordlist_file (str): Путь к файлу словаря
+        threads (int): Количество потоков (в адаптивном режиме - начальное значение)
+        adaptive (bool): Подбирать число одновременных запросов по доле таймаутов (AIMD)
+        max_threads (int): Верхняя граница числа потоков в адаптивном режиме
+        filter_wildcard (bool): Отбрасывать ответы, совпадающие с wildcard DNS
+        checkpoint (Checkpoint, optional): Сохранение позиции для продолжения после сбоя
+    """
+    wordlist = build_wordlist(domain, wordlist_file)
+    if not wordlist:
+        return
 
     logger.info(
         f"Поиск поддоменов для {domain} с использованием {len(wordlist)} возможных имен..."
@@ -285,17 +151,120 @@ def find_subdomains(
         f"Используем публичные DNS-серверы: {', '.join(PUBLIC_DNS_SERVERS[:3])}..."
     )
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
-        future_to_subdomain = {
-            executor.submit(check_subdomain, word, domain): word for word in wordlist
-        }
+    wildcard = None
+    if filter_wildcard:
+        wildcard = WildcardFilter()
+        wildcard.detect(parent_zones(domain, wordlist))
+
+    if checkpoint is None:
+        checkpoint = NullCheckpoint()
+    # Префиксы профилей могут совпадать со словами словаря - не выдаем имя дважды
+    found = set()
+    if checkpoint.load(wordlist):
+        for subdomain in checkpoint.found:
+            if subdomain not in found:
+                found.add(subdomain)
+                yield subdomain
+
+    if adaptive:
+        results = _iter_adaptive(
+            domain, wordlist, threads, max_threads, wildcard, checkpoint
+        )
+    else:
+        results = _iter_threaded(domain, wordlist, threads, wildcard, checkpoint)
+
+    try:
+        for subdomain in results:
+            if subdomain not in found:
+                found.add(subdomain)
+                yield subdomain
+    except BaseException:
+        # Прерванный перебор: останавливаем запросы и сохраняем позицию
+        results.close()
+        checkpoint.save()
+        raise
+    checkpoint.clear()
+
+    if wildcard is not None and wildcard.discarded:
+        logger.info(f"Отброшено {wildcard.discarded} ответов wildcard DNS")
+    logger.info(f"Найдено {len(found)} поддоменов методом брутфорса")
+
+
+def find_subdomains(
+    domain,
+    wordlist_file="wordlists/subdomains-top1million-5000.txt",
+    threads=10,
+    adaptive=False,
+    max_threads=200,
+    filter_wildcard=True,
+):
+    """Находит поддомены используя параллельные запросы (параметры - см. iter_subdomains)"""
+    return list(
+        iter_subdomains(
+            domain, wordlist_file, threads, adaptive, max_threads, filter_wildcard
+        )
+    )
+
+
+def _iter_threaded(domain, wordlist, threads, wildcard, checkpoint):
+    """Перебор на пуле потоков фиксированного размера"""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+    # Небольшой запас задач, чтобы потоки не простаивали между выдачами
+    yield from _iter_window(
+        domain, wordlist, executor, lambda: threads * 2, None, wildcard, checkpoint
+    )
+
+
+def _iter_adaptive(domain, wordlist, threads, max_threads, wildcard, checkpoint):
+    """Перебор с числом одновременных запросов, подбираемым AIMD-контроллером"""
+    controller = AIMDController(initial=threads, maximum=max(threads, max_threads))
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=controller.maximum)
+    yield from _iter_window(
+        domain,
+        wordlist,
+        executor,
+        lambda: controller.limit,
+        controller,
+        wildcard,
+        checkpoint,
+    )
+    controller.log_summary()
+
+
+def _iter_window(domain, wordlist, executor, limit, controller, wildcard, checkpoint):
+    """
+    Отправляет слова в пул потоков, держа в работе не более limit() проверок
+
+    Слова берутся из словаря по мере освобождения мест, поэтому объем
+    памяти не зависит от размера словаря.
+    """
+    total = checkpoint.remaining
+    words = checkpoint.candidates(wordlist)
+    pending = {}
+
+    try:
+        with tqdm(total=total, desc="Проверка поддоменов") as pbar:
+            while True:
+                # Дополняем очередь до текущего лимита
+                while len(pending) < limit():
+                    word = next(words, None)
+                    if word is None:
+                        break
+                    future = executor.submit(_probe, word, domain, controller, wildcard)
+                    pending[future] = word
 
-        with tqdm(total=len(wordlist), desc="Проверка поддоменов") as pbar:
-            for future in concurrent.futures.as_completed(future_to_subdomain):
-                result = future.result()
-                if result:
-                    found_subdomains.append(result)
-                pbar.update(1)
+                if not pending:
+                    break
 
-    logger.info(f"Найдено {len(found_subdomains)} поддоменов методом брутфорса")
-    return found_subdomains
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    result, unresolved = future.result()
+                    checkpoint.complete(pending.pop(future), result, unresolved)
+                    pbar.update(1)
+                    if result:
+                        yield result
+    finally:
+        # Если потребитель прервал перебор, не ждем оставшиеся запросы
+        executor.shutdown(cancel_futures=True)
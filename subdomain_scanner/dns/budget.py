@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from collections import deque
+
+
+class QueryBudget:
+    """
+    Общий бюджет одновременных DNS-запросов для всех методов сканирования
+
+    Потоки занимают место блокирующим acquire(), асинхронный движок -
+    неблокирующим try_acquire() или await acquire_async().
+    limit=None означает отсутствие ограничения.
+
+    release() будит один ожидающий поток через условную переменную и одну
+    ожидающую корутину через future ее цикла событий
+    (call_soon_threadsafe), поэтому ожидание не требует опроса.
+    """
+
+    def __init__(self, limit=None):
+        """
+        Args:
+            limit (int, optional): Максимальное число запросов в полете
+        """
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+        self._waiters = deque()  # (цикл событий, future) ожидающих корутин
+
+    def _take(self):
+        """Занимает место, если оно есть (вызывается под self._condition)"""
+        if self.limit is not None and self.in_use >= self.limit:
+            return False
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+        return True
+
+    def try_acquire(self):
+        """Занимает место без ожидания, возвращает False если бюджет исчерпан"""
+        with self._condition:
+            return self._take()
+
+    def acquire(self):
+        """Занимает место, ожидая его освобождения"""
+        with self._condition:
+            while self.limit is not None and self.in_use >= self.limit:
+                self._condition.wait()
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+
+    async def acquire_async(self):
+        """Занимает место из цикла событий, не блокируя его"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._take():
+                    return
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                # Пробуждение - сигнал попробовать снова: место могли занять раньше
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._condition:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    else:
+                        # Сигнал уже отдан этой корутине - передаем его следующей
+                        self._wake_one()
+                raise
+
+    def _wake_one(self):
+        """Будит одну ожидающую корутину (вызывается под self._condition)"""
+        while self._waiters:
+            loop, future = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_set_woken, future)
+                return
+            except RuntimeError:
+                # Цикл событий ожидающего уже закрыт
+                continue
+
+    def release(self):
+        """Освобождает место"""
+        with self._condition:
+            self.in_use -= 1
+            self._condition.notify()
+            self._wake_one()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def _set_woken(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_budget = QueryBudget()
+
+
+def get_budget():
+    """Возвращает общий бюджет DNS-запросов"""
+    return _budget
+
+
+def set_budget(budget):
+    """Заменяет общий бюджет DNS-запросов"""
+    global _budget
+    _budget = budget
+    return budget
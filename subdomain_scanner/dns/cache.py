@@ -0,0 +1,187 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Статусы закэшированных ответов
+CACHE_OK = "ok"
+CACHE_NXDOMAIN = "nxdomain"
+CACHE_NOANSWER = "noanswer"
+
+
+class CacheEntry:
+    """Закэшированный ответ DNS: статус, значения записей и время истечения"""
+
+    __slots__ = ("status", "records", "expires")
+
+    def __init__(self, status, records, expires):
+        self.status = status
+        self.records = records
+        self.expires = expires
+
+    @property
+    def ttl(self):
+        """Оставшееся время жизни записи в секундах"""
+        return max(0, int(self.expires - time.time()))
+
+
+class DNSCache:
+    """
+    Кэш ответов DNS с учетом TTL, общий для всех этапов сканирования
+
+    Хранит положительные и отрицательные ответы в памяти (LRU) и,
+    при указании db_path, сохраняет их в SQLite между запусками.
+    """
+
+    def __init__(
+        self, max_entries=100000, db_path=None, negative_ttl=300, max_ttl=86400
+    ):
+        """
+        Args:
+            max_entries (int): Максимальное количество записей в памяти
+            db_path (str, optional): Путь к файлу SQLite для постоянного хранения
+            negative_ttl (int): TTL отрицательных ответов, если сервер не указал SOA
+            max_ttl (int): Верхняя граница TTL для любых ответов
+        """
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._pending_writes = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dns_cache ("
+                "name TEXT NOT NULL, rdtype TEXT NOT NULL, status TEXT NOT NULL, "
+                "records TEXT NOT NULL, expires REAL NOT NULL, "
+                "PRIMARY KEY (name, rdtype))"
+            )
+            self._db.execute("DELETE FROM dns_cache WHERE expires < ?", (time.time(),))
+            self._db.commit()
+
+    @staticmethod
+    def _key(name, rdtype):
+        return name.rstrip(".").lower(), rdtype.upper()
+
+    def get(self, name, rdtype="A"):
+        """Возвращает действующую запись кэша или None"""
+        key = self._key(name, rdtype)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT status, records, expires FROM dns_cache "
+                    "WHERE name = ? AND rdtype = ?",
+                    key,
+                ).fetchone()
+                if row is not None and row[2] > now:
+                    entry = CacheEntry(row[0], json.loads(row[1]), row[2])
+                    self._store(key, entry)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return entry
+
+            self.misses += 1
+            return None
+
+    def put(self, name, rdtype, status, records=None, ttl=None):
+        """
+        Сохраняет ответ в кэш
+
+        Args:
+            name (str): Доменное имя
+            rdtype (str): Тип записи (A, CNAME, MX, ...)
+            status (str): CACHE_OK, CACHE_NXDOMAIN или CACHE_NOANSWER
+            records (list): Значения записей в текстовом виде
+            ttl (int, optional): TTL ответа; для отрицательных ответов по умолчанию negative_ttl
+        """
+        if ttl is None:
+            ttl = self.negative_ttl
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+
+        key = self._key(name, rdtype)
+        entry = CacheEntry(status, list(records or []), time.time() + ttl)
+
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO dns_cache VALUES (?, ?, ?, ?, ?)",
+                    (*key, status, json.dumps(entry.records), entry.expires),
+                )
+                self._pending_writes += 1
+                if self._pending_writes >= 1000:
+                    self._db.commit()
+                    self._pending_writes = 0
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Возвращает счетчики попаданий и промахов"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def flush(self):
+        """Записывает отложенные изменения в SQLite"""
+        with self._lock:
+            if self._db is not None and self._pending_writes:
+                self._db.commit()
+                self._pending_writes = 0
+
+    def close(self):
+        """Сохраняет изменения и закрывает базу данных"""
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache = DNSCache()
+
+
+def get_cache():
+    """Возвращает общий кэш DNS"""
+    return _cache
+
+
+def set_cache(cache):
+    """Заменяет общий кэш DNS (например, на кэш с хранением в SQLite)"""
+    global _cache
+    _cache = cache
+    return cache
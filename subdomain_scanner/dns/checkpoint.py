@@ -0,0 +1,204 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """
+    Состояние перебора словаря для продолжения после сбоя
+
+    Запросы завершаются не по порядку, поэтому позиция хранится как
+    граница position (все слова до нее проверены) плюс множество
+    проверенных индексов после границы. Слова без ответа (таймаут,
+    SERVFAIL) запоминаются для повторной проверки. Файл записывается
+    атомарно (временный файл + замена) не чаще раза в interval секунд.
+    """
+
+    def __init__(self, path, domain, wordlist_file, interval=30.0):
+        """
+        Args:
+            path (str): Файл состояния (JSON)
+            domain (str): Сканируемый домен
+            wordlist_file (str): Путь к файлу словаря
+            interval (float): Минимальный интервал между записями в секундах
+        """
+        self.path = path
+        self.domain = domain
+        self.wordlist_file = wordlist_file
+        self.interval = interval
+
+        self.position = 0
+        self.done = set()
+        self.retry = set()
+        self.found = []
+        self.wordlist_size = None
+
+        self._inflight = defaultdict(deque)
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self, wordlist):
+        """
+        Загружает состояние, если оно относится к тому же домену и словарю
+
+        Returns:
+            bool: True если перебор продолжается с сохраненного места
+        """
+        self.wordlist_size = len(wordlist)
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, "r") as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать файл состояния {self.path}: {e}")
+            return False
+
+        if (
+            state.get("version") != CHECKPOINT_VERSION
+            or state.get("domain") != self.domain
+            or state.get("wordlist") != self.wordlist_file
+            or state.get("wordlist_size") != self.wordlist_size
+        ):
+            logger.warning(
+                f"Файл состояния {self.path} относится к другому сканированию, "
+                f"начинаем заново"
+            )
+            return False
+
+        self.position = state["position"]
+        self.done = set(state["done"])
+        self.retry = set(state["retry"])
+        self.found = list(state["found"])
+        logger.info(
+            f"Продолжаем перебор с позиции {self.position} из {self.wordlist_size} "
+            f"(повторных проверок: {len(self.retry)}, уже найдено: {len(self.found)})"
+        )
+        return True
+
+    @property
+    def remaining(self):
+        """Количество слов, которые осталось проверить"""
+        unchecked = self.wordlist_size - self.position - len(self.done)
+        return unchecked + sum(
+            1 for index in self.retry if index < self.position or index in self.done
+        )
+
+    def candidates(self, wordlist):
+        """
+        Генератор непроверенных слов: сначала ожидающие повтора, затем с границы
+
+        Выданные слова считаются "в полете" до вызова complete().
+        """
+        retry, self.retry = self.retry, set()
+        # Повторы после границы снова считаются непроверенными
+        self.done -= retry
+        indices = (
+            index
+            for index in range(self.position, len(wordlist))
+            if index not in self.done and index not in retry
+        )
+        for index in itertools.chain(sorted(retry), indices):
+            word = wordlist[index]
+            with self._lock:
+                self._inflight[word.lower()].append(index)
+            yield word
+
+    def complete(self, word, found=None, unresolved=False):
+        """
+        Отмечает слово проверенным
+
+        Args:
+            word (str): Слово из словаря
+            found (str, optional): Найденное полное имя
+            unresolved (bool): Ответ так и не получен - проверить при продолжении
+        """
+        with self._lock:
+            index = self._inflight[word.lower()].popleft()
+            if unresolved:
+                self.retry.add(index)
+            if found:
+                self.found.append(found)
+
+            if index >= self.position:
+                self.done.add(index)
+            while self.position in self.done:
+                self.done.remove(self.position)
+                self.position += 1
+
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def save(self):
+        """Атомарно записывает состояние на диск"""
+        with self._lock:
+            # Слова в полете после границы и так будут проверены заново,
+            # повторы до границы нужно сохранить явно
+            pending = {
+                index
+                for queue in self._inflight.values()
+                for index in queue
+                if index < self.position
+            }
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "domain": self.domain,
+                "wordlist": self.wordlist_file,
+                "wordlist_size": self.wordlist_size,
+                "position": self.position,
+                "done": sorted(self.done),
+                "retry": sorted(self.retry | pending),
+                "found": self.found,
+            }
+            self._last_save = time.monotonic()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as file:
+                json.dump(state, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить файл состояния {self.path}: {e}")
+
+    def clear(self):
+        """Удаляет файл состояния (перебор завершен или начинается заново)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class NullCheckpoint:
+    """Перебор без сохранения состояния (интерфейс Checkpoint)"""
+
+    found = ()
+
+    def load(self, wordlist):
+        self.remaining = len(wordlist)
+        return False
+
+    def candidates(self, wordlist):
+        return iter(wordlist)
+
+    def complete(self, word, found=None, unresolved=False):
+        pass
+
+    def save(self):
+        pass
+
+    def clear(self):
+        pass
@@ -0,0 +1,103 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class AIMDController:
+    """
+    Адаптивное управление числом одновременных DNS-запросов (AIMD)
+
+    Пока доля таймаутов в окне ниже порога, лимит растет аддитивно
+    (до первой перегрузки - удваивается, как slow start в TCP).
+    При всплеске таймаутов лимит уменьшается мультипликативно.
+    """
+
+    def __init__(
+        self,
+        initial=10,
+        minimum=2,
+        maximum=1000,
+        increase=10,
+        decrease=0.5,
+        target_timeout_rate=0.02,
+        min_window=20,
+    ):
+        """
+        Args:
+            initial (int): Начальный лимит одновременных запросов
+            minimum (int): Нижняя граница лимита
+            maximum (int): Верхняя граница лимита
+            increase (int): Аддитивный шаг увеличения за окно
+            decrease (float): Множитель уменьшения при перегрузке
+            target_timeout_rate (float): Допустимая доля таймаутов в окне
+            min_window (int): Минимальное число запросов в окне измерения
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.target_timeout_rate = target_timeout_rate
+        self.min_window = min_window
+
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._slow_start = True
+        self._completed = 0
+        self._timeouts = 0
+        self._skip = 0
+        self._history = deque(maxlen=10)
+        self._lock = threading.Lock()
+
+        self.decreases = 0
+
+    @property
+    def limit(self):
+        """Текущий лимит одновременных запросов"""
+        return int(self._limit)
+
+    def record(self, timed_out):
+        """Учитывает завершенный запрос (timed_out - запрос завершился таймаутом)"""
+        with self._lock:
+            if self._skip:
+                # Запросы, отправленные до уменьшения лимита, не учитываем
+                self._skip -= 1
+                return
+
+            self._completed += 1
+            self._timeouts += bool(timed_out)
+            if self._completed < max(self.min_window, self.limit):
+                return
+
+            rate = self._timeouts / self._completed
+            if rate > self.target_timeout_rate:
+                self._limit = max(self.minimum, self._limit * self.decrease)
+                self._slow_start = False
+                self._skip = self.limit
+                self.decreases += 1
+                logger.debug(
+                    f"Таймауты {rate:.1%} - уменьшаем параллельность до {self.limit}"
+                )
+            elif self._slow_start:
+                self._limit = min(self.maximum, self._limit * 2)
+            else:
+                self._limit = min(self.maximum, self._limit + self.increase)
+
+            self._history.append(self.limit)
+            self._completed = 0
+            self._timeouts = 0
+
+    @property
+    def settled(self):
+        """Установившийся лимит - среднее за последние окна измерения"""
+        with self._lock:
+            if not self._history:
+                return self.limit
+            return int(sum(self._history) / len(self._history))
+
+    def log_summary(self):
+        """Выводит в лог установившуюся параллельность"""
+        logger.info(
+            f"Адаптивная параллельность: установилась на {self.settled} запросах "
+            f"(текущий лимит {self.limit}, снижений {self.decreases})"
+        )
@@ -0,0 +1,224 @@
+import logging
+import random
+import threading
+import time
+
+from .zone_transfer import PUBLIC_DNS_SERVERS
+
+logger = logging.getLogger(__name__)
+
+# Исходы запроса к DNS-серверу
+OUTCOME_OK = "ok"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_SERVFAIL = "servfail"
+
+
+class ServerHealth:
+    """Статистика одного DNS-сервера"""
+
+    def __init__(self, server, initial_latency):
+        self.server = server
+        self.latency = initial_latency  # EWMA задержки ответа, секунды
+        self.timeout_rate = 0.0  # EWMA доли таймаутов
+        self.servfail_rate = 0.0  # EWMA доли ответов SERVFAIL/REFUSED
+        self.queries = 0
+        self.timeouts = 0
+        self.servfails = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # Circuit breaker открыт до этого момента
+        self.cooldown = 0.0
+        self.probing = False  # Идет пробный запрос в полуоткрытом состоянии
+        self.trips = 0
+
+
+class ResolverScheduler:
+    """
+    Планировщик DNS-серверов: ведет EWMA задержки, долю таймаутов и SERVFAIL
+    для каждого сервера и направляет запрос на самый здоровый из них
+
+    Серверы с подряд идущими ошибками отключаются circuit breaker'ом и после
+    паузы получают один пробный запрос.
+    """
+
+    def __init__(
+        self,
+        servers=None,
+        alpha=0.2,
+        failure_threshold=5,
+        cooldown=10.0,
+        max_cooldown=300.0,
+        timeout_penalty=1.0,
+        initial_latency=0.1,
+    ):
+        """
+        Args:
+            servers (list): DNS-серверы (по умолчанию PUBLIC_DNS_SERVERS)
+            alpha (float): Коэффициент сглаживания EWMA
+            failure_threshold (int): Число ошибок подряд для отключения сервера
+            cooldown (float): Начальная пауза отключенного сервера, секунды
+            max_cooldown (float): Максимальная пауза при повторных отключениях
+            timeout_penalty (float): Стоимость таймаута в секундах для оценки сервера
+            initial_latency (float): Начальная оценка задержки нового сервера
+        """
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.timeout_penalty = timeout_penalty
+
+        self._lock = threading.Lock()
+        self._servers = {
+            server: ServerHealth(server, initial_latency)
+            for server in (servers or PUBLIC_DNS_SERVERS)
+        }
+
+    def score(self, health):
+        """Ожидаемая стоимость запроса к серверу (меньше - лучше)"""
+        return (
+            health.latency * (1 + health.servfail_rate)
+            + health.timeout_rate * self.timeout_penalty
+        )
+
+    def pick(self, candidates=None, exclude=()):
+        """
+        Выбирает сервер для очередного запроса
+
+        Из двух случайных доступных серверов берется лучший по оценке -
+        нагрузка распределяется, но медленные серверы получают меньше запросов.
+
+        Args:
+            candidates (list, optional): Допустимые серверы (по умолчанию все)
+            exclude (iterable): Серверы, которые уже пробовали для этого запроса
+        """
+        now = time.time()
+        with self._lock:
+            pool = [
+                self._servers[server]
+                for server in (candidates or self._servers)
+                if server in self._servers and server not in exclude
+            ]
+            if not pool:
+                pool = [
+                    self._servers[server]
+                    for server in (candidates or self._servers)
+                    if server in self._servers
+                ]
+
+            available = [health for health in pool if health.open_until <= now]
+            closed = [health for health in available if health.cooldown == 0.0]
+
+            # Полуоткрытое состояние: пауза прошла - разрешаем один пробный запрос
+            half_open = [health for health in available if health.cooldown > 0.0]
+            if half_open:
+                health = half_open[0]
+                health.probing = True
+                # Если результат пробы не придет, сервер снова станет доступен позже
+                health.open_until = now + health.cooldown
+                return health.server
+
+            if not closed:
+                # Все серверы отключены - берем тот, что включится раньше всех
+                return min(pool, key=lambda h: h.open_until).server
+
+            if len(closed) == 1:
+                return closed[0].server
+            first, second = random.sample(closed, 2)
+            return (first if self.score(first) <= self.score(second) else second).server
+
+    def record(self, server, outcome, latency=None):
+        """
+        Учитывает результат запроса к серверу
+
+        Args:
+            server (str): DNS-сервер
+            outcome (str): OUTCOME_OK, OUTCOME_TIMEOUT или OUTCOME_SERVFAIL
+            latency (float, optional): Время ответа в секундах
+        """
+        with self._lock:
+            health = self._servers.get(server)
+            if health is None:
+                return
+
+            alpha = self.alpha
+            health.queries += 1
+            if latency is not None and outcome != OUTCOME_TIMEOUT:
+                health.latency += alpha * (latency - health.latency)
+            health.timeout_rate += alpha * (
+                (outcome == OUTCOME_TIMEOUT) - health.timeout_rate
+            )
+            health.servfail_rate += alpha * (
+                (outcome == OUTCOME_SERVFAIL) - health.servfail_rate
+            )
+
+            if outcome == OUTCOME_OK:
+                health.consecutive_failures = 0
+                if health.cooldown:
+                    logger.debug(f"DNS-сервер {server} снова доступен")
+                health.cooldown = 0.0
+                health.probing = False
+                return
+
+            if outcome == OUTCOME_TIMEOUT:
+                health.timeouts += 1
+            else:
+                health.servfails += 1
+            health.consecutive_failures += 1
+
+            if health.probing:
+                # Пробный запрос не удался - удваиваем паузу
+                health.probing = False
+                health.cooldown = min(health.cooldown * 2, self.max_cooldown)
+                health.open_until = time.time() + health.cooldown
+            elif (
+                health.cooldown == 0.0
+                and health.consecutive_failures >= self.failure_threshold
+            ):
+                health.cooldown = self.base_cooldown
+                health.open_until = time.time() + health.cooldown
+                health.trips += 1
+                logger.debug(
+                    f"DNS-сервер {server} временно отключен после "
+                    f"{health.consecutive_failures} ошибок подряд"
+                )
+
+    def stats(self):
+        """Возвращает статистику по каждому серверу"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "server": health.server,
+                    "queries": health.queries,
+                    "latency_ms": health.latency * 1000,
+                    "timeout_rate": health.timeout_rate,
+                    "servfail_rate": health.servfail_rate,
+                    "timeouts": health.timeouts,
+                    "servfails": health.servfails,
+                    "trips": health.trips,
+                    "available": health.open_until <= now,
+                }
+                for health in sorted(self._servers.values(), key=self.score)
+            ]
+
+    def log_stats(self):
+        """Выводит статистику DNS-серверов в лог"""
+        logger.info("Статистика DNS-серверов:")
+        for item in self.stats():
+            if not item["queries"]:
+                continue
+            logger.info(
+                f"  {item['server']:>16}: запросов {item['queries']}, "
+                f"задержка {item['latency_ms']:.0f} мс, "
+                f"таймауты {item['timeout_rate']:.0%} ({item['timeouts']}), "
+                f"SERVFAIL {item['servfail_rate']:.0%} ({item['servfails']}), "
+                f"отключений {item['trips']}"
+                + ("" if item["available"] else " [отключен]")
+            )
+
+
+_scheduler = ResolverScheduler()
+
+
+def get_scheduler():
+    """Возвращает общий планировщик DNS-серверов"""
+    return _scheduler
@@ -0,0 +1,316 @@
+import itertools
+import logging
+import re
+
+from tqdm import tqdm
+
+from .async_engine import AsyncDNSEngine, iter_in_loop
+from .concurrency import AIMDController
+from .wildcard import WildcardFilter
+from .wordlist import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+# Коды локаций (аэропорты IATA), часто встречающиеся в именах узлов CDN
+LOCATION_CODES = [
+    "lhr",
+    "fra",
+    "iad",
+    "atl",
+    "dfw",
+    "lga",
+    "lax",
+    "sin",
+    "syd",
+    "nrt",
+    "hkg",
+    "gmp",
+    "ams",
+    "cdg",
+    "mad",
+    "mia",
+    "ord",
+    "sea",
+    "sjc",
+    "sfo",
+    "jfk",
+    "ewr",
+    "bos",
+    "yyz",
+    "gru",
+    "bom",
+    "del",
+    "icn",
+    "kix",
+    "tpe",
+    "mel",
+    "arn",
+    "waw",
+    "mxp",
+    "zrh",
+    "vie",
+    "dub",
+    "cph",
+    "hel",
+    "osl",
+]
+
+# Слова, которые вставляются в найденные имена
+MUTATION_WORDS = [
+    "dev",
+    "test",
+    "staging",
+    "stage",
+    "prod",
+    "qa",
+    "uat",
+    "beta",
+    "api",
+    "admin",
+    "internal",
+    "old",
+    "new",
+    "v2",
+    "cdn",
+    "static",
+]
+
+_NUMBER = re.compile(r"\d+")
+_TOKEN = re.compile(r"[a-z]+")
+
+
+def _number_mutations(labels, span):
+    """Соседние номера для каждого числа в имени: lhr8-1 -> lhr7-1, lhr9-1, ..."""
+    for position, label in enumerate(labels):
+        for match in _NUMBER.finditer(label):
+            digits = match.group()
+            width = len(digits) if digits.startswith("0") else 0
+            value = int(digits)
+            for delta in range(-span, span + 1):
+                if delta == 0 or value + delta < 0:
+                    continue
+                number = str(value + delta).zfill(width)
+                yield labels[:position] + [
+                    label[: match.start()] + number + label[match.end() :]
+                ] + labels[position + 1 :]
+
+
+def _location_mutations(labels, codes):
+    """Замена кода локации на другие: scontent-lhr8-1 -> scontent-fra8-1, ..."""
+    known = set(codes)
+    for position, label in enumerate(labels):
+        for match in _TOKEN.finditer(label):
+            if match.group() not in known:
+                continue
+            for code in codes:
+                if code == match.group():
+                    continue
+                yield labels[:position] + [
+                    label[: match.start()] + code + label[match.end() :]
+                ] + labels[position + 1 :]
+
+
+def _dash_mutations(labels):
+    """Склейка соседних меток через дефис: static.xx -> static-xx"""
+    for position in range(len(labels) - 1):
+        yield labels[:position] + [
+            f"{labels[position]}-{labels[position + 1]}"
+        ] + labels[position + 2 :]
+
+
+def _word_mutations(labels, words):
+    """Вставка слов: www -> dev-www, www-dev, dev.www"""
+    first = labels[0]
+    for word in words:
+        if word == first:
+            continue
+        yield [f"{word}-{first}"] + labels[1:]
+        yield [f"{first}-{word}"] + labels[1:]
+        yield [word] + labels
+
+
+def iter_mutations(
+    names,
+    domain,
+    number_span=2,
+    location_codes=LOCATION_CODES,
+    words=MUTATION_WORDS,
+):
+    """
+    Генератор мутаций найденных имен (с повторами - их отсеивает MutationStage)
+
+    Сначала идут самые результативные виды мутаций для всех имен
+    (номера, затем коды локаций), потом склейки и вставки слов.
+
+    Args:
+        names (list): Найденные полные имена
+        domain (str): Основной домен (его метки не изменяются)
+        number_span (int): Насколько изменять числа в обе стороны
+        location_codes (list): Коды локаций для замены
+        words (list): Слова для вставки
+    """
+    domain = domain.lower()
+    suffix = f".{domain}"
+    prefixes = [
+        name.lower()[: -len(suffix)].split(".")
+        for name in names
+        if name.lower().endswith(suffix) and not name.startswith("*")
+    ]
+
+    strategies = [
+        lambda labels: _number_mutations(labels, number_span),
+        lambda labels: _location_mutations(labels, location_codes),
+        _dash_mutations,
+        lambda labels: _word_mutations(labels, words),
+    ]
+    for strategy in strategies:
+        for labels in prefixes:
+            for mutated in strategy(labels):
+                yield ".".join(mutated) + suffix
+
+
+class MutationStage:
+    """
+    Этап мутаций: лениво порождает новые имена из найденных и проверяет их
+
+    Уже проверенные имена (словарь, найденные, выданные мутации)
+    отсеиваются фильтром Блума фиксированного размера. Мутации новых
+    находок проверяются следующим раундом тем же движком и тем же
+    фильтром wildcard. На wildcard проверяются только зоны выданных
+    имен, причем каждая один раз; пробные запросы, как и сами имена,
+    расходуют бюджет этапа, поэтому общее число запросов ограничено им.
+    """
+
+    def __init__(self, domain, budget=10000, capacity=100000, chunk=1000, **options):
+        """
+        Args:
+            domain (str): Основной домен
+            budget (int): Максимальное число запросов этапа (имена и пробы wildcard)
+            capacity (int): Ожидаемое число уже проверенных имен (размер фильтра)
+            chunk (int): Сколько имен выдается между проверками новых зон на wildcard
+            **options: Параметры iter_mutations
+        """
+        self.domain = domain.lower()
+        self.budget = budget
+        self.chunk = chunk
+        self.options = options
+        self.emitted = 0  # Запросов израсходовано из бюджета
+        self.found = 0
+        self._tried = BloomFilter(capacity + budget)
+        self._zones = set()  # Зоны, уже проверенные на wildcard
+        self._new_zones = []  # Зоны выданных имен, еще не проверенные
+
+    def mark_tried(self, names):
+        """Запоминает уже проверенные полные имена"""
+        for name in names:
+            self._tried.add(name.lower())
+
+    def candidates(self, found, probes=0):
+        """
+        Генератор новых имен для проверки
+
+        Зона каждого выданного имени, еще не проверенная на wildcard,
+        добавляется в очередь new_zones() и сразу списывает probes
+        запросов из бюджета; имя, на которое с пробами бюджета не
+        хватает, пропускается.
+
+        Args:
+            found (iterable): Найденные полные имена
+            probes (int): Пробных запросов на зону (0 - без проверки wildcard)
+        """
+        found = sorted(found)
+        self.mark_tried(found)
+
+        for name in iter_mutations(found, self.domain, **self.options):
+            if self.emitted >= self.budget:
+                logger.info(f"Бюджет мутаций исчерпан ({self.budget} запросов)")
+                return
+            if name in self._tried:
+                continue
+            zone = name.split(".", 1)[1]
+            cost = 1
+            if probes and zone not in self._zones:
+                cost += probes
+            if self.emitted + cost > self.budget:
+                continue
+            self._tried.add(name)
+            if cost > 1:
+                self._zones.add(zone)
+                self._new_zones.append(zone)
+            self.emitted += cost
+            yield name
+
+    def new_zones(self):
+        """Забирает зоны выданных имен, которые еще нужно проверить на wildcard"""
+        zones, self._new_zones = self._new_zones, []
+        return zones
+
+    async def _run(self, found, concurrency, controller, wildcard, on_found, stop):
+        async with AsyncDNSEngine(
+            concurrency=concurrency, controller=controller, wildcard=wildcard
+        ) as engine:
+            with tqdm(total=self.budget, desc="Проверка мутаций") as pbar:
+                discovered = []
+
+                def on_result(answer):
+                    if answer.found:
+                        discovered.append(answer.name)
+                        on_found(answer.name)
+                    pbar.update(1)
+
+                frontier = found
+                while frontier and self.emitted < self.budget and not stop.is_set():
+                    discovered = []
+                    names = self.candidates(
+                        frontier, wildcard.probes if wildcard is not None else 0
+                    )
+                    while not stop.is_set():
+                        chunk = list(itertools.islice(names, self.chunk))
+                        if not chunk:
+                            break
+                        # Имена порции проверяются только после проб их новых зон
+                        zones = self.new_zones()
+                        if zones:
+                            await wildcard.detect_async(engine, zones)
+                            pbar.update(len(zones) * wildcard.probes)
+                        await engine.scan(
+                            itertools.takewhile(lambda _: not stop.is_set(), chunk),
+                            on_result,
+                        )
+                    self.found += len(discovered)
+                    frontier = discovered
+
+    def iter_subdomains(
+        self, found, concurrency=1000, adaptive=False, filter_wildcard=True
+    ):
+        """
+        Генератор: проверяет мутации found раундами, пока есть новые находки
+        и не исчерпан бюджет, и выдает существующие имена
+
+        Args:
+            found (iterable): Найденные полные имена
+            concurrency (int): Число запросов в полете (с adaptive - верхняя граница)
+            adaptive (bool): Подбирать число запросов в полете по доле таймаутов
+            filter_wildcard (bool): Отбрасывать ответы, совпадающие с wildcard DNS
+        """
+        found = sorted(found)
+        if not found:
+            return
+
+        controller = None
+        if adaptive:
+            controller = AIMDController(
+                initial=min(50, concurrency), minimum=10, maximum=concurrency
+            )
+        wildcard = WildcardFilter() if filter_wildcard else None
+
+        yield from iter_in_loop(
+            lambda on_found, stop: self._run(
+                found, concurrency, controller, wildcard, on_found, stop
+            )
+        )
+
+        if controller is not None:
+            controller.log_summary()
+        if wildcard is not None and wildcard.discarded:
+            logger.info(f"Отброшено {wildcard.discarded} ответов wildcard DNS")
@@ -0,0 +1,311 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Каталог профилей специальных префиксов (относительно рабочего каталога,
+# как и словарь по умолчанию)
+PROFILES_DIR = "wordlists/profiles"
+
+
+class PatternError(ValueError):
+    """Ошибка разбора шаблона"""
+
+
+class _Literal:
+    def __init__(self, text):
+        self.text = text
+
+    def __len__(self):
+        return 1
+
+    def __getitem__(self, index):
+        return self.text
+
+
+class _Range:
+    """{1..20} или {01..20} (ширина с ведущими нулями берется из начала)"""
+
+    def __init__(self, start, end):
+        self.width = len(start) if start.startswith("0") and len(start) > 1 else 0
+        self.start = int(start)
+        self.step = 1 if int(end) >= self.start else -1
+        self.count = abs(int(end) - self.start) + 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return str(self.start + index * self.step).zfill(self.width)
+
+
+class _Charset:
+    """[a-z0-9_] - один символ из набора"""
+
+    def __init__(self, body):
+        chars = []
+        position = 0
+        while position < len(body):
+            if position + 2 < len(body) and body[position + 1] == "-":
+                first, last = body[position], body[position + 2]
+                if first > last:
+                    raise PatternError(f"неверный диапазон символов {first}-{last}")
+                chars.extend(chr(code) for code in range(ord(first), ord(last) + 1))
+                position += 3
+            else:
+                chars.append(body[position])
+                position += 1
+        if not chars:
+            raise PatternError("пустой набор символов []")
+        self.chars = "".join(dict.fromkeys(chars))
+
+    def __len__(self):
+        return len(self.chars)
+
+    def __getitem__(self, index):
+        return self.chars[index]
+
+
+class _Alternation:
+    """{a,b,c} - каждая альтернатива сама является шаблоном"""
+
+    def __init__(self, alternatives):
+        self.alternatives = alternatives
+        self.count = sum(len(alternative) for alternative in alternatives)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        for alternative in self.alternatives:
+            if index < len(alternative):
+                return alternative[index]
+            index -= len(alternative)
+        raise IndexError(index)
+
+
+class _Sequence:
+    """Последовательность частей шаблона (весь шаблон или альтернатива в {})"""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.count = 1
+        for part in parts:
+            self.count *= len(part)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        pieces = []
+        for part in reversed(self.parts):
+            index, offset = divmod(index, len(part))
+            pieces.append(part[offset])
+        return "".join(reversed(pieces))
+
+
+class Pattern:
+    """
+    Шаблон имен-кандидатов, раскрываемый лениво
+
+    Синтаксис:
+        {a,b,c}   - альтернативы (могут быть пустыми и вложенными)
+        {1..20}   - числовой диапазон, {01..20} - с ведущими нулями
+        [a-z0-9]  - один символ из набора
+
+    Pattern ведет себя как последовательность: len() считает число
+    вариантов без раскрытия, p[i] вычисляет i-й вариант напрямую
+    (последний элемент шаблона меняется быстрее всего, как во вложенных
+    циклах), обход не хранит варианты в памяти.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        parts, _ = _parse(text, 0, top=True)
+        self._sequence = _Sequence(parts)
+
+    def __len__(self):
+        return len(self._sequence)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("индекс вне шаблона")
+        return self._sequence[index]
+
+    def __iter__(self):
+        return _expand(self._sequence.parts, 0)
+
+    def __repr__(self):
+        return f"Pattern({self.text!r})"
+
+
+def _expand(parts, start):
+    if start == len(parts):
+        yield ""
+        return
+    part = parts[start]
+    for index in range(len(part)):
+        head = part[index]
+        for tail in _expand(parts, start + 1):
+            yield head + tail
+
+
+def _parse(text, position, top=False):
+    """Разбирает последовательность частей до "," или "}" (внутри альтернатив)"""
+    parts = []
+    literal = []
+
+    def flush():
+        if literal:
+            parts.append(_Literal("".join(literal)))
+            literal.clear()
+
+    while position < len(text):
+        char = text[position]
+        if char == "{":
+            flush()
+            part, position = _parse_braces(text, position)
+            parts.append(part)
+        elif char == "[":
+            flush()
+            end = text.find("]", position)
+            if end == -1:
+                raise PatternError(f"не закрыта скобка [ в {text!r}")
+            parts.append(_Charset(text[position + 1 : end]))
+            position = end + 1
+        elif char in ",}" and not top:
+            break
+        elif char in "]}":
+            raise PatternError(f"лишняя скобка {char} в {text!r}")
+        else:
+            literal.append(char)
+            position += 1
+    flush()
+    return parts, position
+
+
+def _parse_braces(text, position):
+    """Разбирает {..} начиная с "{", возвращает часть и позицию после "}" """
+    end = text.find("}", position)
+    body = text[position + 1 : end] if end != -1 else ""
+    if ".." in body and not any(char in body for char in "{[,"):
+        start, _, stop = body.partition("..")
+        if not (start.isdigit() and stop.isdigit()):
+            raise PatternError(f"неверный числовой диапазон {{{body}}} в {text!r}")
+        return _Range(start, stop), end + 1
+
+    alternatives = []
+    position += 1
+    while True:
+        parts, position = _parse(text, position)
+        alternatives.append(_Sequence(parts))
+        if position >= len(text):
+            raise PatternError(f"не закрыта скобка {{ в {text!r}")
+        if text[position] == "}":
+            return _Alternation(alternatives), position + 1
+        position += 1  # ","
+
+
+class PatternSet:
+    """Несколько шаблонов подряд как одна ленивая последовательность"""
+
+    def __init__(self, patterns=()):
+        self.patterns = list(patterns)
+        self._count = sum(len(pattern) for pattern in self.patterns)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        for pattern in self.patterns:
+            if index < len(pattern):
+                return pattern[index]
+            index -= len(pattern)
+        raise IndexError("индекс вне набора шаблонов")
+
+    def __iter__(self):
+        for pattern in self.patterns:
+            yield from pattern
+
+
+class Profile:
+    """
+    Профиль специальных префиксов из файла данных
+
+    Формат файла: по одному шаблону в строке; пустые строки и комментарии
+    (#) пропускаются; строка "# domains: a.com, b.net" задает домены,
+    для которых применяется профиль (совпадение по вхождению в имя домена).
+    """
+
+    def __init__(self, name, domains, patterns):
+        self.name = name
+        self.domains = domains
+        self.patterns = PatternSet(patterns)
+
+    @classmethod
+    def load(cls, path):
+        """Загружает профиль из файла"""
+        domains = []
+        patterns = []
+        with open(path, "r", encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                line = line.strip()
+                if line.startswith("#"):
+                    key, _, value = line.lstrip("# ").partition(":")
+                    if key.strip().lower() == "domains":
+                        domains.extend(
+                            item.strip().lower()
+                            for item in value.split(",")
+                            if item.strip()
+                        )
+                    continue
+                if not line:
+                    continue
+                try:
+                    patterns.append(Pattern(line))
+                except PatternError as e:
+                    raise PatternError(f"{path}:{number}: {e}") from None
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cls(name, domains, patterns)
+
+    def matches(self, domain):
+        """Применяется ли профиль к домену"""
+        domain = domain.lower()
+        return any(item in domain for item in self.domains)
+
+
+def load_profiles(directory=PROFILES_DIR):
+    """Загружает все профили из каталога (в порядке имен файлов)"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".txt"):
+            continue
+        try:
+            profiles.append(Profile.load(os.path.join(directory, filename)))
+        except (OSError, PatternError) as e:
+            logger.error(f"Ошибка при загрузке профиля {filename}: {e}")
+    return profiles
+
+
+def profile_candidates(domain, directory=PROFILES_DIR):
+    """
+    Кандидаты из всех профилей, подходящих домену
+
+    Returns:
+        PatternSet: Ленивая последовательность префиксов
+    """
+    patterns = []
+    for profile in load_profiles(directory):
+        if profile.matches(domain):
+            logger.info(
+                f"Добавляем {len(profile.patterns)} специальных префиксов "
+                f"для {domain} (профиль {profile.name})"
+            )
+            patterns.extend(profile.patterns.patterns)
+    return PatternSet(patterns)
@@ -0,0 +1,161 @@
+import logging
+import os
+from collections import Counter
+
+from .wordlist import open_wordlist
+
+logger = logging.getLogger(__name__)
+
+# Суффиксы файлов классифицированных результатов (--save-classified)
+CLASSIFIED_SUFFIXES = ("_user", "_technical")
+
+
+def _file_domain(path, names):
+    """
+    Домен файла результатов: по имени файла (finds/example_com.txt,
+    example_com_user.txt), иначе общий суффикс всех имен (не короче двух меток)
+    """
+    stem = os.path.splitext(os.path.basename(path))[0].lower()
+    # Файлы классификации (--save-classified) относятся к тому же домену
+    for suffix in CLASSIFIED_SUFFIXES:
+        if stem.endswith(suffix):
+            stem = stem[: -len(suffix)]
+            break
+    common = None
+    for name in names:
+        labels = name.split(".")
+        if common is None:
+            for index in range(1, len(labels) - 1):
+                if ".".join(labels[index:]).replace(".", "_") == stem:
+                    return ".".join(labels[index:])
+            common = labels[1:]
+        while common and labels[-len(common) :] != common:
+            common = common[1:]
+    if common and len(common) >= 2:
+        return ".".join(common)
+    return None
+
+
+def read_result_prefixes(path):
+    """
+    Домен и префиксы найденных имен из файла результатов
+
+    Префикс - часть имени до домена, как слово словаря: "www", "static.xx".
+
+    Args:
+        path (str): Файл результатов (по одному имени в строке)
+
+    Returns:
+        tuple: (домен или None, если его не удалось определить, список префиксов)
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        names = [
+            line.strip().rstrip(".").lower()
+            for line in file
+            if line.strip() and not line.startswith("*")
+        ]
+    domain = _file_domain(path, names)
+    if domain is None:
+        logger.warning(f"Не удалось определить домен результатов {path}, пропускаем")
+        return None, []
+    suffix = f".{domain}"
+    return domain, [name[: -len(suffix)] for name in names if name.endswith(suffix)]
+
+
+def learn_prefix_counts(finds_dir="finds"):
+    """
+    Считает, для скольких доменов встречался каждый префикс
+
+    Повторы префикса для одного домена учитываются один раз, в том числе
+    в нескольких файлах (example_com.txt, example_com_user.txt и
+    example_com_technical.txt при --save-classified).
+
+    Args:
+        finds_dir (str): Каталог с результатами прошлых сканирований (*.txt)
+
+    Returns:
+        Counter: Префикс -> число доменов
+    """
+    counts = Counter()
+    seen = set()  # Пары (домен, префикс)
+    files = 0
+    if not os.path.isdir(finds_dir):
+        logger.warning(f"Каталог результатов {finds_dir} не найден")
+        return counts
+    for filename in sorted(os.listdir(finds_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        try:
+            domain, prefixes = read_result_prefixes(os.path.join(finds_dir, filename))
+            files += 1
+        except OSError as e:
+            logger.error(f"Ошибка при чтении {filename}: {e}")
+            continue
+        for prefix in prefixes:
+            if (domain, prefix) not in seen:
+                seen.add((domain, prefix))
+                counts[prefix] += 1
+    logger.info(f"Прочитано {files} файлов результатов: {len(counts)} префиксов")
+    return counts
+
+
+def rank_wordlist(words, counts, min_hits=2, top=None):
+    """
+    Упорядочивает словарь по числу доменов, для которых слово находило имя
+
+    Слова с равным числом находок сохраняют исходный порядок (не встречавшиеся
+    идут после всех встречавшихся). Префиксы, которых нет в словаре,
+    добавляются, если они встречались не менее min_hits раз.
+
+    Args:
+        words (iterable): Исходный словарь
+        counts (Counter): Результат learn_prefix_counts
+        min_hits (int): Минимум доменов для добавления нового слова
+        top (int, optional): Оставить только первые top слов
+
+    Returns:
+        list: Ранжированный словарь
+    """
+    words = list(dict.fromkeys(words))
+    known = set(words)
+    learned = sorted(
+        (prefix for prefix, hits in counts.items() if hits >= min_hits),
+        key=lambda prefix: (-counts[prefix], prefix),
+    )
+    words.extend(prefix for prefix in learned if prefix not in known)
+    # sorted() устойчива - при равенстве остается исходный порядок
+    ranked = sorted(words, key=lambda word: -counts.get(word, 0))
+    return ranked[:top] if top is not None else ranked
+
+
+def learn_wordlist(wordlist_file, output_file, finds_dir="finds", min_hits=2, top=None):
+    """
+    Записывает словарь, ранжированный по результатам прошлых сканирований
+
+    Args:
+        wordlist_file (str): Исходный словарь, текстовый или скомпилированный
+            (открывается так же, как для перебора)
+        output_file (str): Файл ранжированного словаря
+        finds_dir (str): Каталог с результатами прошлых сканирований
+        min_hits (int): Минимум доменов для добавления нового слова
+        top (int, optional): Оставить только первые top слов
+
+    Returns:
+        int: Количество слов в ранжированном словаре
+    """
+    counts = learn_prefix_counts(finds_dir)
+    ranked = rank_wordlist(open_wordlist(wordlist_file), counts, min_hits, top)
+
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as file:
+        for word in ranked:
+            file.write(f"{word}\n")
+
+    hits = sum(1 for word in ranked if counts.get(word))
+    logger.info(
+        f"Ранжированный словарь записан в {output_file}: {len(ranked)} слов, "
+        f"из них {hits} находили поддомены"
+    )
+    return len(ranked)
@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import deque
+
+from .async_engine import AsyncDNSEngine, DNSAnswer, iter_in_loop
+from .concurrency import AIMDController
+from .wildcard import WildcardFilter
+
+logger = logging.getLogger(__name__)
+
+
+class _Parent:
+    """Найденное имя, под которым идет перебор, и его результативность"""
+
+    def __init__(self, name, depth, prior):
+        self.name = name
+        self.depth = depth
+        self.prior = prior
+        self.cursor = 0  # Следующее слово словаря
+        self.queries = 0
+        self.hits = 0
+        self.probing = 0  # Сколько пробных имен wildcard еще не проверено
+
+    def score(self, prior_weight, depth_decay):
+        """Оценка доли находок: наблюдаемая с поправкой на априорную и глубину"""
+        rate = (self.hits + self.prior * prior_weight) / (self.queries + prior_weight)
+        return rate * depth_decay ** (self.depth - 1)
+
+
+class RecursiveBruteForce:
+    """
+    Рекурсивный перебор под найденными именами (*.dev.example.com)
+
+    Родители выбираются из очереди с приоритетом по результативности:
+    каждый раз берется порция слов для родителя с лучшей оценкой доли
+    находок. Новый родитель начинает с оценки своего родителя, глубже
+    лежащие имена штрафуются. Каждая находка сразу становится
+    родителем следующего уровня (если позволяет max_depth) после
+    проверки на wildcard DNS. Общее число запросов ограничено max_queries.
+    """
+
+    def __init__(
+        self,
+        domain,
+        wordlist,
+        max_depth=2,
+        max_queries=50000,
+        concurrency=1000,
+        adaptive=False,
+        filter_wildcard=True,
+        chunk=64,
+        initial_rate=0.05,
+        prior_weight=20,
+        depth_decay=0.5,
+    ):
+        """
+        Args:
+            domain (str): Основной домен
+            wordlist (sequence): Словарь для перебора под каждым родителем
+            max_depth (int): Максимальная глубина имен относительно домена
+                (www.example.com - глубина 1)
+            max_queries (int): Общий бюджет запросов рекурсивного перебора
+            concurrency (int): Число запросов в полете (с adaptive - верхняя граница)
+            adaptive (bool): Подбирать число запросов в полете по доле таймаутов
+            filter_wildcard (bool): Проверять родителей на wildcard DNS
+            chunk (int): Сколько слов выдается родителю за один выбор
+            initial_rate (float): Априорная доля находок для исходных имен
+            prior_weight (int): Вес априорной оценки (в запросах)
+            depth_decay (float): Множитель оценки за каждый уровень глубины
+        """
+        self.domain = domain.lower()
+        self.wordlist = wordlist
+        self.max_depth = max_depth
+        self.max_queries = max_queries
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.filter_wildcard = filter_wildcard
+        self.chunk = chunk
+        self.initial_rate = initial_rate
+        self.prior_weight = prior_weight
+        self.depth_decay = depth_decay
+
+        self.queries = 0
+        self.found = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._seen = set()
+
+    def _depth(self, name):
+        return name[: -len(self.domain) - 1].count(".") + 1
+
+    def _score(self, parent):
+        return parent.score(self.prior_weight, self.depth_decay)
+
+    def _push(self, parent):
+        heapq.heappush(self._heap, (-self._score(parent), next(self._sequence), parent))
+
+    def _next_parent(self):
+        """Родитель с лучшей актуальной оценкой (оценки в куче обновляются лениво)"""
+        while self._heap:
+            _, _, parent = heapq.heappop(self._heap)
+            current = -self._score(parent)
+            if self._heap and current > self._heap[0][0]:
+                # Оценка ухудшилась с момента добавления - возвращаем в очередь
+                self._push(parent)
+                continue
+            return parent
+        return None
+
+    def _names(self):
+        """Следующая порция имен для родителя с лучшей оценкой"""
+        parent = self._next_parent()
+        if parent is None:
+            return []
+        end = min(parent.cursor + self.chunk, len(self.wordlist))
+        words = [self.wordlist[index] for index in range(parent.cursor, end)]
+        parent.cursor = end
+        if parent.cursor < len(self.wordlist):
+            self._push(parent)
+        return [(parent, f"{word}.{parent.name}") for word in words]
+
+    def _eligible(self, name):
+        """Может ли имя стать родителем (под ним есть куда углубляться)"""
+        name = name.lower()
+        return (
+            name.endswith(f".{self.domain}")
+            and not name.startswith("*")
+            and name not in self._seen
+            and self._depth(name) < self.max_depth
+        )
+
+    def _add_parent(self, name, prior, wildcard, probes):
+        """Добавляет родителя; с фильтром wildcard - сначала в очередь проверки"""
+        self._seen.add(name)
+        parent = _Parent(name, self._depth(name), prior)
+        if wildcard is None:
+            self._push(parent)
+            return
+        names = wildcard.probe_names(name)
+        parent.probing = len(names)
+        probes.extend((parent, probe) for probe in names)
+
+    def _on_probe(self, parent, answer, wildcard):
+        """Ответ на пробное имя родителя; после всех проб родитель готов к перебору"""
+        wildcard.add_probe(parent.name, answer)
+        parent.probing -= 1
+        if parent.probing:
+            return
+        if wildcard.has_wildcard(parent.name):
+            logger.warning(
+                f"Обнаружен wildcard DNS для *.{parent.name}, перебор под ним пропущен"
+            )
+            return
+        self._push(parent)
+
+    async def _run(self, seeds, controller, wildcard, on_found, stop):
+        probes = deque()  # Пробные имена новых родителей - проверяются в первую очередь
+        for name in seeds:
+            self._add_parent(name, self.initial_rate, wildcard, probes)
+
+        async with AsyncDNSEngine(
+            concurrency=self.concurrency, controller=controller, wildcard=wildcard
+        ) as engine:
+            queued = deque()
+            pending = {}
+            while not stop.is_set():
+                limit = controller.limit if controller else engine.concurrency
+                while len(pending) < limit and self.queries < self.max_queries:
+                    if probes:
+                        parent, name = probes.popleft()
+                        probe = True
+                    else:
+                        if not queued:
+                            queued.extend(self._names())
+                            if not queued:
+                                break
+                        parent, name = queued.popleft()
+                        probe = False
+                    self.queries += 1
+                    task = asyncio.ensure_future(engine.resolve(name))
+                    pending[task] = (parent, name, probe)
+
+                if not pending:
+                    break
+
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    parent, name, probe = pending.pop(task)
+                    try:
+                        answer = task.result()
+                    except (Exception, asyncio.CancelledError) as e:
+                        # Имя считается неразрешенным, перебор продолжается
+                        logger.debug(f"Ошибка при разрешении {name}: {e!r}")
+                        answer = DNSAnswer(name, None)
+                    if probe:
+                        self._on_probe(parent, answer, wildcard)
+                        continue
+
+                    parent.queries += 1
+                    if not answer.exists or (
+                        wildcard is not None
+                        and wildcard.is_wildcard(answer.name, answer.ips, answer.cnames)
+                    ):
+                        continue
+
+                    parent.hits += 1
+                    self.found += 1
+                    on_found(answer.name)
+                    if self._eligible(answer.name):
+                        # Новый родитель начинает с оценки своего родителя
+                        self._add_parent(
+                            answer.name, self._score(parent), wildcard, probes
+                        )
+
+            for task in pending:
+                task.cancel()
+
+    def iter_subdomains(self, seeds):
+        """
+        Генератор: рекурсивно перебирает имена под seeds и выдает находки
+
+        Args:
+            seeds (iterable): Уже найденные полные имена - первые родители
+        """
+        seeds = sorted({name.lower() for name in seeds if self._eligible(name)})
+        if not seeds or not len(self.wordlist):
+            return
+
+        logger.info(
+            f"Рекурсивный перебор под {len(seeds)} именами "
+            f"(глубина до {self.max_depth}, бюджет {self.max_queries} запросов)"
+        )
+        controller = None
+        if self.adaptive:
+            controller = AIMDController(
+                initial=min(50, self.concurrency),
+                minimum=10,
+                maximum=self.concurrency,
+            )
+        wildcard = WildcardFilter() if self.filter_wildcard else None
+
+        yield from iter_in_loop(
+            lambda on_found, stop: self._run(
+                seeds, controller, wildcard, on_found, stop
+            )
+        )
+
+        logger.info(
+            f"Рекурсивный перебор: {self.queries} запросов, найдено {self.found} имен"
+        )
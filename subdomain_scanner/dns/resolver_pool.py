@@ -0,0 +1,142 @@
+import threading
+import time
+import dns.exception
+import dns.name
+import dns.rdatatype
+import dns.resolver
+
+from .zone_transfer import PUBLIC_DNS_SERVERS
+from .cache import get_cache, CACHE_OK, CACHE_NXDOMAIN, CACHE_NOANSWER
+from .budget import get_budget
+from .health import get_scheduler, OUTCOME_OK, OUTCOME_TIMEOUT, OUTCOME_SERVFAIL
+
+# Профили резолверов: допустимые DNS-серверы, таймаут одного запроса
+# и общее время на разрешение имени. Сервер для каждого запроса выбирает
+# планировщик по состоянию здоровья серверов.
+RESOLVER_PROFILES = {
+    # Проверка существования поддоменов (перебор, Certificate Transparency)
+    "default": {
+        "nameservers": PUBLIC_DNS_SERVERS,
+        "timeout": 1.0,
+        "lifetime": 2.0,
+    },
+    # Проверка DNS-записей при классификации
+    "classify": {
+        "nameservers": PUBLIC_DNS_SERVERS[:3],
+        "timeout": 2.0,
+        "lifetime": 3.0,
+    },
+}
+
+_local = threading.local()
+
+
+def create_resolver(profile="default", server=None):
+    """Создает и настраивает новый резолвер по профилю (для одного сервера или всех)"""
+    settings = RESOLVER_PROFILES[profile]
+
+    # configure=False - не читаем /etc/resolv.conf, серверы задаются явно
+    resolver = dns.resolver.Resolver(configure=False)
+    resolver.nameservers = [server] if server else list(settings["nameservers"])
+    resolver.timeout = settings["timeout"]
+    resolver.lifetime = settings["lifetime"]
+    return resolver
+
+
+def get_resolver(profile="default", server=None):
+    """Возвращает резолвер текущего потока для профиля, создавая его при первом обращении"""
+    resolvers = getattr(_local, "resolvers", None)
+    if resolvers is None:
+        resolvers = _local.resolvers = {}
+
+    key = (profile, server)
+    resolver = resolvers.get(key)
+    if resolver is None:
+        resolver = resolvers[key] = create_resolver(profile, server)
+    return resolver
+
+
+def _negative_ttl(response):
+    """TTL отрицательного ответа по SOA из секции authority (RFC 2308)"""
+    if response is None:
+        return None
+    for rrset in response.authority:
+        if rrset.rdtype == dns.rdatatype.SOA:
+            return min(rrset.ttl, rrset[0].minimum)
+    return None
+
+
+def _can_retry(tried, settings, deadline):
+    """Есть ли время и непробованные серверы для повторного запроса"""
+    return (
+        len(tried) < len(settings["nameservers"]) and deadline - time.monotonic() > 0.05
+    )
+
+
+def resolve(name, rdtype="A", profile="default"):
+    """
+    Разрешает имя через общий кэш DNS, выбирая сервер планировщиком
+
+    При таймауте или SERVFAIL запрос повторяется через другой сервер,
+    пока не истечет общее время профиля.
+
+    Returns:
+        list: Значения записей в текстовом виде (для A - IP-адреса)
+
+    Raises:
+        dns.resolver.NXDOMAIN, dns.resolver.NoAnswer и прочие исключения dnspython
+    """
+    cache = get_cache()
+    entry = cache.get(name, rdtype)
+    if entry is not None:
+        if entry.status == CACHE_NXDOMAIN:
+            raise dns.resolver.NXDOMAIN(qnames=[dns.name.from_text(name)], responses={})
+        if entry.status == CACHE_NOANSWER:
+            raise dns.resolver.NoAnswer()
+        return entry.records
+
+    settings = RESOLVER_PROFILES[profile]
+    scheduler = get_scheduler()
+    budget = get_budget()
+    deadline = time.monotonic() + settings["lifetime"]
+    tried = []
+
+    while True:
+        server = scheduler.pick(settings["nameservers"], exclude=tried)
+        tried.append(server)
+        started = time.monotonic()
+        try:
+            with budget:
+                answer = get_resolver(profile, server).resolve(
+                    name, rdtype, lifetime=min(settings["timeout"], deadline - started)
+                )
+            scheduler.record(server, OUTCOME_OK, time.monotonic() - started)
+            break
+        except dns.resolver.NXDOMAIN as e:
+            scheduler.record(server, OUTCOME_OK, time.monotonic() - started)
+            responses = e.kwargs.get("responses") or {}
+            response = next(iter(responses.values()), None)
+            cache.put(name, rdtype, CACHE_NXDOMAIN, ttl=_negative_ttl(response))
+            raise
+        except dns.resolver.NoAnswer as e:
+            scheduler.record(server, OUTCOME_OK, time.monotonic() - started)
+            cache.put(
+                name,
+                rdtype,
+                CACHE_NOANSWER,
+                ttl=_negative_ttl(e.kwargs.get("response")),
+            )
+            raise
+        except dns.exception.Timeout:
+            scheduler.record(server, OUTCOME_TIMEOUT)
+            if not _can_retry(tried, settings, deadline):
+                raise
+        except dns.resolver.NoNameservers:
+            # SERVFAIL или REFUSED - пробуем другой сервер
+            scheduler.record(server, OUTCOME_SERVFAIL, time.monotonic() - started)
+            if not _can_retry(tried, settings, deadline):
+                raise
+
+    records = [rdata.to_text() for rdata in answer]
+    cache.put(name, rdtype, CACHE_OK, records, answer.rrset.ttl)
+    return records
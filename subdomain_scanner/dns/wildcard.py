@@ -0,0 +1,152 @@
+import logging
+import random
+import string
+
+import dns.resolver
+
+from .resolver_pool import resolve
+
+logger = logging.getLogger(__name__)
+
+_PROBE_ALPHABET = string.ascii_lowercase + string.digits
+
+
+def random_label(length=12):
+    """Случайная метка, которая заведомо не должна существовать"""
+    return "".join(random.choices(_PROBE_ALPHABET, k=length))
+
+
+def word_suffixes(words):
+    """
+    Возвращает родительские части слов с точкой, не зависящие от домена
+
+    Для "static.xx" - "xx"; слова без точки пропускаются.
+    """
+    return {word.split(".", 1)[1].lower() for word in words if "." in word}
+
+
+def parent_zones(domain, words):
+    """
+    Возвращает родительские зоны, на уровнях которых идет перебор
+
+    Для слова "www" родитель - сам домен, для "static.xx" - "xx.<домен>".
+    """
+    domain = domain.lower()
+    return {domain} | {f"{suffix}.{domain}" for suffix in word_suffixes(words)}
+
+
+class WildcardFilter:
+    """
+    Обнаружение wildcard DNS и отбрасывание ответов, совпадающих с wildcard
+
+    Для каждой родительской зоны разрешаются несколько случайных меток;
+    полученные IP-адреса и CNAME запоминаются как отпечаток wildcard.
+    Найденное имя отбрасывается, если все его адреса входят в отпечаток
+    своей зоны или оно указывает на тот же CNAME.
+    """
+
+    def __init__(self, probes=3):
+        """
+        Args:
+            probes (int): Количество случайных меток на каждую зону
+        """
+        self.probes = probes
+        self._ips = {}
+        self._cnames = {}
+        self.discarded = 0
+
+    @property
+    def zones(self):
+        """Зоны, для которых обнаружен wildcard"""
+        return sorted(set(self._ips) | set(self._cnames))
+
+    def _add(self, zone, ips, cnames):
+        if ips:
+            self._ips.setdefault(zone, set()).update(ips)
+        if cnames:
+            self._cnames.setdefault(zone, set()).update(
+                cname.rstrip(".").lower() for cname in cnames
+            )
+
+    def _log_zones(self, zones=None):
+        for zone in self.zones if zones is None else zones:
+            if not self.has_wildcard(zone):
+                continue
+            answers = self._ips.get(zone, set()) | self._cnames.get(zone, set())
+            logger.warning(
+                f"Обнаружен wildcard DNS для *.{zone}: {', '.join(sorted(answers))}"
+            )
+
+    def detect(self, zones):
+        """Проверяет зоны на wildcard через синхронный резолвер"""
+        for zone in zones:
+            for _ in range(self.probes):
+                probe = f"{random_label()}.{zone}"
+                try:
+                    self._add(zone, resolve(probe, "A"), None)
+                except dns.resolver.NoAnswer:
+                    try:
+                        self._add(zone, None, resolve(probe, "CNAME"))
+                    except Exception:
+                        pass
+                except Exception:
+                    pass
+        self._log_zones()
+
+    def probe_names(self, zone):
+        """Случайные имена для проверки зоны на wildcard"""
+        return [f"{random_label()}.{zone}" for _ in range(self.probes)]
+
+    def add_probe(self, zone, answer):
+        """Учитывает ответ (DNSAnswer) на пробное имя зоны"""
+        if answer.exists:
+            self._add(zone, answer.ips, answer.cnames)
+
+    def has_wildcard(self, zone):
+        """Обнаружен ли wildcard для зоны"""
+        return zone in self._ips or zone in self._cnames
+
+    async def detect_async(self, engine, zones):
+        """
+        Проверяет зоны на wildcard через асинхронный движок
+
+        Может вызываться повторно для новых зон: отпечатки уже проверенных
+        зон и счетчик отброшенных ответов сохраняются.
+        """
+        zones = sorted(set(zones))
+        discarded = self.discarded
+        probes = [(zone, probe) for zone in zones for probe in self.probe_names(zone)]
+        zone_by_probe = {probe: zone for zone, probe in probes}
+
+        def on_result(answer):
+            self.add_probe(zone_by_probe[answer.name], answer)
+
+        await engine.scan((probe for _, probe in probes), on_result)
+        # Пробные имена, отмеченные движком как wildcard, не считаем
+        self.discarded = discarded
+        self._log_zones(zones)
+
+    def is_wildcard(self, name, ips=(), cnames=()):
+        """
+        Проверяет, совпадает ли ответ для имени с wildcard его родительской зоны
+
+        Args:
+            name (str): Найденное полное имя
+            ips (iterable): IP-адреса из ответа
+            cnames (iterable): CNAME-цели из ответа
+        """
+        zone = name.rstrip(".").lower().split(".", 1)[-1]
+        wildcard_ips = self._ips.get(zone)
+        wildcard_cnames = self._cnames.get(zone)
+        if not wildcard_ips and not wildcard_cnames:
+            return False
+
+        ips = set(ips)
+        cnames = {cname.rstrip(".").lower() for cname in cnames}
+        matched = bool(
+            (ips and wildcard_ips and ips <= wildcard_ips)
+            or (cnames and wildcard_cnames and cnames & wildcard_cnames)
+        )
+        if matched:
+            self.discarded += 1
+        return matched
@@ -0,0 +1,313 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Формат скомпилированного словаря:
+#   заголовок: MAGIC, версия, число слов, смещение таблицы строк, смещение хэшей
+#   данные: слова в UTF-8 подряд, без разделителей
+#   таблица строк: count + 1 смещений uint64 от начала файла
+#   (слово i = file[off[i]:off[i + 1]])
+#   хэши: отсортированные 64-битные хэши слов для проверки вхождения
+# Таблицы записаны в порядке байтов платформы, на которой словарь скомпилирован.
+MAGIC = b"SDWL"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHxxQQQ")
+
+# Способы исключения повторов при чтении текстового словаря
+DEDUP_SET = "set"
+DEDUP_BLOOM = "bloom"
+DEDUP_MODES = (DEDUP_SET, DEDUP_BLOOM)
+
+# Текстовые словари от этого размера (в байтах) при открытии компилируются
+# в файл рядом со словарем и отображаются в память вместо чтения в список
+AUTO_COMPILE_SIZE = 8 * 1024 * 1024
+
+
+def word_hash(word):
+    """64-битный хэш слова (стабильный между запусками, в отличие от hash())"""
+    return int.from_bytes(
+        hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: приблизительная проверка "уже встречалось" с
+    фиксированным объемом памяти
+
+    Ложноотрицательных ответов нет; ложноположительные - с вероятностью
+    error_rate при заполнении до capacity элементов.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Args:
+            capacity (int): Ожидаемое число элементов
+            error_rate (float): Допустимая доля ложноположительных ответов
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item):
+        """Добавляет элемент, возвращает True если его (вероятно) уже не было"""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        return added
+
+    def __contains__(self, item):
+        return all(
+            self._bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(item)
+        )
+
+
+def iter_wordlist(wordlist_file, dedup=DEDUP_SET, capacity=10_000_000):
+    """
+    Генератор слов из текстового словаря без повторов, с чтением построчно
+
+    Args:
+        wordlist_file (str): Путь к файлу словаря
+        dedup (str): "set" - точное исключение повторов (память растет со
+            словарем), "bloom" - фильтр Блума фиксированного размера
+            (редкие уникальные слова могут быть ошибочно пропущены)
+        capacity (int): Ожидаемое число слов для фильтра Блума
+    """
+    if dedup == DEDUP_BLOOM:
+        seen = BloomFilter(capacity)
+        is_new = seen.add
+    else:
+        seen = set()
+
+        def is_new(word):
+            if word in seen:
+                return False
+            seen.add(word)
+            return True
+
+    with open(wordlist_file, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            word = line.strip()
+            if word and is_new(word):
+                yield word
+
+
+class CompiledWordlist:
+    """
+    Скомпилированный словарь, отображенный в память
+
+    Открывается мгновенно независимо от размера: слова читаются из файла
+    по требованию. Поддерживает len(), индексацию, обход и проверку
+    вхождения (двоичный поиск по отсортированным хэшам).
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Путь к файлу, созданному compile_wordlist
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, offsets_at, hashes_at = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} не является скомпилированным словарем")
+
+        view = memoryview(self._mmap)
+        self._count = count
+        self._offsets = view[offsets_at : offsets_at + (count + 1) * 8].cast("Q")
+        self._hashes = view[hashes_at : hashes_at + count * 8].cast("Q")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("индекс вне словаря")
+        return self._mmap[self._offsets[index] : self._offsets[index + 1]].decode(
+            "utf-8"
+        )
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def __contains__(self, word):
+        target = word_hash(word)
+        position = bisect_left(self._hashes, target)
+        return position < self._count and self._hashes[position] == target
+
+    def close(self):
+        """Освобождает отображение файла"""
+        self._offsets.release()
+        self._hashes.release()
+        self._mmap.close()
+
+
+def is_compiled_wordlist(path):
+    """Проверяет, что файл - скомпилированный словарь"""
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def compile_wordlist(source, target, dedup=None):
+    """
+    Компилирует текстовый словарь в двоичный формат для CompiledWordlist
+
+    Словарь читается построчно, повторы исключаются (см. iter_wordlist).
+
+    Args:
+        source (str): Текстовый словарь
+        target (str): Файл результата
+        dedup (str, optional): Способ исключения повторов: "set" или "bloom"
+            (по умолчанию - заданный set_wordlist_dedup)
+
+    Returns:
+        int: Количество слов в скомпилированном словаре
+    """
+    dedup = dedup or get_wordlist_dedup()
+    offsets = array("Q", [_HEADER.size])
+    hashes = array("Q")
+    temp_path = f"{target}.tmp"
+
+    with open(temp_path, "wb") as out:
+        out.write(b"\0" * _HEADER.size)
+        position = _HEADER.size
+        for word in iter_wordlist(source, dedup):
+            data = word.encode("utf-8")
+            out.write(data)
+            position += len(data)
+            offsets.append(position)
+            hashes.append(word_hash(word))
+
+        count = len(hashes)
+        # Таблицы выравниваем по 8 байт для memoryview.cast
+        padding = -position % 8
+        out.write(b"\0" * padding)
+        offsets_at = position + padding
+        out.write(offsets.tobytes())
+        hashes_at = offsets_at + len(offsets) * 8
+        out.write(array("Q", sorted(hashes)).tobytes())
+
+        out.seek(0)
+        out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, count, offsets_at, hashes_at))
+
+    os.replace(temp_path, target)
+    logger.info(f"Словарь {source} скомпилирован в {target}: {count} слов")
+    return count
+
+
+class DomainWordlist:
+    """Словарь плюс специальные префиксы домена, без копирования основного словаря"""
+
+    def __init__(self, base, extras=()):
+        """
+        Args:
+            base (sequence): Основной словарь (список или CompiledWordlist)
+            extras (sequence): Дополнительные слова (например, PatternSet)
+        """
+        self.base = base
+        self.extras = extras
+
+    def __len__(self):
+        return len(self.base) + len(self.extras)
+
+    def __getitem__(self, index):
+        if index < len(self.base):
+            return self.base[index]
+        return self.extras[index - len(self.base)]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.extras
+
+
+_dedup = DEDUP_SET
+
+
+def get_wordlist_dedup():
+    """Способ исключения повторов в текстовых словарях по умолчанию"""
+    return _dedup
+
+
+def set_wordlist_dedup(dedup):
+    """Задает способ исключения повторов в текстовых словарях по умолчанию"""
+    global _dedup
+    if dedup not in DEDUP_MODES:
+        raise ValueError(f"неизвестный способ исключения повторов: {dedup}")
+    _dedup = dedup
+    return dedup
+
+
+def compiled_path(wordlist_file, dedup):
+    """Файл, в который автоматически компилируется текстовый словарь"""
+    return f"{wordlist_file}.{dedup}.sdwl"
+
+
+def open_wordlist(wordlist_file, dedup=None, auto_compile_size=AUTO_COMPILE_SIZE):
+    """
+    Открывает словарь: скомпилированный - через отображение в память,
+    текстовый - читается построчно без повторов
+
+    Большой текстовый словарь (от auto_compile_size байт) один раз
+    компилируется в файл рядом с ним (compiled_path) и дальше открывается
+    через отображение в память, пока исходный файл не изменится; так ни
+    список слов, ни множество для исключения повторов не держатся в памяти
+    во время перебора.
+
+    Args:
+        wordlist_file (str): Путь к словарю
+        dedup (str, optional): Способ исключения повторов: "set" или "bloom"
+            (по умолчанию - заданный set_wordlist_dedup)
+        auto_compile_size (int, optional): Размер текстового словаря, с которого
+            он компилируется (None - не компилировать)
+
+    Returns:
+        sequence: CompiledWordlist или список слов
+    """
+    if is_compiled_wordlist(wordlist_file):
+        return CompiledWordlist(wordlist_file)
+
+    dedup = dedup or get_wordlist_dedup()
+    if (
+        auto_compile_size is not None
+        and os.path.getsize(wordlist_file) >= auto_compile_size
+    ):
+        target = compiled_path(wordlist_file, dedup)
+        try:
+            if not (
+                os.path.exists(target)
+                and os.path.getmtime(target) >= os.path.getmtime(wordlist_file)
+            ):
+                logger.info(f"Компиляция большого словаря {wordlist_file} в {target}")
+                compile_wordlist(wordlist_file, target, dedup)
+            return CompiledWordlist(target)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось скомпилировать словарь {wordlist_file}: {e}")
+    return list(iter_wordlist(wordlist_file, dedup))
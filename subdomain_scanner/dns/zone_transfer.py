@@ -1,12 +1,18 @@
 import dns.resolver
 import dns.query
-import dns.zone
+import dns.rdatatype
 import logging
-import time
+import queue
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Наибольшее число записей, ожидающих обработки (остальные сообщения
+# передачи зоны не читаются из сокета, пока потребитель не освободит место)
+RECORD_QUEUE_SIZE = 10000
+
 # Публичные DNS-серверы для повышения надежности сканирования
 PUBLIC_DNS_SERVERS = [
     # Google DNS
@@ -27,10 +33,14 @@ PUBLIC_DNS_SERVERS = [
 ]
 
 
-def try_zone_transfer(domain):
-    """Пытается выполнить передачу зоны DNS (Zone Transfer)"""
-    logger.info(f"Попытка передачи зоны для {domain}...")
-    found_subdomains = []
+def _get_nameservers(domain):
+    """
+    NS-серверы домена через публичные DNS-серверы
+
+    Returns:
+        tuple: (список имен NS-серверов, резолвер для дальнейших запросов);
+               список пуст, если NS-записи получить не удалось
+    """
 
     # Перемешиваем список DNS-серверов для распределения нагрузки
     dns_servers = PUBLIC_DNS_SERVERS.copy()
@@ -85,7 +95,7 @@ def try_zone_transfer(domain):
 
         except dns.resolver.NXDOMAIN:
             logger.error(f"Домен {domain} не существует")
-            return found_subdomains
+            return [], custom_resolver
         except dns.resolver.NoAnswer:
             logger.warning(f"Нет NS-записей для домена {domain}")
             # Продолжаем, возможно другой сервер даст ответ
@@ -103,27 +113,155 @@ def try_zone_transfer(domain):
             f"Не удалось получить NS-записи для {domain} через все DNS-серверы"
         )
         # Возвращаем пустой список, основная логика будет использовать другие методы
-        return found_subdomains
+        return [], custom_resolver
+
+    return nameservers, custom_resolver
+
+
+def _nameserver_addresses(nameservers, resolver):
+    """IPv4- и IPv6-адреса NS-серверов (запросы выполняются одновременно)"""
+
+    def lookup(query):
+        ns, rdtype = query
+        try:
+            return [(ns, rdata.address) for rdata in resolver.resolve(ns, rdtype)]
+        except Exception as e:
+            logger.debug(f"Не удалось получить {rdtype}-записи {ns}: {e}")
+            return []
+
+    queries = [(ns, rdtype) for ns in nameservers for rdtype in ("A", "AAAA")]
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        return [address for found in executor.map(lookup, queries) for address in found]
+
+
+def _put(records, item, stop):
+    """Кладет элемент в очередь, пока потребитель не прекратил чтение"""
+    while not stop.is_set():
+        try:
+            records.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+_DONE = object()
 
-    # Если получили NS-записи, пробуем выполнить передачу зоны
-    for ns in nameservers:
-        logger.info(f"Попытка передачи зоны с {ns}...")
+
+def iter_zone_records(domain, addresses=None, timeout=5.0, port=53):
+    """
+    Генератор записей зоны: передача зоны (AXFR) со всех NS-серверов сразу
+
+    Передача запускается одновременно с каждым адресом каждого NS-сервера;
+    первый сервер, начавший передачу, продолжает ее, остальные соединения
+    закрываются. Сообщения передачи разбираются по мере получения, а
+    очередь записей ограничена RECORD_QUEUE_SIZE, поэтому зона любого
+    размера не накапливается в памяти.
+
+    Args:
+        domain (str): Домен
+        addresses (list, optional): Пары (имя сервера, IP-адрес); по умолчанию
+            адреса NS-серверов домена
+        timeout (float): Таймаут ожидания каждого сообщения в секундах
+        port (int): Порт DNS-серверов
+
+    Yields:
+        tuple: (полное имя, тип записи), например ("www.example.com", "A")
+    """
+    logger.info(f"Попытка передачи зоны для {domain}...")
+    if addresses is None:
+        nameservers, resolver = _get_nameservers(domain)
+        if not nameservers:
+            return
+        addresses = _nameserver_addresses(nameservers, resolver)
+        if not addresses:
+            logger.warning(f"Не удалось получить адреса NS-серверов {domain}")
+            return
+
+    records = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+    stop = threading.Event()
+    lock = threading.Lock()
+    winner = []
+
+    def transfer(ns, address):
+        error = None
         try:
-            # Устанавливаем короткий таймаут для xfr запроса
-            # Пытаемся передать зону
-            z = dns.zone.from_xfr(dns.query.xfr(ns, domain, timeout=5))
-            for name, node in z.nodes.items():
-                name = str(name)
-                if name != "@":
-                    found_subdomains.append(f"{name}.{domain}")
-            logger.info(f"Успешная передача зоны с {ns}!")
-            break  # Если успешно, прерываем цикл
+            for message in dns.query.xfr(address, domain, timeout=timeout, port=port):
+                # Первое сообщение получено - передачу ведет первый успевший сервер
+                with lock:
+                    if not winner:
+                        winner.append((ns, address))
+                        logger.info(f"Передача зоны с {ns} ({address})...")
+                    if winner[0] != (ns, address):
+                        return
+                for rrset in message.answer:
+                    name = rrset.name.to_text()
+                    if name == "@":
+                        continue
+                    record = (f"{name}.{domain}", dns.rdatatype.to_text(rrset.rdtype))
+                    if not _put(records, record, stop):
+                        return
         except dns.exception.FormError:
-            logger.debug(f"Сервер {ns} не поддерживает передачу зоны")
+            error = "сервер не поддерживает передачу зоны"
         except dns.exception.Timeout:
-            logger.debug(f"Таймаут при запросе к {ns}")
+            error = "таймаут"
         except Exception as e:
-            logger.debug(f"Передача зоны с {ns} не удалась: {e}")
+            error = e
+        if error is not None:
+            logger.debug(f"Передача зоны с {ns} ({address}) не удалась: {error}")
+        _put(records, (_DONE, (ns, address), error), stop)
+
+    for ns, address in addresses:
+        # Потоки-демоны: проигравшие серверы могут ждать ответа до таймаута
+        threading.Thread(target=transfer, args=(ns, address), daemon=True).start()
+
+    remaining = len(addresses)
+    count = 0
+    try:
+        while remaining:
+            item = records.get()
+            if item[0] is not _DONE:
+                count += 1
+                yield item
+                continue
+            remaining -= 1
+            _, server, error = item
+            if winner and winner[0] == server:
+                if error is None:
+                    logger.info(
+                        f"Успешная передача зоны с {server[0]}: {count} записей"
+                    )
+                else:
+                    logger.warning(
+                        f"Передача зоны с {server[0]} прервана после {count} записей: "
+                        f"{error}"
+                    )
+                break
+    finally:
+        stop.set()
+
+    if not winner:
+        logger.info("Ни один NS-сервер не разрешил передачу зоны")
+
+
+def iter_zone_transfer(domain, **kwargs):
+    """
+    Генератор поддоменов, полученных передачей зоны, по мере получения
+
+    Args:
+        kwargs: Параметры iter_zone_records
+    """
+    last = None
+    for name, _ in iter_zone_records(domain, **kwargs):
+        # Записи одного имени в передаче зоны обычно идут подряд
+        if name != last:
+            last = name
+            yield name
+
+
+def try_zone_transfer(domain):
+    """Пытается выполнить передачу зоны DNS (Zone Transfer)"""
+    found_subdomains = list(dict.fromkeys(iter_zone_transfer(domain)))
 
     if found_subdomains:
         logger.info(f"Найдено {len(found_subdomains)} поддоменов через передачу зоны")
@@ -1,13 +1,48 @@
 import logging
 import os
 import asyncio
+import queue
+import threading
 import aiodns
-from .dns import try_zone_transfer, find_subdomains
-from .cert import search_certificate_transparency
+from .dns import (
+    iter_zone_transfer,
+    iter_subdomains,
+    iter_subdomains_async,
+)
+from .dns.brute_force import build_wordlist
+from .dns.mutations import MutationStage
+from .dns.recursive import RecursiveBruteForce
+from .dns.cache import get_cache, CACHE_OK, CACHE_NXDOMAIN
+from .dns.health import get_scheduler
+from .dns.checkpoint import Checkpoint
+from .cert import iter_certificate_transparency
 from .utils import save_results, classify_subdomains
 
 logger = logging.getLogger(__name__)
 
+# Код ошибки c-ares для несуществующего домена
+ARES_ENOTFOUND = 4
+
+# Источники найденных поддоменов (второй элемент кортежей из iter_scan)
+SOURCE_ZONE_TRANSFER = "zone_transfer"
+SOURCE_CERTIFICATE_TRANSPARENCY = "certificate_transparency"
+SOURCE_BRUTE_FORCE = "brute_force"
+SOURCE_MUTATION = "mutation"
+SOURCE_RECURSIVE = "recursive"
+
+# Сколько секунд ждать остановки потоков методов после прерывания сканирования
+STOP_TIMEOUT = 5.0
+
+
+def _close_generator(generator):
+    """Закрывает генератор метода, если он не выполняется в другом потоке"""
+    try:
+        generator.close()
+    except ValueError:
+        # Генератор сейчас выполняется - его закроет собственный поток,
+        # когда получит следующий элемент и увидит сигнал остановки
+        pass
+
 
 class SubdomainScanner:
     """Класс для сканирования поддоменов разными методами"""
@@ -17,6 +52,16 @@ class SubdomainScanner:
         domain,
         wordlist_path="wordlists/subdomains-top1million-5000.txt",
         threads=10,
+        engine="threads",
+        concurrency=1000,
+        adaptive=False,
+        filter_wildcard=True,
+        parallel_methods=False,
+        checkpoint_path=None,
+        resume=False,
+        mutations=0,
+        recursive_depth=0,
+        recursive_queries=50000,
     ):
         """
         Инициализирует сканер поддоменов
@@ -25,10 +70,34 @@ class SubdomainScanner:
             domain (str): Домен для сканирования
             wordlist_path (str): Путь к файлу словаря
             threads (int): Количество потоков для параллельного сканирования
+            engine (str): Движок перебора: "threads" или "async"
+            concurrency (int): Количество одновременных запросов для движка "async"
+                (в адаптивном режиме - верхняя граница для обоих движков)
+            adaptive (bool): Подбирать число одновременных запросов по доле таймаутов
+            filter_wildcard (bool): Отбрасывать при переборе ответы wildcard DNS
+            parallel_methods (bool): Запускать методы сканирования одновременно
+            checkpoint_path (str, optional): Файл состояния перебора для продолжения
+                после сбоя (None - без сохранения состояния)
+            resume (bool): Продолжить перебор из checkpoint_path, а не начинать заново
+            mutations (int): Бюджет запросов этапа мутаций найденных имен
+                (0 - этап отключен)
+            recursive_depth (int): Максимальная глубина рекурсивного перебора под
+                найденными именами (0 - этап отключен, 2 - *.dev.example.com)
+            recursive_queries (int): Бюджет запросов рекурсивного перебора
         """
         self.domain = domain
         self.wordlist_path = wordlist_path
         self.threads = threads
+        self.engine = engine
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.filter_wildcard = filter_wildcard
+        self.parallel_methods = parallel_methods
+        self.checkpoint_path = checkpoint_path
+        self.resume = resume
+        self.mutations = mutations
+        self.recursive_depth = recursive_depth
+        self.recursive_queries = recursive_queries
         self.found_subdomains = set()
 
         # Дополнительные настройки
@@ -37,16 +106,125 @@ class SubdomainScanner:
     async def _async_dns_query(self, subdomain):
         """Асинхронный DNS-запрос для дополнительной проверки"""
         full_domain = f"{subdomain}.{self.domain}"
+        cache = get_cache()
+        entry = cache.get(full_domain, "A")
+        if entry is not None:
+            return full_domain if entry.status == CACHE_OK else None
+
         try:
-            await self.resolver.query(full_domain, "A")
+            answers = await self.resolver.query(full_domain, "A")
+            cache.put(
+                full_domain,
+                "A",
+                CACHE_OK,
+                [answer.host for answer in answers],
+                min(answer.ttl for answer in answers),
+            )
             return full_domain
+        except aiodns.error.DNSError as e:
+            if e.args and e.args[0] == ARES_ENOTFOUND:
+                cache.put(full_domain, "A", CACHE_NXDOMAIN)
+            return None
         except Exception:
             return None
 
+    def iter_zone_transfer(self):
+        """Генератор поддоменов, найденных через передачу зоны DNS"""
+        logger.info(f"Запуск сканирования через передачу зоны для {self.domain}")
+        yield from iter_zone_transfer(self.domain)
+
+    def iter_certificate_transparency(self):
+        """Генератор поддоменов, найденных через логи прозрачности сертификатов"""
+        logger.info(f"Запуск сканирования через логи сертификатов для {self.domain}")
+        yield from iter_certificate_transparency(self.domain)
+
+    def iter_brute_force(self):
+        """Генератор поддоменов, найденных методом перебора из словаря"""
+        logger.info(f"Запуск сканирования перебором для {self.domain}")
+
+        if not os.path.exists(self.wordlist_path):
+            logger.error(f"Файл словаря {self.wordlist_path} не найден")
+            logger.info(
+                "Скачайте словарь или укажите путь к существующему. "
+                "Пример: https://github.com/danielmiessler/SecLists/raw/master/"
+                "Discovery/DNS/subdomains-top1million-5000.txt"
+            )
+            return
+
+        checkpoint = None
+        if self.checkpoint_path:
+            checkpoint = Checkpoint(
+                self.checkpoint_path, self.domain, self.wordlist_path
+            )
+            if not self.resume:
+                checkpoint.clear()
+
+        if self.engine == "async":
+            yield from iter_subdomains_async(
+                self.domain,
+                self.wordlist_path,
+                self.concurrency,
+                self.adaptive,
+                filter_wildcard=self.filter_wildcard,
+                checkpoint=checkpoint,
+            )
+        else:
+            yield from iter_subdomains(
+                self.domain,
+                self.wordlist_path,
+                self.threads,
+                adaptive=self.adaptive,
+                max_threads=self.concurrency,
+                filter_wildcard=self.filter_wildcard,
+                checkpoint=checkpoint,
+            )
+
+    def iter_mutations(self):
+        """
+        Генератор поддоменов, найденных мутациями уже найденных имен
+
+        Мутации новых находок проверяются следующим раундом, пока не
+        исчерпан бюджет self.mutations (вместе с пробами wildcard).
+        """
+        found = sorted(self.found_subdomains)
+        if not found:
+            return
+        logger.info(
+            f"Запуск этапа мутаций для {len(found)} найденных имен "
+            f"(бюджет {self.mutations} запросов)"
+        )
+
+        wordlist = build_wordlist(self.domain, self.wordlist_path)
+        stage = MutationStage(
+            self.domain, self.mutations, capacity=len(wordlist) + len(found)
+        )
+        stage.mark_tried(f"{word}.{self.domain}" for word in wordlist)
+
+        yield from stage.iter_subdomains(
+            found, self.concurrency, self.adaptive, self.filter_wildcard
+        )
+
+        logger.info(
+            f"Мутации: израсходовано {stage.emitted} запросов, "
+            f"найдено {stage.found} поддоменов"
+        )
+
+    def iter_recursive(self):
+        """Генератор поддоменов, найденных перебором словаря под найденными именами"""
+        stage = RecursiveBruteForce(
+            self.domain,
+            build_wordlist(self.domain, self.wordlist_path),
+            max_depth=self.recursive_depth,
+            max_queries=self.recursive_queries,
+            concurrency=self.concurrency,
+            adaptive=self.adaptive,
+            filter_wildcard=self.filter_wildcard,
+        )
+        yield from stage.iter_subdomains(sorted(self.found_subdomains))
+
     def scan_zone_transfer(self):
         """Сканирование с использованием передачи зоны DNS"""
-        logger.info(f"Запуск сканирования через передачу зоны для {self.domain}")
-        subdomains = try_zone_transfer(self.domain)
+        subdomains = list(self.iter_zone_transfer())
 
         if subdomains:
             logger.info(f"Найдено {len(subdomains)} поддоменов через передачу зоны")
@@ -56,8 +234,7 @@ class SubdomainScanner:
 
     def scan_certificate_transparency(self):
         """Сканирование через логи прозрачности сертификатов"""
-        logger.info(f"Запуск сканирования через логи сертификатов для {self.domain}")
-        subdomains = search_certificate_transparency(self.domain)
+        subdomains = list(self.iter_certificate_transparency())
 
         if subdomains:
             logger.info(f"Найдено {len(subdomains)} поддоменов через логи сертификатов")
@@ -67,18 +244,7 @@ class SubdomainScanner:
 
     def scan_brute_force(self):
         """Сканирование методом перебора из словаря"""
-        logger.info(f"Запуск сканирования перебором для {self.domain}")
-
-        if not os.path.exists(self.wordlist_path):
-            logger.error(f"Файл словаря {self.wordlist_path} не найден")
-            logger.info(
-                "Скачайте словарь или укажите путь к существующему. "
-                "Пример: https://github.com/danielmiessler/SecLists/raw/master/"
-                "Discovery/DNS/subdomains-top1million-5000.txt"
-            )
-            return
-
-        subdomains = find_subdomains(self.domain, self.wordlist_path, self.threads)
+        subdomains = list(self.iter_brute_force())
 
         if subdomains:
             logger.info(f"Найдено {len(subdomains)} поддоменов методом перебора")
@@ -108,35 +274,150 @@ class SubdomainScanner:
         logger.info(f"Подтверждено {len(verified_subdomains)} поддоменов")
         self.found_subdomains = verified_subdomains
 
-    def scan_all(self):
-        """Запускает все методы сканирования"""
+    def iter_scan(self):
+        """
+        Генератор: запускает все методы сканирования и выдает каждый новый
+        поддомен по мере обнаружения
+
+        Yields:
+            tuple: (поддомен, источник) - источник из SOURCE_ZONE_TRANSFER,
+                   SOURCE_CERTIFICATE_TRANSPARENCY, SOURCE_BRUTE_FORCE
+                   SOURCE_MUTATION или SOURCE_RECURSIVE
+        """
         logger.info(f"Запуск полного сканирования поддоменов для {self.domain}")
-        total_methods = 3
+        methods = [
+            (SOURCE_ZONE_TRANSFER, self.iter_zone_transfer, "через Zone Transfer"),
+            (
+                SOURCE_CERTIFICATE_TRANSPARENCY,
+                self.iter_certificate_transparency,
+                "через Certificate Transparency",
+            ),
+            (SOURCE_BRUTE_FORCE, self.iter_brute_force, "методом перебора"),
+        ]
+
+        run = self._run_parallel if self.parallel_methods else self._run_sequential
+        successful_methods = yield from run(methods)
+
+        if self.mutations > 0:
+            try:
+                for subdomain in self.iter_mutations():
+                    if self._add_found(subdomain):
+                        yield subdomain, SOURCE_MUTATION
+            except Exception as e:
+                logger.error(f"Ошибка на этапе мутаций: {e}")
+
+        if self.recursive_depth > 1:
+            try:
+                for subdomain in self.iter_recursive():
+                    if self._add_found(subdomain):
+                        yield subdomain, SOURCE_RECURSIVE
+            except Exception as e:
+                logger.error(f"Ошибка при рекурсивном переборе: {e}")
+
+        self._log_summary(successful_methods, len(methods))
+
+    def _add_found(self, subdomain):
+        """Добавляет поддомен к найденным, возвращает True если он новый"""
+        if subdomain in self.found_subdomains:
+            return False
+        self.found_subdomains.add(subdomain)
+        return True
+
+    def _run_sequential(self, methods):
+        """
+        Выполняет методы по очереди, выдавая новые поддомены
+
+        Returns:
+            int: Количество успешно выполненных методов
+        """
         successful_methods = 0
+        for index, (source, method, title) in enumerate(methods):
+            try:
+                for subdomain in method():
+                    if self._add_found(subdomain):
+                        yield subdomain, source
+                successful_methods += 1
+            except Exception as e:
+                logger.error(f"Ошибка при сканировании {title}: {e}")
+                if index < len(methods) - 1:
+                    logger.info("Продолжаем сканирование другими методами...")
+        return successful_methods
+
+    def _run_parallel(self, methods):
+        """
+        Выполняет методы одновременно, каждый в своем потоке
 
-        # Метод 1: Zone Transfer
-        try:
-            self.scan_zone_transfer()
-            successful_methods += 1
-        except Exception as e:
-            logger.error(f"Ошибка при сканировании через Zone Transfer: {e}")
-            logger.info("Продолжаем сканирование другими методами...")
+        Потоки только передают находки через очередь; в found_subdomains
+        их объединяет один потребитель, поэтому блокировки не нужны.
+        Общую нагрузку на DNS ограничивает бюджет запросов (dns.budget).
 
-        # Метод 2: Сертификаты
-        try:
-            self.scan_certificate_transparency()
-            successful_methods += 1
-        except Exception as e:
-            logger.error(f"Ошибка при сканировании через Certificate Transparency: {e}")
-            logger.info("Продолжаем сканирование другими методами...")
+        Если потребитель прекратил перебор или в нем возникла ошибка,
+        потоки останавливаются, а генераторы методов закрываются, чтобы
+        выполнились их finally (например, сохранение состояния перебора).
 
-        # Метод 3: Перебор
+        Returns:
+            int: Количество успешно выполненных методов
+        """
+        results = queue.Queue(maxsize=10000)
+        stop = threading.Event()
+
+        def put(item):
+            """Передает элемент потребителю; False - потребитель остановлен"""
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(source, subdomains, title):
+            try:
+                for subdomain in subdomains:
+                    if not put((subdomain, source)):
+                        return
+                put((None, True))
+            except Exception as e:
+                logger.error(f"Ошибка при сканировании {title}: {e}")
+                put((None, False))
+            finally:
+                _close_generator(subdomains)
+
+        generators = [(source, method(), title) for source, method, title in methods]
+        threads = [
+            threading.Thread(target=worker, args=generator, daemon=True)
+            for generator in generators
+        ]
+        for thread in threads:
+            thread.start()
+
+        successful_methods = 0
+        running = len(methods)
         try:
-            self.scan_brute_force()
-            successful_methods += 1
-        except Exception as e:
-            logger.error(f"Ошибка при сканировании методом перебора: {e}")
+            while running:
+                subdomain, source = results.get()
+                if subdomain is None:
+                    # Метод завершился: source - признак успеха
+                    running -= 1
+                    successful_methods += source
+                elif self._add_found(subdomain):
+                    yield subdomain, source
+        finally:
+            stop.set()
+            for _, subdomains, _ in generators:
+                _close_generator(subdomains)
+            for thread in threads:
+                thread.join(timeout=STOP_TIMEOUT)
+        return successful_methods
 
+    def scan_all(self):
+        """Запускает все методы сканирования"""
+        for _ in self.iter_scan():
+            pass
+        return sorted(list(self.found_subdomains))
+
+    def _log_summary(self, successful_methods, total_methods):
+        """Выводит итоговую статистику сканирования"""
         # Статистика по методам сканирования
         logger.info(
             f"Выполнено {successful_methods} из {total_methods} методов сканирования"
@@ -145,10 +426,17 @@ class SubdomainScanner:
         # Дополнительная проверка (опционально)
         # asyncio.run(self.verify_subdomains())
 
+        get_scheduler().log_stats()
+
+        cache_stats = get_cache().stats()
+        logger.info(
+            f"Кэш DNS: {cache_stats['hits']} попаданий, {cache_stats['misses']} промахов "
+            f"({cache_stats['hit_rate']:.0%}), записей в памяти: {cache_stats['entries']}"
+        )
+
         logger.info(
             f"Сканирование завершено. Всего найдено {len(self.found_subdomains)} поддоменов"
         )
-        return sorted(list(self.found_subdomains))
 
     def save_results(self, output_file, no_filter_wildcards=False):
         """Сохраняет результаты в файл"""
@@ -165,7 +453,9 @@ class SubdomainScanner:
             sorted(list(self.found_subdomains)), output_file, no_filter_wildcards
         )
 
-    def classify_subdomains(self, max_workers=10, subdomains_list=None):
+    def classify_subdomains(
+        self, max_workers=10, subdomains_list=None, prober=None, group_policy=None
+    ):
         """
         Классифицирует найденные поддомены на пользовательские и технические
 
@@ -173,6 +463,9 @@ class SubdomainScanner:
             max_workers (int): Количество параллельных потоков для проверки поддоменов
             subdomains_list (list, optional): Список поддоменов для классификации.
                                               По умолчанию None (используются найденные поддомены)
+            prober (HTTPProber, optional): Настроенная асинхронная HTTP-проверка
+            group_policy (GroupPolicy, optional): Проверять по HTTP только
+                представителей групп имен с общими IP или CNAME
 
         Returns:
             tuple: Кортеж из двух списков (пользовательские, технические)
@@ -188,4 +481,4 @@ class SubdomainScanner:
                 return [], []
 
         logger.info(f"Запуск классификации для {len(subdomains_list)} поддоменов...")
-        return classify_subdomains(subdomains_list, max_workers)
+        return classify_subdomains(subdomains_list, max_workers, prober, group_policy)
@@ -2,6 +2,11 @@
 Вспомогательные утилиты для работы сканера поддоменов
 """
 
-from .file_handler import ensure_wordlist_exists, save_results
+from .file_handler import (
+    ensure_wordlist_exists,
+    save_results,
+    ResultStream,
+    DomainResultStreams,
+)
 from .logger import setup_logger
 from .classifier import classify_subdomains
@@ -1,14 +1,19 @@
 import logging
 import re
-import dns.resolver
+import string
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-from ..dns.zone_transfer import PUBLIC_DNS_SERVERS
+from ..dns.resolver_pool import resolve
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = "Mozilla/5.0 (Subdomain Scanner)"
+
+# Сколько байт тела HTML-страницы читать в поисках <title>
+TITLE_READ_LIMIT = 64 * 1024
+
 # Паттерны для технических поддоменов
 TECHNICAL_PATTERNS = [
     # CDN и серверы контента
@@ -216,25 +221,87 @@ USER_PATTERNS = [
 ]
 
 
+_LITERAL_CHARS = frozenset(string.ascii_lowercase + string.digits + "-_")
+
+
+def _combine(patterns):
+    """Одно регулярное выражение, совпадающее, если совпал любой из шаблонов"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+class PatternMatcher:
+    """
+    Набор шаблонов имен, скомпилированный один раз
+
+    Результат тот же, что у re.search(pattern, name, re.IGNORECASE) по всем
+    шаблонам подряд, но вместо сотни вызовов делается один-два. Шаблоны,
+    привязанные к началу имени (^) и начинающиеся с обычного символа,
+    группируются по этому символу: для имени проверяется только группа его
+    первого символа вместе с шаблонами, начинающимися с класса символов.
+    Шаблоны без ^ проверяются поиском по всему имени.
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns (list): Регулярные выражения (как для re.search)
+        """
+        by_char = {}
+        generic = []
+        floating = []
+        for pattern in patterns:
+            if not pattern.startswith("^"):
+                floating.append(pattern)
+                continue
+            body = pattern[1:]
+            # Первый символ обязателен, если за ним нет квантификатора
+            if body[:1] in _LITERAL_CHARS and body[1:2] not in ("?", "*", "{"):
+                by_char.setdefault(body[0], []).append(body)
+            else:
+                generic.append(body)
+
+        self._groups = {
+            char: _combine(bodies + generic) for char, bodies in by_char.items()
+        }
+        self._generic = _combine(generic)
+        self._all = _combine(
+            [pattern[1:] for pattern in patterns if pattern[:1] == "^"]
+        )
+        self._floating = _combine(floating)
+
+    def __call__(self, name):
+        """Проверяет, совпадает ли имя хотя бы с одним шаблоном"""
+        first = name[:1]
+        if first.isascii():
+            anchored = self._groups.get(first.lower(), self._generic)
+        else:
+            # Нестандартный первый символ (при IGNORECASE "ſ" совпадает с "s")
+            # - проверяем все привязанные шаблоны
+            anchored = self._all
+        if anchored is not None and anchored.match(name):
+            return True
+        return self._floating is not None and self._floating.search(name) is not None
+
+
+_is_technical = PatternMatcher(TECHNICAL_PATTERNS)
+_is_user = PatternMatcher(USER_PATTERNS)
+
+
 def is_technical_subdomain(subdomain):
     """Проверяет, является ли поддомен техническим по паттернам в имени"""
-    for pattern in TECHNICAL_PATTERNS:
-        if re.search(pattern, subdomain, re.IGNORECASE):
-            return True
-    return False
+    return _is_technical(subdomain)
 
 
 def is_user_subdomain(subdomain):
     """Проверяет, является ли поддомен пользовательским по паттернам в имени"""
-    for pattern in USER_PATTERNS:
-        if re.search(pattern, subdomain, re.IGNORECASE):
-            return True
-    return False
+    return _is_user(subdomain)
 
 
-def check_http_response(subdomain):
-    """Проверяет ответ по HTTP/HTTPS для определения типа поддомена"""
-    result = {
+def new_http_result(subdomain):
+    """Пустой результат HTTP-проверки поддомена"""
+    return {
         "subdomain": subdomain,
         "has_website": False,
         "status_code": None,
@@ -244,36 +311,60 @@ def check_http_response(subdomain):
         "classification": "unknown",
     }
 
-    # Пробуем сначала HTTPS, затем HTTP
-    for protocol in ["https", "http"]:
-        url = f"{protocol}://{subdomain}"
-        try:
-            response = requests.get(
-                url,
-                timeout=3,
-                allow_redirects=True,
-                headers={"User-Agent": "Mozilla/5.0 (Subdomain Scanner)"},
-            )
-
-            result["has_website"] = True
-            result["status_code"] = response.status_code
-            result["server"] = response.headers.get("Server")
-            result["content_type"] = response.headers.get("Content-Type")
-
-            # Извлекаем title, если есть
-            if "text/html" in response.headers.get("Content-Type", ""):
-                title_match = re.search(
-                    r"<title>(.*?)</title>", response.text, re.IGNORECASE
-                )
-                if title_match:
-                    result["title"] = title_match.group(1).strip()
 
-            # Прерываем цикл, если получили ответ
-            break
+_TITLE_BYTES = re.compile(rb"<title>(.*?)</title>", re.IGNORECASE)
 
-        except Exception:
-            continue
 
+def extract_title(text):
+    """Извлекает содержимое <title> из HTML (None, если его нет)"""
+    title_match = re.search(r"<title>(.*?)</title>", text, re.IGNORECASE)
+    if title_match:
+        return title_match.group(1).strip()
+    return None
+
+
+class TitleReader:
+    """
+    Потоковое чтение начала HTML-страницы до </title>
+
+    Тело передается частями через feed(); чтение следует прекратить, как
+    только feed() вернул True: заголовок найден или прочитано limit байт.
+    В памяти хранится не больше limit байт тела.
+    """
+
+    def __init__(self, limit=TITLE_READ_LIMIT):
+        """
+        Args:
+            limit (int): Максимум байт тела для поиска заголовка
+        """
+        self.limit = limit
+        self.done = False
+        self._buffer = bytearray()
+        self._checked = 0
+
+    def feed(self, chunk):
+        """Добавляет часть тела, возвращает True, если читать дальше не нужно"""
+        if self.done:
+            return True
+        self._buffer += chunk[: self.limit - len(self._buffer)]
+        # "</title>" может оказаться на границе частей - проверяем с перекрытием
+        if b"</title>" in self._buffer[self._checked :].lower():
+            self.done = _TITLE_BYTES.search(self._buffer) is not None
+        self._checked = max(0, len(self._buffer) - len(b"</title>") + 1)
+        if len(self._buffer) >= self.limit:
+            self.done = True
+        return self.done
+
+    def title(self, encoding=None):
+        """Заголовок из прочитанной части тела (None, если его нет)"""
+        return extract_title(
+            bytes(self._buffer).decode(encoding or "utf-8", errors="replace")
+        )
+
+
+def classify_http_result(result):
+    """Заполняет result["classification"] по ответу сервера и шаблонам имени"""
+    subdomain = result["subdomain"]
     # Классификация на основе наличия веб-сайта и типа контента
     if result["has_website"]:
         if result["status_code"] == 200:
@@ -308,13 +399,50 @@ def check_http_response(subdomain):
     return result
 
 
+def check_http_response(subdomain, title_limit=TITLE_READ_LIMIT):
+    """
+    Проверяет ответ по HTTP/HTTPS для определения типа поддомена
+
+    Тело читается потоково и только для HTML: до </title>, не больше
+    title_limit байт.
+    """
+    result = new_http_result(subdomain)
+
+    # Пробуем сначала HTTPS, затем HTTP
+    for protocol in ["https", "http"]:
+        url = f"{protocol}://{subdomain}"
+        try:
+            with requests.get(
+                url,
+                timeout=3,
+                allow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                stream=True,
+            ) as response:
+                result["has_website"] = True
+                result["status_code"] = response.status_code
+                result["server"] = response.headers.get("Server")
+                result["content_type"] = response.headers.get("Content-Type")
+
+                # Извлекаем title, если есть
+                if "text/html" in response.headers.get("Content-Type", ""):
+                    reader = TitleReader(title_limit)
+                    for chunk in response.iter_content(chunk_size=4096):
+                        if reader.feed(chunk):
+                            break
+                    result["title"] = reader.title(response.encoding)
+
+            # Прерываем цикл, если получили ответ
+            break
+
+        except Exception:
+            continue
+
+    return classify_http_result(result)
+
+
 def check_dns_records(subdomain):
     """Проверяет DNS-записи для определения типа поддомена"""
-    resolver = dns.resolver.Resolver()
-    resolver.nameservers = PUBLIC_DNS_SERVERS[:3]
-    resolver.timeout = 2.0
-    resolver.lifetime = 3.0
-
     result = {
         "subdomain": subdomain,
         "has_a": False,
@@ -326,29 +454,28 @@ def check_dns_records(subdomain):
 
     # Проверяем A запись
     try:
-        answers = resolver.resolve(subdomain, "A")
+        result["ips"] = resolve(subdomain, "A", profile="classify")
         result["has_a"] = True
-        result["ips"] = [rdata.address for rdata in answers]
     except Exception:
         pass
 
     # Проверяем CNAME запись
     try:
-        answers = resolver.resolve(subdomain, "CNAME")
+        resolve(subdomain, "CNAME", profile="classify")
         result["has_cname"] = True
     except Exception:
         pass
 
     # Проверяем MX запись
     try:
-        answers = resolver.resolve(subdomain, "MX")
+        resolve(subdomain, "MX", profile="classify")
         result["has_mx"] = True
     except Exception:
         pass
 
     # Проверяем TXT запись
     try:
-        answers = resolver.resolve(subdomain, "TXT")
+        resolve(subdomain, "TXT", profile="classify")
         result["has_txt"] = True
     except Exception:
         pass
@@ -356,8 +483,18 @@ def check_dns_records(subdomain):
     return result
 
 
-def classify_subdomains(subdomains, max_workers=10):
-    """Классифицирует список поддоменов на пользовательские и технические"""
+def classify_subdomains(subdomains, max_workers=10, prober=None, group_policy=None):
+    """
+    Классифицирует список поддоменов на пользовательские и технические
+
+    Args:
+        subdomains (list): Поддомены
+        max_workers (int): Количество потоков для проверки DNS-записей
+        prober (HTTPProber, optional): Настроенная асинхронная HTTP-проверка
+            (по умолчанию с параметрами HTTPProber по умолчанию)
+        group_policy (GroupPolicy, optional): Группировать неопределенные имена
+            по IP и CNAME и проверять по HTTP только представителей групп
+    """
     if not subdomains:
         return [], []
 
@@ -387,27 +524,20 @@ def classify_subdomains(subdomains, max_workers=10):
             f"Дополнительная проверка для {len(unknown_subdomains)} неопределенных поддоменов..."
         )
 
-        results = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Сначала проверяем HTTP/HTTPS
-            http_futures = {
-                executor.submit(check_http_response, subdomain): subdomain
-                for subdomain in unknown_subdomains
-            }
-
-            # Отображаем прогресс
-            with tqdm(
-                total=len(unknown_subdomains), desc="Проверка HTTP/HTTPS"
-            ) as pbar:
-                for future in as_completed(http_futures):
-                    try:
-                        results.append(future.result())
-                    except Exception as e:
-                        logger.debug(
-                            f"Ошибка при HTTP проверке {http_futures[future]}: {e}"
-                        )
-                    pbar.update(1)
+        # Сначала проверяем HTTP/HTTPS - асинхронно, с общими соединениями
+        if prober is None:
+            from .http_probe import HTTPProber
+
+            prober = HTTPProber()
+        if group_policy is not None:
+            from .grouping import group_subdomains, probe_groups
 
+            groups = group_subdomains(unknown_subdomains, group_policy, max_workers)
+            results = probe_groups(groups, group_policy, prober.run)
+        else:
+            results = prober.run(unknown_subdomains)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Если после HTTP проверки остались неклассифицированные поддомены,
             # проверяем их DNS записи
             unclassified = [
@@ -70,3 +70,78 @@ def save_results(subdomains, output_file, no_filter_wildcards=False):
     except Exception as e:
         logger.error(f"Ошибка при сохранении результатов: {e}")
         return False
+
+
+class ResultStream:
+    """
+    Построчная дозапись найденных поддоменов в файл во время сканирования,
+    чтобы результаты можно было читать (tail -f) до завершения сканирования
+    """
+
+    def __init__(self, output_file, no_filter_wildcards=False):
+        """
+        Args:
+            output_file (str): Путь к файлу результатов (перезаписывается)
+            no_filter_wildcards (bool): Если True, поддомены со звездочками тоже записываются
+        """
+        self.output_file = output_file
+        self.no_filter_wildcards = no_filter_wildcards
+        self.written = 0
+        self._file = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.output_file, "w")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+        self._file = None
+
+    def write(self, subdomain):
+        """Дописывает поддомен в файл и сразу сбрасывает буфер на диск"""
+        if not self.no_filter_wildcards and subdomain.startswith("*"):
+            return
+        self._file.write(f"{subdomain}\n")
+        self._file.flush()
+        self.written += 1
+
+
+class DomainResultStreams:
+    """
+    Построчная дозапись найденных поддоменов в файлы доменов пакетного
+    сканирования, чтобы прерванный запуск не терял найденное
+
+    Файл домена перезаписывается при первой находке в этом запуске.
+    Каждая запись открывает файл на дозапись и сразу закрывает его, поэтому
+    число доменов не ограничено числом открытых файлов.
+    """
+
+    def __init__(self, output_file, no_filter_wildcards=False):
+        """
+        Args:
+            output_file (callable): Возвращает путь к файлу результатов домена
+            no_filter_wildcards (bool): Если True, поддомены со звездочками тоже записываются
+        """
+        self.output_file = output_file
+        self.no_filter_wildcards = no_filter_wildcards
+        self.written = 0
+        self._started = set()
+
+    def write(self, domain, subdomain):
+        """Дописывает поддомен в файл результатов домена"""
+        if not self.no_filter_wildcards and subdomain.startswith("*"):
+            return
+        path = self.output_file(domain)
+        mode = "a"
+        if domain not in self._started:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._started.add(domain)
+            mode = "w"
+        with open(path, mode) as file:
+            file.write(f"{subdomain}\n")
+        self.written += 1
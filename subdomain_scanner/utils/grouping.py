@@ -0,0 +1,153 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+from ..dns.resolver_pool import resolve
+
+logger = logging.getLogger(__name__)
+
+# По чему группировать имена
+GROUP_BY_IP = "ip"
+GROUP_BY_CNAME = "cname"
+GROUP_BY_ANY = "ip+cname"
+
+
+class GroupPolicy:
+    """
+    Правило, по которому имена считаются одинаковыми для HTTP-проверки
+
+    Имена с одной целью CNAME (или, если CNAME нет, с одним набором
+    IP-адресов) и, при same_parent, в одной родительской зоне попадают
+    в одну группу. В группе из min_size и более имен полностью проверяются
+    представитель и samples дополнительных имен; если их классификация
+    совпала, результат переносится на остальные имена группы, иначе
+    проверяется вся группа.
+    """
+
+    def __init__(self, by=GROUP_BY_ANY, same_parent=True, samples=1, min_size=3):
+        """
+        Args:
+            by (str): GROUP_BY_IP, GROUP_BY_CNAME или GROUP_BY_ANY
+                (CNAME, а для имен без CNAME - IP-адреса)
+            same_parent (bool): Группировать только имена одной родительской зоны
+            samples (int): Сколько имен группы проверять кроме представителя
+            min_size (int): Группы меньшего размера проверяются полностью
+        """
+        self.by = by
+        self.same_parent = same_parent
+        self.samples = samples
+        self.min_size = max(min_size, samples + 2)
+
+    def key(self, name, ips, cnames):
+        """Ключ группы имени или None, если имя нельзя объединять с другими"""
+        target = None
+        if cnames and self.by in (GROUP_BY_CNAME, GROUP_BY_ANY):
+            target = ("cname", cnames[0])
+        elif ips and self.by in (GROUP_BY_IP, GROUP_BY_ANY):
+            target = ("ip", frozenset(ips))
+        if target is None:
+            return None
+        if self.same_parent:
+            return name.split(".", 1)[-1].lower(), target
+        return target
+
+    def representatives(self, group):
+        """Представитель и samples имен, равномерно распределенных по группе"""
+        count = self.samples + 1
+        return [group[index * len(group) // count] for index in range(count)]
+
+
+def _lookup(name):
+    """Цели CNAME и IP-адреса имени (пустые списки, если записей нет)"""
+    try:
+        cnames = [
+            target.rstrip(".").lower()
+            for target in resolve(name, "CNAME", profile="classify")
+        ]
+    except Exception:
+        cnames = []
+    try:
+        ips = resolve(name, "A", profile="classify")
+    except Exception:
+        ips = []
+    return cnames, ips
+
+
+def group_subdomains(subdomains, policy, max_workers=10):
+    """
+    Разрешает имена и объединяет их в группы по правилу policy
+
+    Returns:
+        list: Группы (отсортированные списки имен); имена, которые нельзя
+              объединять, - отдельными группами
+    """
+    groups = {}
+    singles = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with tqdm(total=len(subdomains), desc="Группировка по IP и CNAME") as pbar:
+            for name, (cnames, ips) in zip(
+                subdomains, executor.map(_lookup, subdomains)
+            ):
+                key = policy.key(name, ips, cnames)
+                if key is None:
+                    singles.append([name])
+                else:
+                    groups.setdefault(key, []).append(name)
+                pbar.update(1)
+
+    result = [sorted(group) for group in groups.values()] + singles
+    shared = sum(len(group) for group in result if len(group) >= policy.min_size)
+    logger.info(
+        f"Группировка: {len(subdomains)} имен в {len(result)} группах, "
+        f"{shared} имен в группах от {policy.min_size} имен"
+    )
+    return result
+
+
+def probe_groups(groups, policy, probe):
+    """
+    HTTP-проверка групп: представители, затем перенос или полная проверка
+
+    Args:
+        groups (list): Результат group_subdomains
+        policy (GroupPolicy): Правило группировки
+        probe (callable): probe(subdomains) -> список словарей результатов
+            (например, HTTPProber.run)
+
+    Returns:
+        list: Результаты для всех имен всех групп
+    """
+    first = []
+    for group in groups:
+        if len(group) >= policy.min_size:
+            first.extend(policy.representatives(group))
+        else:
+            first.extend(group)
+    results = {result["subdomain"]: result for result in probe(first)}
+
+    rest = []
+    propagated = 0
+    for group in groups:
+        if len(group) < policy.min_size:
+            continue
+        checked = [results[name] for name in policy.representatives(group)]
+        outcomes = {
+            (result["classification"], result["has_website"]) for result in checked
+        }
+        remaining = [name for name in group if name not in results]
+        if len(outcomes) == 1:
+            for name in remaining:
+                results[name] = dict(checked[0], subdomain=name)
+            propagated += len(remaining)
+        else:
+            # Представители разошлись - имена группы не взаимозаменяемы
+            rest.extend(remaining)
+
+    if rest:
+        results.update((result["subdomain"], result) for result in probe(rest))
+    logger.info(
+        f"HTTP-проверка по группам: проверено {len(first) + len(rest)} имен, "
+        f"результат перенесен на {propagated}"
+    )
+    return list(results.values())
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+
+import aiohttp
+from tqdm import tqdm
+
+from .classifier import (
+    USER_AGENT,
+    TITLE_READ_LIMIT,
+    TitleReader,
+    new_http_result,
+    classify_http_result,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPProber:
+    """
+    Асинхронная HTTP/HTTPS-проверка поддоменов
+
+    Все запросы идут через одну сессию aiohttp: соединения (и TLS-сессии)
+    переиспользуются, число соединений ограничено глобально и на каждый
+    хост. Результаты - те же словари, что у check_http_response.
+    """
+
+    def __init__(
+        self,
+        concurrency=200,
+        per_host=4,
+        timeout=3.0,
+        connect_timeout=None,
+        race=False,
+        head_start=0.25,
+        title_limit=TITLE_READ_LIMIT,
+    ):
+        """
+        Args:
+            concurrency (int): Максимум одновременных проверок и открытых соединений
+            per_host (int): Максимум одновременных соединений с одним хостом
+            timeout (float): Общий таймаут одного запроса в секундах
+            connect_timeout (float, optional): Таймаут установки соединения
+                (по умолчанию равен timeout)
+            race (bool): Запускать HTTPS и HTTP одновременно и брать первый ответ
+                вместо перехода на HTTP после неудачи HTTPS
+            head_start (float): Фора HTTPS в секундах при race
+            title_limit (int): Максимум байт тела HTML-страницы для поиска <title>
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout or timeout
+        self.race = race
+        self.head_start = head_start
+        self.title_limit = title_limit
+
+    def _session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency, limit_per_host=self.per_host, ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=self.timeout, sock_connect=self.connect_timeout
+            ),
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    async def fetch(self, session, subdomain, protocol):
+        """
+        Запрашивает поддомен по указанному протоколу
+
+        Returns:
+            dict: Результат с заполненными полями ответа или None, если сервер не ответил
+        """
+        url = f"{protocol}://{subdomain}"
+        result = new_http_result(subdomain)
+        try:
+            async with session.get(url, allow_redirects=True) as response:
+                result["has_website"] = True
+                result["status_code"] = response.status
+                result["server"] = response.headers.get("Server")
+                result["content_type"] = response.headers.get("Content-Type")
+
+                # Извлекаем title, если есть
+                # Читаем тело только для HTML и только до </title>
+                if "text/html" in response.headers.get("Content-Type", ""):
+                    reader = TitleReader(self.title_limit)
+                    async for chunk in response.content.iter_chunked(4096):
+                        if reader.feed(chunk):
+                            break
+                    result["title"] = reader.title(response.charset)
+                return result
+        except Exception as e:
+            logger.debug(f"Нет ответа от {url}: {e}")
+            return None
+
+    async def _sequential(self, session, subdomain):
+        """Сначала HTTPS, затем HTTP (как check_http_response)"""
+        for protocol in ["https", "http"]:
+            result = await self.fetch(session, subdomain, protocol)
+            if result is not None:
+                return result
+        return None
+
+    async def _race(self, session, subdomain):
+        """
+        HTTPS и HTTP одновременно: HTTPS получает фору head_start секунд,
+        берется первый ответ, второй запрос отменяется
+        """
+        https = asyncio.ensure_future(self.fetch(session, subdomain, "https"))
+        done, _ = await asyncio.wait([https], timeout=self.head_start)
+        if done and https.result() is not None:
+            return https.result()
+
+        pending = {https} if not done else set()
+        pending.add(asyncio.ensure_future(self.fetch(session, subdomain, "http")))
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # При одновременном ответе предпочитаем HTTPS
+                for task in sorted(done, key=lambda task: task is not https):
+                    if task.result() is not None:
+                        return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def probe(self, session, subdomain):
+        """Проверяет один поддомен по HTTPS и HTTP"""
+        if self.race:
+            result = await self._race(session, subdomain)
+        else:
+            result = await self._sequential(session, subdomain)
+        return classify_http_result(result or new_http_result(subdomain))
+
+    async def probe_all(self, subdomains, on_result=None):
+        """
+        Проверяет поддомены, держа не более concurrency проверок одновременно
+
+        Args:
+            subdomains (iterable): Поддомены для проверки
+            on_result (callable, optional): Вызывается с каждым результатом
+
+        Returns:
+            list: Результаты в порядке завершения
+        """
+        results = []
+        async with self._session() as session:
+            pending = set()
+            for subdomain in subdomains:
+                if len(pending) >= self.concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        results.append(task.result())
+                        if on_result is not None:
+                            on_result(task.result())
+                pending.add(asyncio.ensure_future(self.probe(session, subdomain)))
+
+            for task in asyncio.as_completed(pending):
+                result = await task
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+        return results
+
+    def run(self, subdomains):
+        """Синхронная обертка над probe_all с индикатором прогресса"""
+        subdomains = list(subdomains)
+        with tqdm(total=len(subdomains), desc="Проверка HTTP/HTTPS") as pbar:
+            return asyncio.run(
+                self.probe_all(subdomains, on_result=lambda _: pbar.update(1))
+            )